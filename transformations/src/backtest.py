@@ -0,0 +1,215 @@
+"""Walk-forward backtests over historical cutoff dates.
+
+The feature table (`fundamentals.excess_returns`) is built once, with all data up to
+today. Every feature in it only looks backwards in time, so the table as of a cutoff
+date is the rows up to the cutoff with the labels that weren't realized yet by then
+set to null. One model per cutoff and horizon is trained on such a slice, in a
+process pool, and its predictions for the latest row of every ticker at the cutoff
+are stored next to the realized excess returns.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import polars as pl
+
+from src.catboost_trainer import CatBoostTrainer
+
+# Months until the label of a row is realized, per label column
+LABEL_MONTHS = {
+    "excess_return_ln_6m": 6,
+    "excess_return_ln_12m": 12,
+    "excess_return_ln_24m": 24,
+    "excess_return_ln_36m": 36,
+}
+
+# The price a label is computed from is sampled on the first trading day from the
+# 17th of the month, so it can come a few days after date + horizon
+LABEL_SAMPLING_SLACK = "10d"
+
+# Tickers without a row in the last quarter before a cutoff aren't scored at it
+MAX_ROW_AGE_DAYS = 100
+
+
+def slice_at_cutoff(df: pl.DataFrame, cutoff: date) -> pl.DataFrame:
+    """The feature table as it would have been built with data up to `cutoff`."""
+    return df.filter(pl.col("date") <= cutoff).with_columns(
+        pl.when(
+            pl.col("date").dt.offset_by(f"{months}mo{LABEL_SAMPLING_SLACK}") <= cutoff
+        )
+        .then(pl.col(label_col))
+        .otherwise(None)
+        .alias(label_col)
+        for label_col, months in LABEL_MONTHS.items()
+        if label_col in df.columns
+    )
+
+
+def quarterly_cutoffs(last_date: date, n_cutoffs: int, step_months: int = 3) -> list[date]:
+    """`n_cutoffs` dates `step_months` apart, the last one `step_months` before `last_date`."""
+    last = pl.Series([last_date])
+    return sorted(
+        last.dt.offset_by(f"-{step_months * i}mo")[0] for i in range(1, n_cutoffs + 1)
+    )
+
+
+# Column order of the `main.backtest_results` table, see src/sql/backtest_results.sql
+BACKTEST_RESULTS_COLUMNS = [
+    "cutoff_date",
+    "pred_col",
+    "ticker",
+    "date",
+    "predicted_value_log",
+    "predicted_value",
+    "predicted_std",
+    "actual_value_log",
+    "actual_value",
+    "test_rmse",
+    "n_train_rows",
+    "seed",
+    "train_seconds",
+    "trained_at",
+]
+
+
+def backtest_task(
+    excess_returns: pl.DataFrame | Path,
+    cutoff: date,
+    pred_col: str,
+    seed: int,
+    catboost_threads: int = -1,
+) -> pl.DataFrame:
+    """Train one model as of `cutoff` and score every ticker's latest row at it.
+
+    Defined at module level so it can be submitted to a process pool, see
+    `train_horizon` for passing `excess_returns` as an Arrow IPC file.
+
+    Returns: one row per ticker with the predicted and the realized excess return
+    """
+    start = time.perf_counter()
+    if isinstance(excess_returns, Path):
+        # Memory-mapped, Polars' default for IPC files
+        excess_returns = pl.read_ipc(excess_returns)
+
+    df_cutoff = slice_at_cutoff(excess_returns, cutoff)
+    boost = CatBoostTrainer(
+        conn=duckdb.connect(":memory:"),
+        df_excess_returns=df_cutoff,
+        pred_col=pred_col,
+        seed=seed,
+        cutoff_date=cutoff.isoformat(),
+        arrow_pools=True,
+        thread_count=catboost_threads,
+    )
+    boost.df_train_df()
+    n_train_rows = boost.df_preds.height
+    boost.split_train_test_pools()
+    boost.model_init()
+    boost.model_fit()
+
+    # What the live pipeline predicts at the cutoff: the latest row per ticker
+    df_score = (
+        boost.df_excess_returns.filter(
+            pl.col("date") > pl.lit(cutoff) - pl.duration(days=MAX_ROW_AGE_DAYS)
+        )
+        .sort("date", descending=True)
+        .group_by("ticker")
+        .head(1)
+        .sort("ticker")
+    )
+    pool, _ = boost.scoring_pool(df_score)
+    predictions = boost.model.predict(pool)
+    mean_preds = predictions[:, 0]
+    var_preds = predictions[:, 1]
+
+    # Realized labels come from the full table
+    realized = excess_returns.select(
+        "ticker", "date", pl.col(pred_col).cast(pl.Float64).alias("actual_value_log")
+    )
+
+    return (
+        df_score.select("ticker", "date")
+        .with_columns(
+            pl.lit(cutoff).alias("cutoff_date"),
+            pl.lit(pred_col).alias("pred_col"),
+            pl.Series("predicted_value_log", mean_preds, dtype=pl.Float64),
+            pl.Series("predicted_value", np.exp(mean_preds), dtype=pl.Float64),
+            pl.Series(
+                "predicted_std",
+                np.sqrt(np.exp(2 * mean_preds) * var_preds),
+                dtype=pl.Float64,
+            ),
+        )
+        .join(realized, on=["ticker", "date"], how="left")
+        .with_columns(
+            pl.col("actual_value_log").exp().alias("actual_value"),
+            pl.lit(float(boost.test_rmse)).alias("test_rmse"),
+            pl.lit(n_train_rows).alias("n_train_rows"),
+            pl.lit(seed).alias("seed"),
+            pl.lit(time.perf_counter() - start).alias("train_seconds"),
+            pl.lit(datetime.now()).alias("trained_at"),
+        )
+        .select(BACKTEST_RESULTS_COLUMNS)
+    )
+
+
+def run_backtest(
+    excess_returns_path: Path,
+    cutoffs: list[date],
+    pred_cols: list[str],
+    n_workers: int,
+    catboost_threads: int,
+    seed: int = 0,
+) -> pl.DataFrame:
+    """Run `backtest_task` for every cutoff and horizon in a process pool.
+
+    Every worker memory-maps the feature table from `excess_returns_path`, an
+    uncompressed Arrow IPC file.
+    """
+    tasks = [
+        {
+            "excess_returns": excess_returns_path,
+            "cutoff": cutoff,
+            "pred_col": pred_col,
+            "seed": seed,
+            "catboost_threads": catboost_threads,
+        }
+        for cutoff in cutoffs
+        for pred_col in pred_cols
+    ]
+
+    if n_workers == 1:
+        results = [backtest_task(**task) for task in tasks]
+    else:
+        # Spawn, not fork: CatBoost's and DuckDB's thread pools don't survive a fork
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=get_context("spawn")
+        ) as executor:
+            futures = [executor.submit(backtest_task, **task) for task in tasks]
+            results = [future.result() for future in futures]
+
+    return pl.concat(results)
+
+
+def backtest_summary(results: pl.DataFrame) -> pl.DataFrame:
+    """RMSE of the realized vs predicted (log) excess returns per cutoff and horizon."""
+    return (
+        results.group_by("cutoff_date", "pred_col")
+        .agg(
+            pl.len().alias("n_predictions"),
+            pl.col("actual_value_log").is_not_null().sum().alias("n_realized"),
+            (pl.col("predicted_value_log") - pl.col("actual_value_log"))
+            .pow(2)
+            .mean()
+            .sqrt()
+            .alias("realized_rmse"),
+            pl.col("test_rmse").first(),
+            pl.col("train_seconds").first(),
+        )
+        .sort("cutoff_date", "pred_col")
+    )
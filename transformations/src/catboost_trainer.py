@@ -1,16 +1,241 @@
+from __future__ import annotations
+
 from os import environ
 import duckdb
-import pandas as pd
 import numpy as np
 import polars as pl
-from typing import Set
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error
-from catboost import CatBoostRegressor, Pool, EFstrType
-import matplotlib.pyplot as plt
-import shap
+from typing import TYPE_CHECKING, Iterator, Set
+from catboost import CatBoostError, CatBoostRegressor, Pool, EFstrType, FeaturesData
 from datetime import datetime
 import re
+import time
+from pathlib import Path
+from src.instrumentation import StageTimer
+from src.model_cache import ModelCache, frame_fingerprint
+from src.prediction_stream import spool_chunks
+from src.scoring import FeatureManifest
+
+# pandas, sklearn, matplotlib and shap are imported where they're used: the
+# Polars training path and the Dagster code location don't need them to load
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Seconds between snapshots of a fit, see `CatBoostTrainer.fit_with_snapshots`
+DEFAULT_SNAPSHOT_INTERVAL = 60
+
+# Tickers per chunk of `CatBoostTrainer.iter_ticker_shaps`
+DEFAULT_CHUNK_TICKERS = 500
+
+# How all_ticker_shaps explains predictions: exact SHAP values, CatBoost's
+# approximate calculation, or exact values of the top-K features per row
+SHAP_MODES = ("exact", "approximate", "top_k")
+DEFAULT_SHAP_TOP_K = 10
+
+# Feature name of the summed SHAP values of the features not in a row's top K
+OTHER_FEATURES = "other_features"
+
+# Column order of the `main.predictions_wide` table, see src/sql/predictions.sql
+PREDICTIONS_WIDE_COLUMNS = [
+    "date",
+    "ticker",
+    "pred_col",
+    "trained_date",
+    "trained_at",
+    "bias",
+    "predicted_value_log",
+    "predicted_value",
+    "predicted_std",
+    "actual_value_log",
+    "actual_value",
+    "features",
+    "shap_values",
+    "numeric_values",
+    "categorical_values",
+]
+
+
+def _list_columns(cols: list[str], dtype: type[pl.DataType]) -> pl.Expr:
+    """Pack `cols` into one typed list column, an empty list if there are no cols."""
+    if not cols:
+        return pl.lit(pl.Series([[]], dtype=pl.List(dtype))).first()
+    return pl.concat_list(pl.col(cols).cast(dtype))
+
+
+def _predicted_std(mean_log: pl.Expr, var: pl.Expr) -> pl.Expr:
+    """`predicted_std` of a prediction, from its log-scale mean and variance."""
+    return (mean_log.exp() * 2 * var).sqrt()
+
+
+def _predicted_var(mean_log: pl.Expr, std: pl.Expr) -> pl.Expr:
+    """Log-scale variance of a prediction, the inverse of `_predicted_std`."""
+    return std.pow(2) / (mean_log.exp() * 2)
+
+
+def combine_seed_results(results: list[pl.DataFrame]) -> pl.DataFrame:
+    """Combine the `all_ticker_shaps` results of models trained with different seeds.
+
+    The members are treated as an equally weighted mixture: the ensemble's mean is
+    the mean of the members' means, and its variance the mean of their variances
+    (uncertainty within each model) plus the variance of their means (disagreement
+    between models). SHAP values are additive, so the SHAP values and bias of the
+    mean prediction are the averages over the members.
+    """
+    if len(results) == 1:
+        return results[0]
+
+    base = results[0]
+    for df in results[1:]:
+        if not df.select("date", "ticker", "features").equals(
+            base.select("date", "ticker", "features")
+        ):
+            raise ValueError("Ensemble members scored different rows or features")
+
+    means = np.stack([df["predicted_value_log"].to_numpy() for df in results])
+    variances = np.stack(
+        [
+            df.select(
+                _predicted_var(pl.col("predicted_value_log"), pl.col("predicted_std"))
+            )
+            .to_series()
+            .to_numpy()
+            for df in results
+        ]
+    )
+    n_features = int(base.select(pl.col("features").list.len().max()).item() or 0)
+    shap_values = np.stack(
+        [
+            df["shap_values"].explode().to_numpy().reshape(df.height, n_features)
+            for df in results
+        ]
+    ).mean(axis=0)
+    biases = np.stack([df["bias"].to_numpy() for df in results])
+
+    return base.with_columns(
+        pl.Series("bias", biases.mean(axis=0), dtype=pl.Float64),
+        pl.Series("predicted_value_log", means.mean(axis=0), dtype=pl.Float64),
+        pl.Series(
+            "ensemble_var", variances.mean(axis=0) + means.var(axis=0), dtype=pl.Float64
+        ),
+        pl.Series("shap_values", shap_values.astype(np.float32)).cast(
+            pl.List(pl.Float32)
+        ),
+    ).with_columns(
+        pl.col("predicted_value_log").exp().alias("predicted_value"),
+        _predicted_std(pl.col("predicted_value_log"), pl.col("ensemble_var")).alias(
+            "predicted_std"
+        ),
+    ).select(PREDICTIONS_WIDE_COLUMNS)
+
+
+def keep_top_k_shap(results: pl.DataFrame, k: int) -> pl.DataFrame:
+    """Keep the `k` features with the largest |SHAP| of every row of exact results.
+
+    The other features are summed into an `OTHER_FEATURES` bucket at the end of
+    `features`, so that bias + sum(shap_values) still equals the prediction. Kept
+    features stay numeric first: `numeric_values` holds the values of the kept
+    numeric features, `categorical_values` those of the kept categorical features
+    and a null for the bucket. Unlike exact results, rows have different features.
+
+    Args:
+        results: `all_ticker_shaps` results with all features in every row
+    """
+    if results.is_empty():
+        return results
+    feature_names = results["features"][0].to_list()
+    n_features = len(feature_names)
+    n_num = results["numeric_values"].list.len()[0]
+    if k >= n_features:
+        return results
+
+    n_rows = results.height
+    shap_values = results["shap_values"].explode().to_numpy().reshape(n_rows, n_features)
+    # Exploding empty lists gives a null per row, so skip a missing feature type
+    numeric_values = np.full((n_rows, n_features), np.nan)
+    if n_num > 0:
+        numeric_values[:, :n_num] = (
+            results["numeric_values"].explode().to_numpy().reshape(n_rows, n_num)
+        )
+    categorical_values = np.full((n_rows, n_features), None, dtype=object)
+    if n_features > n_num:
+        categorical_values[:, n_num:] = (
+            results["categorical_values"]
+            .explode()
+            .to_numpy()
+            .reshape(n_rows, n_features - n_num)
+        )
+
+    # Top k by |SHAP|, then numeric before categorical, by |SHAP| within each
+    top = np.argsort(-np.abs(shap_values), axis=1, kind="stable")[:, :k]
+    top = np.take_along_axis(
+        top, np.argsort(top >= n_num, axis=1, kind="stable"), axis=1
+    )
+    top_shaps = np.take_along_axis(shap_values, top, axis=1)
+    other_shaps = shap_values.sum(axis=1) - top_shaps.sum(axis=1)
+
+    row_idx = np.repeat(np.arange(n_rows), k)
+    is_categorical = (top >= n_num).ravel()
+    kept = (
+        pl.DataFrame(
+            {
+                "row_idx": row_idx,
+                "feature": pl.Series(
+                    np.asarray(feature_names, dtype=object)[top].ravel().tolist(),
+                    dtype=pl.Utf8,
+                ),
+                "shap_value": top_shaps.ravel().astype(np.float32),
+                "is_categorical": is_categorical,
+                "numeric_value": pl.Series(
+                    np.take_along_axis(numeric_values, top, axis=1).ravel(),
+                    nan_to_null=True,
+                ),
+                "categorical_value": pl.Series(
+                    np.take_along_axis(categorical_values, top, axis=1).ravel().tolist(),
+                    dtype=pl.Utf8,
+                ),
+            }
+        )
+        .group_by("row_idx", maintain_order=True)
+        .agg(
+            pl.col("feature").alias("features"),
+            pl.col("shap_value").alias("shap_values"),
+            pl.col("numeric_value")
+            .filter(~pl.col("is_categorical"))
+            .alias("numeric_values"),
+            pl.col("categorical_value")
+            .filter(pl.col("is_categorical"))
+            .alias("categorical_values"),
+        )
+        .sort("row_idx")
+        .select(
+            pl.concat_list("features", pl.lit(OTHER_FEATURES)).alias("features"),
+            pl.concat_list(
+                "shap_values", pl.Series(other_shaps.astype(np.float32))
+            ).alias("shap_values"),
+            pl.col("numeric_values").cast(pl.List(pl.Float64)),
+            pl.concat_list(
+                "categorical_values", pl.lit(None, dtype=pl.Utf8)
+            ).alias("categorical_values"),
+        )
+    )
+
+    return (
+        results.drop("features", "shap_values", "numeric_values", "categorical_values")
+        .hstack(kept)
+        .select(PREDICTIONS_WIDE_COLUMNS)
+    )
+
+
+class _FirstIteration:
+    """CatBoost callback recording the first iteration of a fit, > 1 if resumed."""
+
+    def __init__(self) -> None:
+        self.iteration: int | None = None
+
+    def after_iteration(self, info) -> bool:
+        if self.iteration is None:
+            self.iteration = info.iteration
+        return True
+
 
 class CatBoostTrainer:
     """Prepares data from DuckDB for training."""
@@ -22,12 +247,66 @@ class CatBoostTrainer:
         pred_col: str,
         seed: int,
         cutoff_date: str | None = None,
+        arrow_pools: bool = False,
+        thread_count: int = -1,
+        borders_cache: ModelCache | None = None,
+        timer: StageTimer | None = None,
+        feature_subset: list[str] | None = None,
+        compact_dtypes: bool = False,
+        category_dictionary: dict[str, list[str]] | None = None,
+        shap_mode: str = "exact",
+        shap_top_k: int = DEFAULT_SHAP_TOP_K,
+        snapshot_dir: Path | None = None,
+        snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL,
     ) -> None:
-        """Init with DuckDB connection."""
+        """Init with DuckDB connection.
+
+        Args:
+            arrow_pools: Build CatBoost pools directly from the Polars/Arrow column
+                buffers as float32 feature matrices, instead of converting the
+                whole frame to pandas first.
+            thread_count: Number of threads CatBoost may use, -1 for all cores.
+            borders_cache: Quantize the training pool with borders computed once
+                from the training rows of all horizons, see `border_rows`, and
+                stored in this cache. Requires `arrow_pools`.
+            timer: Records the cost of the load, pool build, fit, predict, SHAP and
+                assembly stages, a new one by default.
+            feature_subset: Only use these model features (e.g. those chosen by
+                `src.feature_selection`), the other feature columns are dropped.
+            compact_dtypes: Keep numeric features as Float32 and categorical string
+                features as `pl.Enum`, see `compact_frame`. Requires `arrow_pools`.
+            category_dictionary: Categories of a previous run per categorical
+                column, extended with new values so that Enum codes stay stable.
+            shap_mode: How `all_ticker_shaps` explains predictions, one of
+                `SHAP_MODES`: exact SHAP values, CatBoost's approximate calculation,
+                or the exact values of the `shap_top_k` features with the largest
+                |SHAP| per row plus an `OTHER_FEATURES` bucket (see `keep_top_k_shap`).
+            snapshot_dir: Save the progress of `model_fit` to a snapshot in this
+                directory every `snapshot_interval` seconds, and resume an
+                interrupted fit of the same data, params and seed from its
+                snapshot. Snapshots are removed once the fit succeeds.
+        """
+        if shap_mode not in SHAP_MODES:
+            raise ValueError(f"Unknown shap_mode: {shap_mode}")
+        if borders_cache is not None and not arrow_pools:
+            raise ValueError("Shared quantization borders require arrow_pools")
+        if compact_dtypes and not arrow_pools:
+            # The pandas path tells categorical features apart as dtype != float64
+            raise ValueError("compact_dtypes requires arrow_pools")
         self.conn: duckdb.DuckDBPyConnection = conn
         self.pred_col: str = pred_col
         self.seed: int = seed
         self.cutoff_date: str | None = cutoff_date
+        self.arrow_pools: bool = arrow_pools
+        self.thread_count: int = thread_count
+        self.borders_cache: ModelCache | None = borders_cache
+        self.timer: StageTimer = timer or StageTimer()
+        self.shap_mode: str = shap_mode
+        self.shap_top_k: int = shap_top_k
+        self.snapshot_dir: Path | None = snapshot_dir
+        self.snapshot_interval: int = snapshot_interval
+        # Whether the last fit continued from a snapshot of an interrupted run
+        self.resumed_from_snapshot: bool = False
         self._all_exclude_cols: Set[str] = {
             "name",
             "excess_return_ln_6m",
@@ -37,21 +316,34 @@ class CatBoostTrainer:
         }
         self._model_exclude_cols: Set[str] = self._all_exclude_cols | {"ticker", "date"}
         self.categorical_features_indices: np.ndarray
-        self.df_preds: pd.DataFrame
-        self.X_test: pd.DataFrame
-        self.y_test: pd.Series
+        self.df_preds: pd.DataFrame | pl.DataFrame
+        self.X_test: pd.DataFrame | pl.DataFrame
+        self.y_test: pd.Series | pl.Series
+        self.num_feature_names: list[str] = []
+        self.cat_feature_names: list[str] = []
         self.test_tickers: pd.Series
         self.train_pool: Pool
         self.eval_pool: Pool
         self.test_pool: Pool
         self.model: CatBoostRegressor
         self.shap_values: np.ndarray = np.array([])
-        self.test_rmse: np.ndarray
+        self.test_rmse: np.floating
+        # Hashes of the training rows the model has seen, see `incremental_fit`
+        self.seen_row_hashes: np.ndarray | None = None
         self.train_timestamp: datetime
         self.training_iterations = {"dev": 200, "test": 1, "prod": 2000}.get(
             environ["APP_ENV"], 2000
         )
 
+        if feature_subset is not None:
+            missing = set(feature_subset).difference(df_excess_returns.columns)
+            if missing:
+                raise ValueError(f"Feature subset columns not in data: {sorted(missing)}")
+            keep_cols = self._model_exclude_cols | set(feature_subset)
+            df_excess_returns = df_excess_returns.select(
+                col for col in df_excess_returns.columns if col in keep_cols
+            )
+
         # Convert all Decimal types to Float64 and replace missing values in string columns
         self.df_excess_returns: pl.DataFrame = df_excess_returns.with_columns(
             [
@@ -70,6 +362,56 @@ class CatBoostTrainer:
             ]
         )
 
+        self.compact_dtypes: bool = compact_dtypes
+        # Categories per categorical column, in Enum code order
+        self.category_dictionary: dict[str, list[str]] = {}
+        self.memory_saved_mb: float = 0.0
+        if compact_dtypes:
+            self.compact_frame(category_dictionary or {})
+
+    def compact_frame(self, previous: dict[str, list[str]]) -> None:
+        """Cast float features to Float32 and categorical strings to `pl.Enum`.
+
+        Pools are built from float32 matrices and category strings anyway, so this
+        doesn't change the models. It shrinks the frame kept in memory, avoids the
+        float cast per pool and builds the categorical matrix of a pool from the
+        codes. Labels stay Float64. The categories of each column are those of
+        `previous` followed by the new values in sorted order, so that a value keeps
+        its code across runs.
+        """
+        df = self.df_excess_returns
+        size_before = df.estimated_size()
+
+        label_cols = self._all_exclude_cols - {"name"}
+        float_cols = [
+            col
+            for col, dtype in df.schema.items()
+            if dtype.is_float() and dtype != pl.Float32 and col not in label_cols
+        ]
+        cat_cols = [
+            col
+            for col, dtype in df.schema.items()
+            if dtype == pl.String and col not in self._model_exclude_cols
+        ]
+        for col in cat_cols:
+            known = previous.get(col, [])
+            new_values = set(df[col].unique().to_list()).difference(known)
+            self.category_dictionary[col] = known + sorted(new_values)
+
+        self.df_excess_returns = df.with_columns(
+            *[pl.col(col).cast(pl.Float32) for col in float_cols],
+            *[
+                pl.col(col).cast(pl.Enum(self.category_dictionary[col]))
+                for col in cat_cols
+            ],
+        )
+        size_after = self.df_excess_returns.estimated_size()
+        self.memory_saved_mb = (size_before - size_after) / (1024 * 1024)
+        print(
+            f"Compact dtypes: {size_before / (1024 * 1024):.2f} MB -> "
+            f"{size_after / (1024 * 1024):.2f} MB"
+        )
+
     def db_train_df(self) -> None:
         """Get training DataFrame excluding specified cols except prediction col.
 
@@ -78,12 +420,13 @@ class CatBoostTrainer:
         exclude_cols = self._all_exclude_cols.difference({self.pred_col})
         exclude_cols_str = ",\n".join(exclude_cols)
 
-        self.df_preds = self.conn.query(f"""
-            select * exclude({exclude_cols_str})
-            from fundamentals.excess_returns
-            where {self.pred_col} is not null
-        """).df()
-        self.df_preds = self.df_preds
+        with self.timer.stage("load") as stage:
+            self.df_preds = self.conn.query(f"""
+                select * exclude({exclude_cols_str})
+                from fundamentals.excess_returns
+                where {self.pred_col} is not null
+            """).df()
+            stage.rows, stage.cols = self.df_preds.shape
 
         size_bytes = self.df_preds.memory_usage(deep=True).sum()
         size_mb = size_bytes / (1024 * 1024)
@@ -98,17 +441,115 @@ class CatBoostTrainer:
             raise ValueError("No data loaded. Run db_excess_returns() first.")
 
         exclude_cols = self._all_exclude_cols.difference({self.pred_col})
-        self.df_preds = self.df_excess_returns.to_pandas().drop(
-            columns=list(exclude_cols)
-        )
-        self.df_preds = self.df_preds.dropna(subset=[self.pred_col])
-        self.df_preds = self.df_preds
+
+        if self.arrow_pools:
+            # Stay in Polars: dropping columns shares the Arrow buffers, only the
+            # null-label filter materializes a (Polars) copy.
+            with self.timer.stage("load") as stage:
+                self.df_preds = self.training_frame()
+                stage.rows, stage.cols = self.df_preds.shape
+            size_mb = self.df_preds.estimated_size() / (1024 * 1024)
+            print(f"DataFrame size: {size_mb:.2f} MB")
+            return
+
+        with self.timer.stage("load") as stage:
+            self.df_preds = self.df_excess_returns.to_pandas().drop(
+                columns=list(exclude_cols)
+            )
+            self.df_preds = self.df_preds.dropna(subset=[self.pred_col])
+            stage.rows, stage.cols = self.df_preds.shape
 
         size_bytes = self.df_preds.memory_usage(deep=True).sum()
         size_mb = size_bytes / (1024 * 1024)
         print(f"DataFrame size: {size_mb:.2f} MB")
 
+    def training_frame(self) -> pl.DataFrame:
+        """Rows with a label for `pred_col`, without the other labels and `name`."""
+        exclude_cols = self._all_exclude_cols.difference({self.pred_col})
+        return self.df_excess_returns.drop(list(exclude_cols)).drop_nulls(
+            subset=[self.pred_col]
+        )
+
+    def training_row_hashes(self) -> np.ndarray:
+        """Hash of every row of `training_frame`, in the row order of `df_preds`."""
+        return self.training_frame().hash_rows(seed=0).to_numpy()
+
+    def set_feature_names(self, df: pl.DataFrame) -> None:
+        """Split model features in `df` into numeric and categorical columns.
+
+        Uses the same rule as the pandas path: every non-float column is treated as
+        a categorical feature. Numeric features come first, matching the column
+        order of the `FeaturesData` pools built by `arrow_pool`.
+        """
+        exclude_cols = self._model_exclude_cols | {self.pred_col}
+        feature_cols = [col for col in df.columns if col not in exclude_cols]
+        self.num_feature_names = [
+            col for col in feature_cols if df.schema[col].is_float()
+        ]
+        self.cat_feature_names = [
+            col for col in feature_cols if not df.schema[col].is_float()
+        ]
+        self.feature_names = self.num_feature_names + self.cat_feature_names
+        self.categorical_features_indices = np.arange(
+            len(self.num_feature_names), len(self.feature_names)
+        )
+
+    def arrow_pool(self, df: pl.DataFrame, label: np.ndarray | None = None) -> Pool:
+        """Build a Pool straight from the Polars column buffers, without pandas.
+
+        Numeric features are cast to a C-ordered float32 matrix (nulls become NaN,
+        which CatBoost treats as missing), categorical features to an object matrix
+        of strings, see `_category_values`. Requires `set_feature_names` to have
+        been called.
+        """
+        num_data = None
+        if self.num_feature_names:
+            num_data = df.select(
+                pl.col(self.num_feature_names).cast(pl.Float32)
+            ).to_numpy(order="c")
+
+        cat_data = None
+        if self.cat_feature_names:
+            cat_data = np.column_stack(
+                [self._category_values(df[col]) for col in self.cat_feature_names]
+            )
+
+        features = FeaturesData(
+            num_feature_data=num_data,
+            cat_feature_data=cat_data,
+            num_feature_names=self.num_feature_names or None,
+            cat_feature_names=self.cat_feature_names or None,
+        )
+        return Pool(features, label=label)
+
+    @staticmethod
+    def _category_values(series: pl.Series) -> np.ndarray:
+        """Object array of the category strings of `series`, "None" for nulls.
+
+        The categories of an Enum column (see `compact_frame`) are looked up by
+        their codes, so the array holds one string object per category instead of
+        a new string per row, which is also faster for CatBoost to read. The pool
+        still gets the strings, so saved models score without the dictionary.
+        """
+        if isinstance(series.dtype, pl.Enum):
+            categories = np.array([*series.dtype.categories.to_list(), "None"], dtype=object)
+            codes = series.to_physical().fill_null(len(categories) - 1).to_numpy()
+            return categories[codes]
+        return series.cast(pl.String).fill_null("None").to_numpy()
+
     def split_train_test_pools(self, test_size=0.03, val_size=0.05) -> None:
+        with self.timer.stage("pool_build", *self.df_preds.shape):
+            if self.arrow_pools:
+                self._split_train_test_arrow_pools(test_size, val_size)
+            else:
+                self._split_train_test_pandas_pools(test_size, val_size)
+
+    def _split_train_test_pandas_pools(self, test_size: float, val_size: float) -> None:
+        from sklearn.model_selection import train_test_split
+
+        if isinstance(self.df_preds, pl.DataFrame):
+            raise ValueError("Polars data loaded. Split it with the Arrow pools instead.")
+
         # First split the full dataset including ticker
         X_temp_full, X_test_full, y_temp, self.y_test = train_test_split(
             self.df_preds.drop(self.pred_col, axis=1),  # Keep ticker here
@@ -141,6 +582,101 @@ class CatBoostTrainer:
             self.X_test, self.y_test, cat_features=self.categorical_features_indices
         )
 
+    def border_rows(self, test_size: float = 0.03, val_size: float = 0.05) -> pl.DataFrame:
+        """Feature columns of the rows the quantization borders are computed from.
+
+        These are the rows with a label for at least one horizon that no horizon
+        holds out for validation or testing. The split of a horizon only depends on
+        its labeled rows and the seed, so this is the same set of training rows for
+        every horizon: unlabeled rows and held-out rows don't shape the borders.
+        """
+        label_cols = [
+            col for col in sorted(self._all_exclude_cols)
+            if col.startswith("excess_return") and col in self.df_excess_returns.columns
+        ]
+        labeled = np.zeros(self.df_excess_returns.height, dtype=bool)
+        held_out = np.zeros(self.df_excess_returns.height, dtype=bool)
+        for label_col in label_cols:
+            label_rows = np.flatnonzero(self.df_excess_returns[label_col].is_not_null().to_numpy())
+            _, val_idx, test_idx = self._split_indices(len(label_rows), test_size, val_size)
+            labeled[label_rows] = True
+            held_out[label_rows[val_idx]] = True
+            held_out[label_rows[test_idx]] = True
+
+        return self.df_excess_returns.filter(pl.Series(labeled & ~held_out)).drop(
+            list(self._all_exclude_cols)
+        )
+
+    def quantization_borders(self, test_size: float = 0.03, val_size: float = 0.05) -> Path:
+        """Quantization borders of the training rows, shared across horizons.
+
+        The feature columns and the training rows of `border_rows` are the same for
+        every horizon, so the borders are computed once per fingerprint of those rows
+        (with CatBoost's default border settings, which `model_init` doesn't override).
+        """
+        if self.borders_cache is None:
+            raise ValueError("No borders_cache configured")
+
+        rows = self.border_rows(test_size, val_size)
+        self.set_feature_names(self.df_excess_returns)
+
+        def compute(path: Path) -> None:
+            pool = self.arrow_pool(rows)
+            pool.quantize()
+            pool.save_quantization_borders(str(path))
+
+        return self.borders_cache.borders(frame_fingerprint(rows), compute)
+
+    def _split_indices(
+        self, n_rows: int, test_size: float, val_size: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Train, validation and test row indices of `n_rows` rows.
+
+        `train_test_split` shuffles on the number of samples only, so splitting an
+        index array with the same seed selects exactly the same rows as the pandas
+        path.
+        """
+        from sklearn.model_selection import train_test_split
+
+        temp_idx, test_idx = train_test_split(
+            np.arange(n_rows), test_size=test_size, random_state=self.seed
+        )
+        train_idx, val_idx = train_test_split(
+            temp_idx, train_size=(1 - val_size), random_state=self.seed
+        )
+        return np.asarray(train_idx), np.asarray(val_idx), np.asarray(test_idx)
+
+    def _split_train_test_arrow_pools(self, test_size: float, val_size: float) -> None:
+        """Same splits as the pandas path, but done on row indices of the Polars frame."""
+        if not isinstance(self.df_preds, pl.DataFrame):
+            raise ValueError("No Polars data loaded. Run df_train_df() first.")
+
+        self.set_feature_names(self.df_preds)
+
+        train_idx, val_idx, test_idx = self._split_indices(
+            self.df_preds.height, test_size, val_size
+        )
+
+        df_test = self.df_preds[test_idx]
+        self.X_test = df_test.select(self.feature_names)
+        self.y_test = df_test[self.pred_col]
+
+        self.train_pool = self.arrow_pool(
+            self.df_preds[train_idx],
+            label=self.df_preds[self.pred_col].to_numpy()[train_idx],
+        )
+        if self.borders_cache is not None:
+            # Binning with precomputed borders skips the border search, the eval and
+            # test pools are binned by CatBoost with the same (model) borders
+            self.train_pool.quantize(
+                input_borders=str(self.quantization_borders(test_size, val_size))
+            )
+        self.eval_pool = self.arrow_pool(
+            self.df_preds[val_idx],
+            label=self.df_preds[self.pred_col].to_numpy()[val_idx],
+        )
+        self.test_pool = self.arrow_pool(df_test, label=self.y_test.to_numpy())
+
     def model_init(self) -> None:
         # TODO maybe: include model for excess_return_ln_6m, even though it overfits
         if self.pred_col == "excess_return_ln_6m":
@@ -172,22 +708,122 @@ class CatBoostTrainer:
             early_stopping_rounds=early_stopping_rounds,
             verbose=False,
             random_seed=self.seed,
+            thread_count=self.thread_count,
         )
 
-    def model_fit(self) -> None:
-        self.model.fit(
-            self.train_pool,
-            eval_set=self.eval_pool,
-            use_best_model=True,
-            verbose=100,
+    def snapshot_file(self, name: str | None = None) -> Path | None:
+        """Snapshot of the fit of this trainer's data, params and seed, if enabled.
+
+        Args:
+            name: Name of the fit, `pred_col` by default
+        """
+        if self.snapshot_dir is None:
+            return None
+        key = ModelCache(self.snapshot_dir).key(self.training_frame(), self._cache_params())
+        name = name or self.pred_col
+        return (self.snapshot_dir / f"{name}_seed={self.seed}_{key}.cbsnapshot").resolve()
+
+    def adopt_snapshot_seed(self, *names: str) -> bool:
+        """Adopt the seed of an interrupted fit of the same data and params, if any.
+
+        Prefers a snapshot of this trainer's seed, otherwise takes the oldest one's
+        seed, as `load_cached_model` does, so that a rerun without a fixed seed
+        resumes the fit. Requires `model_init` to have been called, and must precede
+        `split_train_test_pools`, whose split depends on the seed.
+
+        Args:
+            names: Names of the fits, `pred_col` by default
+
+        Returns: whether a snapshot was found
+        """
+        if self.snapshot_dir is None or not self.snapshot_dir.is_dir():
+            return False
+        key = ModelCache(self.snapshot_dir).key(self.training_frame(), self._cache_params())
+        snapshots = sorted(
+            (
+                path
+                for name in names or (self.pred_col,)
+                for path in self.snapshot_dir.glob(f"{name}_seed=*_{key}.cbsnapshot")
+            ),
+            key=lambda path: path.stat().st_mtime,
         )
+        seeds = [
+            int(path.name.removesuffix(f"_{key}.cbsnapshot").rsplit("_seed=", 1)[1])
+            for path in snapshots
+        ]
+        if not seeds:
+            return False
+
+        if self.seed not in seeds:
+            print(f"Adopting seed {seeds[0]} of an interrupted fit's snapshot")
+            self.seed = seeds[0]
+            self.model.set_params(random_seed=self.seed)
+        return True
+
+    def fit_with_snapshots(
+        self, model: CatBoostRegressor, pool: Pool, name: str | None = None
+    ) -> None:
+        """Fit `model` on `pool`, saving snapshots and resuming from one if enabled.
+
+        Once the fit succeeds, its snapshot is removed, along with the snapshots of
+        earlier interrupted fits of the same name and seed on other data.
+        """
+        snapshot = self.snapshot_file(name)
+        snapshot_params = {}
+        first_iteration = _FirstIteration()
+        if snapshot is not None:
+            snapshot.parent.mkdir(parents=True, exist_ok=True)
+            snapshot_params = {
+                "save_snapshot": True,
+                "snapshot_file": str(snapshot),
+                "snapshot_interval": self.snapshot_interval,
+                "callbacks": [first_iteration],
+            }
+
+        def fit() -> None:
+            model.fit(
+                pool,
+                eval_set=self.eval_pool,
+                use_best_model=True,
+                verbose=100,
+                **snapshot_params,
+            )
+
+        try:
+            fit()
+        except CatBoostError as error:
+            # E.g. a snapshot written before an upgrade or with other fit params
+            if snapshot is None or not snapshot.exists() or "snapshot" not in str(error):
+                raise
+            print(f"Can't resume from snapshot, fitting from scratch: {error}")
+            snapshot.unlink()
+            fit()
+
+        if snapshot is not None:
+            if (first_iteration.iteration or 1) > 1:
+                print(f"Resumed the fit at iteration {first_iteration.iteration}")
+                self.resumed_from_snapshot = True
+            prefix = snapshot.name.rsplit("_", 1)[0]
+            for path in snapshot.parent.glob(f"{prefix}_*.cbsnapshot*"):
+                path.unlink(missing_ok=True)
+
+    def model_fit(self) -> None:
+        from sklearn.metrics import mean_squared_error
+
+        with self.timer.stage(
+            "fit", self.train_pool.num_row(), self.train_pool.num_col()
+        ):
+            self.fit_with_snapshots(self.model, self.train_pool)
 
         # Get test set predictions
-        test_preds = self.model.predict(self.test_pool)
+        with self.timer.stage(
+            "predict", self.test_pool.num_row(), self.test_pool.num_col()
+        ):
+            test_preds = self.model.predict(self.test_pool)
         mean_preds = test_preds[:, 0]  # Get only mean predictions, not variance
-        self.test_rmse = np.sqrt(
+        self.test_rmse = np.float64(np.sqrt(
             mean_squared_error(self.test_pool.get_label(), mean_preds)
-        )
+        ))
         self.train_timestamp = datetime.now()
 
         print("\nOutcome variable:", self.pred_col)
@@ -198,52 +834,268 @@ class CatBoostTrainer:
         )
         print(f"Holdout test set RMSE: {self.test_rmse:.6f}")
 
-    def ticker_preds(self, ticker: str, since: str = "2019-01-01") -> pd.DataFrame:
-        """Get predictions for a single ticker."""
-        ticker = ticker.upper()
-        exclude_cols = ", ".join(self._model_exclude_cols)
-
-        df_preds = self.conn.query(f"""
-            select * exclude({exclude_cols})
-            from fundamentals.excess_returns
-            where ticker = '{ticker}' and date > '{since}'
-        """).df()
-
-        df_actual = self.conn.query(f"""
-            select date, {self.pred_col}
-            from fundamentals.excess_returns
-            where ticker = '{ticker}' and date > '{since}'
-        """).df()
-
-        preds = pd.DataFrame(self.model.predict(df_preds), columns=["mean", "var"])
-        df_out = (
-            pd.concat(
-                [
-                    preds,
-                    df_preds.reset_index(drop=True),
-                    df_actual.reset_index(drop=True),
-                ],
-                axis=1,
+    def _cache_params(self) -> dict:
+        return {
+            **self.model.get_params(),
+            "pred_col": self.pred_col,
+            "arrow_pools": self.arrow_pools,
+        }
+
+    def cache_key(self, cache: ModelCache) -> str:
+        """Cache key of this trainer's model, given its data and `model_init` params.
+
+        Only the training frame is fingerprinted, so e.g. new 36m labels don't
+        invalidate the cached 12m model.
+        """
+        return cache.key(self.training_frame(), self._cache_params())
+
+    def load_cached_model(self, cache: ModelCache, exact_seed: bool = False) -> bool:
+        """Load a model trained on the same data with the same params, if cached.
+
+        Prefers a model trained with this trainer's seed, otherwise takes the oldest
+        cached seed and adopts it, unless `exact_seed` is set (as for the members of
+        an ensemble). Requires `model_init` to have been called.
+
+        Returns: whether a cached model was loaded
+        """
+        key = self.cache_key(cache)
+        seeds = cache.seeds(key)
+        if not seeds or (exact_seed and self.seed not in seeds):
+            return False
+
+        seed = self.seed if self.seed in seeds else seeds[0]
+        cached = cache.load(key, seed)
+        if cached is None:
+            return False
+
+        self.model, metadata = cached
+        self.seed = seed
+        self.test_rmse = np.float64(metadata["test_rmse"])
+        self.categorical_features_indices = np.asarray(
+            metadata["categorical_features_indices"], dtype=int
+        )
+        if self.arrow_pools:
+            self.set_feature_names(self.df_excess_returns)
+            if self.feature_names != metadata["feature_names"]:
+                raise ValueError("Cached model was trained on other feature columns")
+        # Predictions from a cached model are stored as a training run of today
+        self.train_timestamp = datetime.now()
+
+        print(f"Loaded cached model for {self.pred_col} (seed {seed}, key {key})")
+        print(f"Holdout test set RMSE: {self.test_rmse:.6f}")
+        return True
+
+    def feature_manifest(self) -> FeatureManifest:
+        """What `Scorer` needs to score with the fitted model."""
+        if self.model.feature_names_ is None:
+            raise ValueError("No fitted model. Run model_fit() first.")
+        return FeatureManifest(
+            pred_col=self.pred_col,
+            feature_names=list(self.model.feature_names_),
+            categorical_features_indices=[
+                int(idx) for idx in self.categorical_features_indices
+            ],
+            excluded_columns=sorted(self._model_exclude_cols | {self.pred_col}),
+            categories=self.category_dictionary,
+        )
+
+    def save_scorer(self, directory: Path) -> Path:
+        """Save the fitted model and its feature manifest for `Scorer.load`.
+
+        Returns: the path of the model file
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        model_path = directory / f"{self.pred_col}.cbm"
+        self.model.save_model(str(model_path))
+        self.feature_manifest().save(model_path.with_suffix(".json"))
+        return model_path
+
+    def save_cached_model(self, cache: ModelCache) -> None:
+        """Store the fitted model in `cache`, with what's needed to score with it.
+
+        The metadata is also a feature manifest, see `Scorer.load`.
+        """
+        manifest = self.feature_manifest()
+        metadata = {
+            "pred_col": self.pred_col,
+            "test_rmse": float(self.test_rmse),
+            "categorical_features_indices": manifest.categorical_features_indices,
+            "feature_names": manifest.feature_names,
+            "excluded_columns": manifest.excluded_columns,
+            "categories": manifest.categories,
+            "best_iteration": int(self.model.get_best_iteration() or 0),
+            "train_timestamp": self.train_timestamp.isoformat(),
+        }
+        row_hashes = self.seen_row_hashes
+        if row_hashes is None:
+            row_hashes = self.training_row_hashes()
+        cache.save(
+            self.cache_key(cache),
+            self.seed,
+            self.model,
+            metadata,
+            row_hashes=row_hashes,
+            lineage=cache.lineage(self._cache_params()),
+        )
+
+    def _rows_pool(self, row_idx: np.ndarray | list[int]) -> Pool:
+        """Pool with labels of the given rows of `df_preds`."""
+        if isinstance(self.df_preds, pl.DataFrame):
+            rows = self.df_preds[row_idx]
+            return self.arrow_pool(rows, label=rows[self.pred_col].to_numpy())
+
+        rows = self.df_preds.iloc[row_idx]
+        X = rows.drop(columns=[self.pred_col, "ticker", "date"])
+        return Pool(
+            X, rows[self.pred_col], cat_features=self.categorical_features_indices
+        )
+
+    def _rmse(self, model: CatBoostRegressor, pool: Pool) -> float:
+        mean_preds = model.predict(pool)[:, 0]
+        return float(np.sqrt(np.mean((pool.get_label() - mean_preds) ** 2)))
+
+    def incremental_fit(
+        self,
+        cache: ModelCache,
+        iterations: int = 200,
+        min_new_rows: int = 20,
+        max_new_fraction: float = 0.2,
+        drift_tolerance: float = 0.25,
+        rmse_tolerance: float = 0.05,
+        holdout_size: float = 0.2,
+    ) -> dict:
+        """Continue training the latest cached model on new or changed rows only.
+
+        Rows are new when their hash is not among the rows the previous model has
+        seen. The previous model is
+        - reused as is when there are fewer than `min_new_rows` new rows,
+        - boosted `iterations` more trees (`init_model`) on the new rows otherwise,
+        and replaced by a full retrain (`split_train_test_pools` + `model_fit`) when
+        - there is no previous model for these params,
+        - more than `max_new_fraction` of the rows are new,
+        - its RMSE on the new rows is over (1 + `drift_tolerance`) times its test RMSE,
+        - or the warm-started model's RMSE on a holdout of the new rows is over
+          (1 + `rmse_tolerance`) times the previous test RMSE.
+        Requires `df_train_df` and `model_init` to have been called.
+
+        Returns: the decision, its reason, the number of new rows and the iterations
+            of the previous model and added in this run
+        """
+        from sklearn.model_selection import train_test_split
+
+        row_hashes = self.training_row_hashes()
+        outcome = {
+            "decision": "full",
+            "reason": "",
+            "new_rows": len(row_hashes),
+            "base_iterations": 0,
+            "added_iterations": 0,
+        }
+
+        latest = cache.latest(cache.lineage(self._cache_params()))
+        previous = cache.load(*latest) if latest is not None else None
+        seen_hashes = cache.load_row_hashes(*latest) if latest is not None else None
+        if previous is None or seen_hashes is None:
+            return self._full_fit(row_hashes, outcome, "no previous model")
+
+        previous_model, previous_metadata = previous
+        previous_rmse = previous_metadata["test_rmse"]
+        new_idx = np.flatnonzero(~np.isin(row_hashes, seen_hashes))
+        outcome["new_rows"] = len(new_idx)
+        outcome["base_iterations"] = previous_model.tree_count_
+
+        if len(new_idx) > max_new_fraction * len(row_hashes):
+            return self._full_fit(row_hashes, outcome, "too many new rows")
+
+        # Scoring needs the feature layout the previous model was trained with
+        if isinstance(self.df_preds, pl.DataFrame):
+            self.set_feature_names(self.df_preds)
+            if self.feature_names != previous_metadata["feature_names"]:
+                return self._full_fit(row_hashes, outcome, "feature columns changed")
+        else:
+            self.categorical_features_indices = np.asarray(
+                previous_metadata["categorical_features_indices"], dtype=int
             )
-            .assign(
-                predicted_excess_return=lambda df: np.exp(df["mean"]),
-                predicted_std=lambda df: np.sqrt(np.exp(2 * df["mean"]) * df["var"]),
-                actual_excess_return=lambda df: np.exp(df[self.pred_col]),
+
+        if len(new_idx) < min_new_rows:
+            self.model = previous_model
+            self.seed = previous_metadata["seed"]
+            self.test_rmse = np.float64(previous_rmse)
+            self.seen_row_hashes = seen_hashes
+            self.train_timestamp = datetime.now()
+            outcome.update(decision="reuse", reason="too few new rows")
+            return outcome
+
+        new_rmse = self._rmse(previous_model, self._rows_pool(new_idx))
+        if new_rmse > (1 + drift_tolerance) * previous_rmse:
+            return self._full_fit(
+                row_hashes, outcome, f"drift: RMSE on new rows {new_rmse:.4f}"
             )
-            .filter(
-                [
-                    "predicted_excess_return",
-                    "predicted_std",
-                    "ticker",
-                    "date",
-                    "actual_excess_return",
-                ]
+
+        temp_idx, holdout_idx = train_test_split(
+            new_idx, test_size=holdout_size, random_state=self.seed
+        )
+        train_idx, val_idx = train_test_split(
+            temp_idx, test_size=holdout_size, random_state=self.seed
+        )
+        self.test_pool = self._rows_pool(holdout_idx)
+
+        warm_model = CatBoostRegressor(
+            **{**self.model.get_params(), "iterations": iterations}
+        )
+        with self.timer.stage("pool_build", len(train_idx) + len(val_idx)):
+            train_pool = self._rows_pool(train_idx)
+            eval_pool = self._rows_pool(val_idx)
+        with self.timer.stage("fit", train_pool.num_row(), train_pool.num_col()):
+            warm_model.fit(
+                train_pool,
+                eval_set=eval_pool,
+                init_model=previous_model,
+                use_best_model=True,
+                verbose=100,
             )
-            .sort_values("date", ascending=False)
+        holdout_rmse = self._rmse(warm_model, self.test_pool)
+        if holdout_rmse > (1 + rmse_tolerance) * previous_rmse:
+            return self._full_fit(
+                row_hashes, outcome, f"holdout RMSE {holdout_rmse:.4f}"
+            )
+
+        self.model = warm_model
+        self.test_rmse = np.float64(holdout_rmse)
+        self.seen_row_hashes = np.union1d(seen_hashes, row_hashes)
+        self.train_timestamp = datetime.now()
+        outcome.update(
+            decision="warm_start",
+            reason=f"{len(new_idx)} new rows",
+            added_iterations=(warm_model.tree_count_ or 0) - (previous_model.tree_count_ or 0),
+        )
+        print(f"Warm-started {self.pred_col}: {outcome}")
+        print(f"Holdout test set RMSE (new rows): {self.test_rmse:.6f}")
+        return outcome
+
+    def _full_fit(self, row_hashes: np.ndarray, outcome: dict, reason: str) -> dict:
+        """Fall back to training from scratch on all rows."""
+        print(f"Full retrain of {self.pred_col}: {reason}")
+        self.split_train_test_pools()
+        self.model_fit()
+        self.seen_row_hashes = row_hashes
+        outcome.update(
+            decision="full", reason=reason, added_iterations=self.model.tree_count_
+        )
+        return outcome
+
+    def ticker_preds(self, ticker: str, since: str = "2019-01-01") -> pd.DataFrame:
+        """Get predictions for a single ticker. See `predict` for several tickers."""
+        return (
+            self.predict([ticker], since=since)
+            .filter(pl.col("date") > pl.lit(since).cast(pl.Date))
+            .to_pandas()
         )
-        return df_out
 
     def feature_importance_plot(self) -> None:
+        import matplotlib.pyplot as plt
+        import pandas as pd
+
         # TODO: consider making this plot denser in y-axis (smaller bars)
         feature_imp_df = pd.DataFrame(
             {
@@ -264,264 +1116,370 @@ class CatBoostTrainer:
         plt.show()
 
     def get_shap_values(self) -> None:
-        shap_values = self.model.get_feature_importance(
+        shap_values = np.asarray(self.model.get_feature_importance(
             data=self.test_pool,
             type=EFstrType.ShapValues,
             shap_mode="UsePreCalc",
             verbose=False,
-        )
+        ))
 
         # Remove variance column
-        if len(shap_values.shape) == 3:
+        if shap_values.ndim == 3:
             shap_values = shap_values[:, 0, :]
 
-        self.feature_names = self.X_test.columns
+        self.feature_names = list(self.X_test.columns)
         self.shap_values = shap_values
 
     def shap_beeswarm(self) -> None:
+        import shap
+
         if len(self.shap_values) == 0:
             self.get_shap_values()
 
         # Remove the bias term (last column)
         shap_values = self.shap_values[:, :-1]
+        x_test = self.X_test.to_numpy()
 
         # Print shapes for debugging
         print("SHAP values shape:", shap_values.shape)
-        print("X_eval shape:", self.X_test.values.shape)
+        print("X_eval shape:", x_test.shape)
         print("Number of feature names:", len(self.feature_names))
 
         explanation = shap.Explanation(
             values=shap_values,
             base_values=np.zeros(len(self.X_test)),
-            data=self.X_test.values,
+            data=x_test,
             feature_names=self.feature_names,
         )
 
         shap.plots.beeswarm(explanation, max_display=40)
 
-    def all_ticker_shaps(self, since: str | None = None) -> pl.DataFrame:
-        """Generate shap values and predictions FOR all tickers.
-        Results to be exported to DuckDB in a subsequent step in pipeline."""
+    def scoring_pool(self, df: pl.DataFrame) -> tuple[Pool, list[str]]:
+        """Build a Pool for scoring the rows of `df`, in the training column order.
 
-        # Load data using Polars
-        df_excess = self.df_excess_returns
+        Returns: the pool and its feature names
+        """
+        with self.timer.stage("pool_build", *df.shape):
+            if self.arrow_pools:
+                # Build the pool from the Arrow buffers, in the training column order
+                return self.arrow_pool(df), list(self.feature_names)
+
+            # Convert to pandas for compatibility with existing code
+            X = df.drop(
+                [col for col in self._model_exclude_cols | {self.pred_col} if col in df.columns]
+            ).to_pandas()
+            pool = Pool(X, cat_features=self.categorical_features_indices)
+            return pool, list(X.columns)
+
+    @property
+    def shap_calc_type(self) -> str:
+        """CatBoost's SHAP calculation type for `shap_mode`."""
+        return "Approximate" if self.shap_mode == "approximate" else "Regular"
+
+    def predict_with_shap(
+        self, pool: Pool
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Predict and explain all rows of `pool` in one pass each.
+
+        Returns: mean predictions, variance predictions and the SHAP matrix of the
+            mean prediction, with the bias term as its last column
+        """
+        with self.timer.stage("predict", pool.num_row(), pool.num_col()):
+            predictions = self.model.predict(pool)
+        mean_preds = predictions[:, 0]
+        var_preds = predictions[:, 1]
 
-        # Filter by date if provided
-        if since is not None:
-            df_excess = df_excess.filter(pl.col("date") >= since)
-            if df_excess.height == 0:
-                raise ValueError(f"No data found since {since}")
-        else:
-            # If no date, get latest record for each ticker
-            df_excess = (
-                df_excess.sort("date", descending=True).group_by("ticker").head(1)
-            )
+        # Calculate SHAP values
+        with self.timer.stage("shap", pool.num_row(), pool.num_col()):
+            shap_values = np.asarray(self.model.get_feature_importance(
+                data=pool,
+                type=EFstrType.ShapValues,
+                shap_mode="UsePreCalc",
+                shap_calc_type=self.shap_calc_type,
+                verbose=False,
+            ))
 
-        # Convert to pandas for compatibility with existing code
-        ticker_data = df_excess.to_pandas()
+        # Remove variance column if present
+        if len(shap_values.shape) == 3:
+            shap_values = shap_values[:, 0, :]
 
-        # Store metadata
-        dates = ticker_data["date"]
-        tickers = ticker_data["ticker"]
-        actual_values = ticker_data[self.pred_col]
+        return mean_preds, var_preds, shap_values
 
-        # Prepare features
-        X_ticker = ticker_data.drop(
-            columns=list(self._model_exclude_cols | {self.pred_col})
-        )
-        X_ticker = X_ticker
-        y_ticker = ticker_data[self.pred_col]
+    def select_rows(
+        self,
+        tickers: list[str],
+        since: str | None = None,
+        until: str | None = None,
+    ) -> pl.DataFrame:
+        """Select the rows of `tickers` within [since, until] from the loaded data.
 
-        # Create pool and get predictions
-        ticker_pool = Pool(
-            X_ticker, y_ticker, cat_features=self.categorical_features_indices
-        )
-        predictions = self.model.predict(ticker_pool)
+        If `since` is None, only the latest row (up to `until`) per ticker is kept.
+        """
+        tickers = [ticker.upper() for ticker in tickers]
+        df = self.df_excess_returns.filter(pl.col("ticker").is_in(tickers))
+        if df.height == 0:
+            raise ValueError(f"Tickers {tickers} not found in dataset")
+
+        if until is not None:
+            df = df.filter(pl.col("date") <= pl.lit(until).cast(pl.Date))
+
+        if since is not None:
+            df = df.filter(pl.col("date") >= pl.lit(since).cast(pl.Date))
+            if df.height == 0:
+                raise ValueError(f"No data found for {tickers} since {since}")
+        else:
+            # If no date provided, just get the latest record per ticker
+            df = df.sort("date", descending=True).group_by("ticker").head(1)
+
+        return df.sort(["ticker", "date"], descending=[False, True])
+
+    def predict(
+        self,
+        tickers: list[str],
+        since: str | None = None,
+        until: str | None = None,
+    ) -> pl.DataFrame:
+        """Get predictions for several tickers over a date range, scored in one pool."""
+        df = self.select_rows(tickers, since, until)
+        pool, _ = self.scoring_pool(df)
+        with self.timer.stage("predict", pool.num_row(), pool.num_col()):
+            predictions = self.model.predict(pool)
         mean_preds = predictions[:, 0]
         var_preds = predictions[:, 1]
 
-        # Calculate SHAP values
-        shap_values = self.model.get_feature_importance(
-            data=ticker_pool,
-            type=EFstrType.ShapValues,
-            shap_mode="UsePreCalc",
-            verbose=False,
+        return df.select(
+            pl.Series(
+                "predicted_excess_return", np.exp(mean_preds), dtype=pl.Float64
+            ),
+            pl.Series(
+                "predicted_std",
+                np.sqrt(np.exp(2 * mean_preds) * var_preds),
+                dtype=pl.Float64,
+            ),
+            pl.col("ticker"),
+            pl.col("date"),
+            pl.col(self.pred_col).exp().alias("actual_excess_return"),
         )
 
-        if len(shap_values.shape) == 3:
-            shap_values = shap_values[:, 0, :]
+    def explain(
+        self,
+        tickers: list[str],
+        since: str | None = None,
+        until: str | None = None,
+    ) -> pl.DataFrame:
+        """Predict and explain several tickers over a date range in one batch.
+
+        All rows are scored in a single pool with a single SHAP call, and the long
+        result (one row per date, ticker and feature) is assembled with NumPy, sorted
+        by date and ticker, then by descending |SHAP| within each prediction.
+        """
+        df = self.select_rows(tickers, since, until).sort(["date", "ticker"])
+        pool, feature_names = self.scoring_pool(df)
+        mean_preds, var_preds, shap_values = self.predict_with_shap(pool)
 
-        print(shap_values.shape)
+        n_samples = df.height
+        n_features = len(feature_names)
 
-        ## Create results for export
+        # Per-row feature order by descending |SHAP|
+        feature_shaps = shap_values[:, :-1]
+        order = np.argsort(-np.abs(feature_shaps), axis=1, kind="stable")
+        sorted_shaps = np.take_along_axis(feature_shaps, order, axis=1)
+        feature_values = df.select(pl.col(feature_names).cast(pl.String)).to_numpy()
+        sorted_values = np.take_along_axis(feature_values, order, axis=1)
+        sorted_features = np.asarray(feature_names, dtype=object)[order]
 
-        # Calculate repeated indices for features
-        n_samples = len(dates)
-        n_features = len(X_ticker.columns)
         sample_idx = np.repeat(np.arange(n_samples), n_features)
+        actual_values = df[self.pred_col].cast(pl.Float64).to_numpy()
 
-        # Convert Pandas Series to arrays before creating DataFrame
-        dates_array = dates.to_numpy()
-        tickers_array = tickers.to_numpy()
-        actual_values_array = actual_values.to_numpy()
-
-        # Simply convert all feature values to strings
-        feature_values = X_ticker.values.flatten().astype(str)
-
-        print("creating results df")
-
-        # Create base DataFrame
-        results = pl.DataFrame(
+        return pl.DataFrame(
             {
-                "date": pl.Series(dates_array[sample_idx], dtype=pl.Date),
-                "ticker": pl.Series(tickers_array[sample_idx], dtype=pl.Utf8),
-                "feature": pl.Series(
-                    np.tile(X_ticker.columns, n_samples), dtype=pl.Utf8
-                ),
-                "shap_value": pl.Series(
-                    shap_values[:, :-1].flatten(), dtype=pl.Float64
+                "date": df["date"].gather(sample_idx),
+                "ticker": df["ticker"].gather(sample_idx),
+                "feature": pl.Series(sorted_features.ravel(), dtype=pl.Utf8),
+                "shap_value": pl.Series(sorted_shaps.ravel(), dtype=pl.Float64),
+                "feature_value": pl.Series(sorted_values.ravel(), dtype=pl.Utf8),
+                "bias": pl.Series(shap_values[sample_idx, -1], dtype=pl.Float64),
+                "predicted_value_log": pl.Series(
+                    mean_preds[sample_idx], dtype=pl.Float64
                 ),
-                "feature_value": pl.Series(
-                    feature_values, dtype=pl.Utf8
-                ),  # All as strings
-                "bias": pl.Series(
-                    np.repeat(shap_values[:, -1], n_features), dtype=pl.Float64
+                "predicted_value": pl.Series(
+                    np.exp(mean_preds[sample_idx]), dtype=pl.Float64
                 ),
-                "predicted_value_log": pl.Series(
-                    np.repeat(mean_preds, n_features), dtype=pl.Float64
+                "predicted_std": pl.Series(
+                    np.sqrt(np.exp(2 * mean_preds) * var_preds)[sample_idx],
+                    dtype=pl.Float64,
                 ),
                 "actual_value_log": pl.Series(
-                    np.repeat(actual_values_array, n_features), dtype=pl.Float64
+                    actual_values[sample_idx], dtype=pl.Float64, nan_to_null=True
+                ),
+                "actual_value": pl.Series(
+                    np.exp(actual_values[sample_idx]),
+                    dtype=pl.Float64,
+                    nan_to_null=True,
                 ),
             }
         )
 
-        # Before the with_columns call, determine the date to use
-        # Then in with_columns, just use the pre-computed value
-        if self.cutoff_date is not None and re.match(r"^'?\d{4}-\d{2}-\d{2}'?$", self.cutoff_date):
-            date_str = re.search(r"(\d{4}-\d{2}-\d{2})", self.cutoff_date).group(1)
-            trained_date = pl.lit(date_str).cast(pl.Date)
-        else:
-            trained_date = pl.lit(self.train_timestamp.date().isoformat()).cast(pl.Date)
-
-        results = (
-            results
-            # First add var_preds as a column
-            .with_columns(pl.Series("var_preds", np.repeat(var_preds, n_features)))
-            # Then do all transformations using pure Polars
-            .with_columns(
-                [
-                    pl.col("predicted_value_log").exp().alias("predicted_value"),
-                    (pl.col("predicted_value_log").exp() * 2 * pl.col("var_preds"))
-                    .sqrt()
-                    .alias("predicted_std"),
-                    pl.when(pl.col("actual_value_log").is_not_null())
-                    .then(pl.col("actual_value_log").exp())
-                    .otherwise(None)
-                    .alias("actual_value"),
-                    pl.col("shap_value").abs().alias("abs_shap"),
-                    pl.lit(self.pred_col).alias("pred_col"),
-                    pl.lit(self.train_timestamp.isoformat())
-                    .cast(pl.Datetime)
-                    .alias("trained_at"),
-                    trained_date.alias("trained_date"),
-                ]
-            )
-            .drop("var_preds")  # Remove temporary column
-            .sort(["date", "ticker", "abs_shap"], descending=[False, False, True])
-            .drop("abs_shap")
-        )
-
-        return results
+    def all_ticker_shaps(self, since: str | None = None) -> pl.DataFrame:
+        """Generate shap values and predictions FOR all tickers.
+        Results to be exported to DuckDB in a subsequent step in pipeline.
 
-    def ticker_shap(self, ticker: str, since: str | None = None) -> pd.DataFrame:
-        ticker = ticker.upper()
+        Returns one row per (ticker, date) in the layout of `main.predictions_wide`:
+        `features` holds the feature names with numeric features first, and
+        `shap_values` is aligned with it. Feature values are kept typed, split into
+        `numeric_values` (the numeric prefix of `features`) and `categorical_values`
+        (the rest).
+        """
+        return self.explain_rows(self.scoring_rows(since))
 
-        # Use df_excess_returns instead of df_preds to get all dates
-        df_excess = self.df_excess_returns.to_pandas()
-        ticker_data = df_excess[df_excess["ticker"] == ticker].copy()
-        if len(ticker_data) == 0:
-            raise ValueError(f"Ticker {ticker} not found in dataset")
+    def iter_ticker_shaps(
+        self, since: str | None = None, chunk_tickers: int = DEFAULT_CHUNK_TICKERS
+    ) -> Iterator[pl.DataFrame]:
+        """`all_ticker_shaps` in chunks of `chunk_tickers` tickers, one at a time.
 
-        # Filter by date if since is provided
-        if since is not None:
-            ticker_data = ticker_data[ticker_data["date"] >= since]
-            if len(ticker_data) == 0:
-                raise ValueError(f"No data found for {ticker} since {since}")
-        else:
-            # If no date provided, just get the latest record
-            ticker_data = ticker_data.sort_values("date", ascending=False).head(1)
+        Only the pool, predictions, SHAP matrix and results of the current chunk are
+        held in memory. Chunks follow the ticker order, and rows within a chunk are
+        sorted by date and ticker. See `src.prediction_stream` for writing them out.
+        """
+        df_excess = self.scoring_rows(since)
+        tickers = df_excess["ticker"].unique().sort()
+        for offset in range(0, tickers.len(), chunk_tickers):
+            chunk = tickers.slice(offset, chunk_tickers)
+            yield self.explain_rows(df_excess.filter(pl.col("ticker").is_in(chunk.implode())))
 
-        # Store date and ticker before dropping them for the model
-        dates = ticker_data["date"]
-        tickers = ticker_data["ticker"]
-        actual_values = ticker_data[self.pred_col]
+    def explain_rows(self, df_excess: pl.DataFrame) -> pl.DataFrame:
+        """Predict and explain the rows of `df_excess`, in the `all_ticker_shaps` layout."""
+        ticker_pool, feature_names = self.scoring_pool(df_excess)
+        mean_preds, var_preds, shap_values = self.predict_with_shap(ticker_pool)
 
-        # Drop columns not used in model
-        X_ticker = ticker_data.drop(
-            columns=list(self._model_exclude_cols | {self.pred_col})
+        print(shap_values.shape)
+        return self.results_frame(
+            df_excess, feature_names, self.pred_col, mean_preds, var_preds, shap_values
         )
-        X_ticker = X_ticker
-        y_ticker = ticker_data[self.pred_col]
 
-        ticker_pool = Pool(
-            X_ticker, y_ticker, cat_features=self.categorical_features_indices
-        )
+    def scoring_rows(self, since: str | None = None) -> pl.DataFrame:
+        """Rows from `since` on, or the latest row per ticker, sorted by date and ticker."""
+        # Load data using Polars
+        df_excess = self.df_excess_returns
 
-        # Get predictions
-        predictions = self.model.predict(ticker_pool)
-        mean_preds = predictions[:, 0]  # Get mean predictions
-        var_preds = predictions[:, 1]  # Get variance predictions
+        # Filter by date if provided
+        if since is not None:
+            df_excess = df_excess.filter(pl.col("date") >= pl.lit(since).cast(pl.Date))
+            if df_excess.height == 0:
+                raise ValueError(f"No data found since {since}")
+        else:
+            # If no date, get latest record for each ticker
+            df_excess = (
+                df_excess.sort("date", descending=True).group_by("ticker").head(1)
+            )
+        return df_excess.sort(["date", "ticker"])
 
-        # Calculate SHAP values
-        shap_values = self.model.get_feature_importance(
-            data=ticker_pool,
-            type=EFstrType.ShapValues,
-            shap_mode="UsePreCalc",
-            verbose=False,
-        )
+    def results_frame(
+        self,
+        df_excess: pl.DataFrame,
+        feature_names: list[str],
+        pred_col: str,
+        mean_preds: np.ndarray,
+        var_preds: np.ndarray,
+        shap_values: np.ndarray,
+    ) -> pl.DataFrame:
+        """Assemble the `main.predictions_wide` rows of one horizon, see `all_ticker_shaps`.
+
+        Args:
+            shap_values: SHAP matrix of the mean prediction, bias as last column
+        """
+        ## Create results for export
+        print("creating results df")
+        with self.timer.stage("assemble") as stage:
+            # Reorder features as numeric first, then categorical, so that the typed
+            # value lists line up with the feature names
+            cat_idx = np.asarray(self.categorical_features_indices, dtype=int)
+            num_idx = np.setdiff1d(np.arange(len(feature_names)), cat_idx)
+            num_names = [feature_names[i] for i in num_idx]
+            cat_names = [feature_names[i] for i in cat_idx]
+            shap_ordered = shap_values[:, np.concatenate([num_idx, cat_idx])]
+
+            results = df_excess.select(
+                pl.col("date").cast(pl.Date),
+                pl.col("ticker").cast(pl.Utf8),
+                _list_columns(num_names, pl.Float64).alias("numeric_values"),
+                _list_columns(cat_names, pl.Utf8).alias("categorical_values"),
+                pl.col(pred_col).cast(pl.Float64).alias("actual_value_log"),
+            ).with_columns(
+                pl.Series("bias", shap_values[:, -1], dtype=pl.Float64),
+                pl.Series("predicted_value_log", mean_preds, dtype=pl.Float64),
+                pl.Series("var_preds", var_preds, dtype=pl.Float64),
+                pl.lit(pl.Series([num_names + cat_names], dtype=pl.List(pl.Utf8)))
+                .first()
+                .alias("features"),
+                pl.Series("shap_values", shap_ordered.astype(np.float32)).cast(
+                    pl.List(pl.Float32)
+                ),
+            )
 
-        # Remove variance column if present
-        if len(shap_values.shape) == 3:
-            shap_values = shap_values[:, 0, :]
+            # Before the with_columns call, determine the date to use
+            # Then in with_columns, just use the pre-computed value
+            if self.cutoff_date is not None and re.match(r"^'?\d{4}-\d{2}-\d{2}'?$", self.cutoff_date):
+                date_str = re.search(r"(\d{4}-\d{2}-\d{2})", self.cutoff_date).group(1)
+                trained_date = pl.lit(date_str).cast(pl.Date)
+            else:
+                trained_date = pl.lit(self.train_timestamp.date().isoformat()).cast(pl.Date)
+
+            results = (
+                results
+                # Do all transformations using pure Polars
+                .with_columns(
+                    [
+                        pl.col("predicted_value_log").exp().alias("predicted_value"),
+                        _predicted_std(
+                            pl.col("predicted_value_log"), pl.col("var_preds")
+                        ).alias("predicted_std"),
+                        pl.when(pl.col("actual_value_log").is_not_null())
+                        .then(pl.col("actual_value_log").exp())
+                        .otherwise(None)
+                        .alias("actual_value"),
+                        pl.lit(pred_col).alias("pred_col"),
+                        pl.lit(self.train_timestamp.isoformat())
+                        .cast(pl.Datetime)
+                        .alias("trained_at"),
+                        trained_date.alias("trained_date"),
+                    ]
+                )
+                .drop("var_preds")  # Remove temporary column
+                .select(PREDICTIONS_WIDE_COLUMNS)
+            )
+            if self.shap_mode == "top_k":
+                results = keep_top_k_shap(results, self.shap_top_k)
+            stage.rows, stage.cols = results.shape
 
-        print(shap_values.shape)
+        return results
 
-        # Create list to store results for each date
-        results = []
+    def ticker_shap(self, ticker: str, since: str | None = None) -> pd.DataFrame:
+        """Explain a single ticker. See `explain` for several tickers."""
+        import pandas as pd
 
-        for i in range(len(dates)):
-            # Create DataFrame for this date
-            row_data = pd.DataFrame(
+        final_df = (
+            self.explain([ticker], since=since)
+            .rename(
                 {
-                    "Date": dates.iloc[i],
-                    "Ticker": tickers.iloc[i],
-                    "Feature": X_ticker.columns,
-                    "SHAP Value": shap_values[i, :-1],
-                    "Feature Value": X_ticker.iloc[i].values,
-                    "Bias": shap_values[i, -1],
-                    "Predicted Value (log)": mean_preds[i],
-                    "Predicted Value": np.exp(mean_preds[i]),
-                    "Predicted Std": np.sqrt(np.exp(2 * mean_preds[i]) * var_preds[i]),
-                    "Actual Value (log)": actual_values.iloc[i],
-                    "Actual Value": np.exp(actual_values.iloc[i])
-                    if pd.notnull(actual_values.iloc[i])
-                    else None,
+                    "date": "Date",
+                    "ticker": "Ticker",
+                    "feature": "Feature",
+                    "shap_value": "SHAP Value",
+                    "feature_value": "Feature Value",
+                    "bias": "Bias",
+                    "predicted_value_log": "Predicted Value (log)",
+                    "predicted_value": "Predicted Value",
+                    "predicted_std": "Predicted Std",
+                    "actual_value_log": "Actual Value (log)",
+                    "actual_value": "Actual Value",
                 }
             )
-
-            # Sort by absolute SHAP values
-            row_data["Abs SHAP"] = row_data["SHAP Value"].abs()
-            row_data = row_data.sort_values("Abs SHAP", ascending=False)
-            row_data = row_data.drop("Abs SHAP", axis=1)
-
-            results.append(row_data)
-
-        # Combine all results
-        final_df = pd.concat(results, axis=0)
+            .to_pandas()
+        )
 
         # Print summary for the most recent date
-        latest_date = dates.max()
+        latest_date = final_df["Date"].max()
         latest_data = final_df[final_df["Date"] == latest_date].iloc[0]
         print(f"\nMost recent prediction ({latest_date}):")
         print(f"Bias (expected value): {latest_data['Bias']:0.4f}")
@@ -544,3 +1502,401 @@ class CatBoostTrainer:
         print()
 
         return final_df
+
+
+class MultiRMSETrainer(CatBoostTrainer):
+    """One MultiRMSE model for several horizons, instead of a model per horizon.
+
+    The model predicts all horizons from one set of trees, and a single SHAP call
+    explains all of them. MultiRMSE has no uncertainty output, so `predicted_std`
+    is based on the holdout MSE of each horizon instead of a per-row variance.
+
+    MultiRMSE doesn't allow missing labels, and the longer horizons lack labels for
+    the most recent rows. With `partial_labels`:
+    - "drop" trains on the rows with all labels only,
+    - "impute" also trains on rows with some labels, with the missing ones filled
+      in by a first model trained on the rows with all labels.
+    Early stopping and the holdout RMSE only use rows with all (real) labels.
+    Requires `arrow_pools`.
+    """
+
+    def __init__(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        df_excess_returns: pl.DataFrame,
+        pred_cols: list[str],
+        seed: int,
+        partial_labels: str = "drop",
+        **kwargs,
+    ) -> None:
+        if partial_labels not in ("drop", "impute"):
+            raise ValueError(f"Unknown partial_labels mode: {partial_labels}")
+        if not kwargs.get("arrow_pools", False):
+            raise ValueError("MultiRMSETrainer requires arrow_pools")
+        super().__init__(conn, df_excess_returns, pred_cols[0], seed, **kwargs)
+        self.pred_cols: list[str] = pred_cols
+        self.partial_labels: str = partial_labels
+        self.test_rmses: dict[str, float] = {}
+        # Holdout MSE per horizon, the variance used for `predicted_std`
+        self.residual_var: np.ndarray = np.array([])
+        self.train_rows: pl.DataFrame
+        self.train_labels: np.ndarray
+        # Holdout labels, one column per horizon
+        self.test_labels: pl.DataFrame
+
+    def training_frame(self) -> pl.DataFrame:
+        """Rows with all labels ("drop") or any label ("impute") of `pred_cols`."""
+        exclude_cols = self._all_exclude_cols.difference(self.pred_cols)
+        has_labels = pl.col(self.pred_cols).is_not_null()
+        return self.df_excess_returns.drop(list(exclude_cols)).filter(
+            pl.all_horizontal(has_labels)
+            if self.partial_labels == "drop"
+            else pl.any_horizontal(has_labels)
+        )
+
+    def labels(self, df: pl.DataFrame) -> np.ndarray:
+        """Label matrix of `df`, one column per horizon, NaN where missing."""
+        return df.select(pl.col(self.pred_cols).cast(pl.Float64)).to_numpy()
+
+    def split_train_test_pools(self, test_size=0.03, val_size=0.05) -> None:
+        from sklearn.model_selection import train_test_split
+
+        if not isinstance(self.df_preds, pl.DataFrame):
+            raise ValueError("No Polars data loaded. Run df_train_df() first.")
+
+        with self.timer.stage("pool_build", *self.df_preds.shape):
+            self.set_feature_names(self.df_preds)
+            labels = self.labels(self.df_preds)
+            complete = np.asarray(~np.isnan(labels).any(axis=1), dtype=bool)
+
+            row_idx = np.arange(self.df_preds.height)
+            temp_idx, test_idx = train_test_split(
+                row_idx, test_size=test_size, random_state=self.seed
+            )
+            train_idx, val_idx = train_test_split(
+                temp_idx, train_size=(1 - val_size), random_state=self.seed
+            )
+            test_idx = test_idx[complete[test_idx]]
+            val_idx = val_idx[complete[val_idx]]
+
+            df_test = self.df_preds[test_idx]
+            self.X_test = df_test.select(self.feature_names)
+            self.test_labels = df_test.select(self.pred_cols)
+
+            # With missing labels, the train pool is built by `model_fit`
+            self.train_rows = self.df_preds[train_idx]
+            self.train_labels = labels[train_idx]
+            if not np.isnan(self.train_labels).any():
+                self.train_pool = self.arrow_pool(self.train_rows, label=self.train_labels)
+            self.eval_pool = self.arrow_pool(self.df_preds[val_idx], label=labels[val_idx])
+            self.test_pool = self.arrow_pool(df_test, label=labels[test_idx])
+
+    def model_init(self) -> None:
+        super().model_init()
+        # MultiRMSE defaults to Bayesian bootstrap, which has no `subsample`
+        self.model.set_params(loss_function="MultiRMSE", bootstrap_type="Bernoulli")
+
+    def model_fit(self) -> None:
+        missing = np.isnan(self.train_labels)
+        if missing.any():
+            # Fill in the missing labels with a model of the rows with all labels
+            complete = np.asarray(~missing.any(axis=1), dtype=bool)
+            with self.timer.stage("pool_build", *self.train_rows.shape):
+                complete_pool = self.arrow_pool(
+                    self.train_rows.filter(pl.Series(complete)),
+                    label=self.train_labels[complete],
+                )
+                unlabelled_pool = self.arrow_pool(self.train_rows)
+            with self.timer.stage(
+                "fit", complete_pool.num_row(), complete_pool.num_col()
+            ):
+                first_model = self.model.copy()
+                self.fit_with_snapshots(
+                    first_model, complete_pool, name="multi_rmse_imputation"
+                )
+            imputed = first_model.predict(unlabelled_pool)
+            with self.timer.stage("pool_build", *self.train_rows.shape):
+                self.train_pool = self.arrow_pool(
+                    self.train_rows, label=np.where(missing, imputed, self.train_labels)
+                )
+
+        with self.timer.stage(
+            "fit", self.train_pool.num_row(), self.train_pool.num_col()
+        ):
+            self.fit_with_snapshots(self.model, self.train_pool, name="multi_rmse")
+
+        with self.timer.stage(
+            "predict", self.test_pool.num_row(), self.test_pool.num_col()
+        ):
+            test_preds = self.model.predict(self.test_pool)
+        residuals = self.test_pool.get_label() - test_preds
+        self.residual_var = np.mean(residuals**2, axis=0)
+        self.test_rmses = dict(zip(self.pred_cols, np.sqrt(self.residual_var).tolist()))
+        self.test_rmse = np.float64(np.mean(list(self.test_rmses.values())))
+        self.train_timestamp = datetime.now()
+
+        print("\nOutcome variables:", self.pred_cols)
+        print("Best iteration:", self.model.get_best_iteration())
+        print("Holdout test set RMSE per horizon:", self.test_rmses)
+
+    def predict_all_with_shap(
+        self, pool: Pool
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Predictions (rows x horizons) and SHAP values (rows x horizons x features+1)."""
+        with self.timer.stage("predict", pool.num_row(), pool.num_col()):
+            predictions = self.model.predict(pool)
+        with self.timer.stage("shap", pool.num_row(), pool.num_col()):
+            shap_values = np.asarray(self.model.get_feature_importance(
+                data=pool,
+                type=EFstrType.ShapValues,
+                shap_mode="UsePreCalc",
+                shap_calc_type=self.shap_calc_type,
+                verbose=False,
+            ))
+        return predictions.reshape(pool.num_row(), -1), shap_values
+
+    def explain_rows(self, df_excess: pl.DataFrame) -> pl.DataFrame:
+        """`CatBoostTrainer.explain_rows` for all horizons, from one SHAP call."""
+        ticker_pool, feature_names = self.scoring_pool(df_excess)
+        predictions, shap_values = self.predict_all_with_shap(ticker_pool)
+
+        return pl.concat(
+            [
+                self.results_frame(
+                    df_excess,
+                    feature_names,
+                    pred_col,
+                    predictions[:, i],
+                    np.full(df_excess.height, self.residual_var[i]),
+                    shap_values[:, i, :],
+                )
+                for i, pred_col in enumerate(self.pred_cols)
+            ]
+        )
+
+
+def train_horizon(
+    excess_returns: pl.DataFrame | Path,
+    pred_col: str,
+    seed: int,
+    database: str,
+    cutoff_date: str | None = None,
+    arrow_pools: bool = False,
+    catboost_threads: int = -1,
+    duckdb_threads: int = 1,
+    model_cache_dir: Path | None = None,
+    incremental: dict | None = None,
+    shared_borders: bool = False,
+    exact_seed: bool = False,
+    feature_subset: list[str] | None = None,
+    compact_dtypes: bool = False,
+    spool_dir: Path | None = None,
+    chunk_tickers: int = DEFAULT_CHUNK_TICKERS,
+    shap_mode: str = "exact",
+    shap_top_k: int = DEFAULT_SHAP_TOP_K,
+    snapshot_dir: Path | None = None,
+    snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL,
+) -> dict:
+    """Train, score and explain the model of one prediction horizon.
+
+    Defined at module level so it can be submitted to a process pool. Pass
+    `excess_returns` as the path of an (uncompressed) Arrow IPC file to have each
+    worker memory-map the same file instead of receiving a pickled copy.
+
+    With `model_cache_dir`, a model cached for the same data and params is loaded
+    instead of fitting a new one, and newly fitted models are added to the cache.
+    On a cache miss, `incremental` (the keyword arguments of
+    `CatBoostTrainer.incremental_fit`) warm-starts from the latest cached model.
+    `shared_borders` reuses the quantization borders cached for these training rows.
+    `exact_seed` only loads a cached model trained with `seed`, so that every
+    member of an ensemble is its own model. `feature_subset` restricts the model
+    features, see `CatBoostTrainer`. `compact_dtypes` keeps the frame as Float32
+    and Enum columns, with the category dictionary kept in the model cache.
+    With `spool_dir`, the results are spooled to an Arrow IPC file in chunks of
+    `chunk_tickers` tickers (see `src.prediction_stream`) instead of returned.
+    `shap_mode` and `shap_top_k` choose how predictions are explained, and
+    `snapshot_dir` resumes interrupted fits, see `CatBoostTrainer`, adopting the
+    seed of an interrupted fit unless `exact_seed` is set.
+
+    Returns: dict with the `all_ticker_shaps` results (None if spooled), the spool
+        file, the model's metadata and the cost of every stage (see `StageTimer`)
+    """
+    start = time.perf_counter()
+    timer = StageTimer()
+    if isinstance(excess_returns, Path):
+        with timer.stage("load") as stage:
+            # Memory-mapped, Polars' default for IPC files
+            excess_returns = pl.read_ipc(excess_returns)
+            stage.rows, stage.cols = excess_returns.shape
+
+    cache = ModelCache(model_cache_dir) if model_cache_dir is not None else None
+    if shared_borders and (cache is None or not arrow_pools):
+        raise ValueError("shared_borders requires model_cache_dir and arrow_pools")
+    if exact_seed and incremental is not None:
+        raise ValueError("incremental training continues a single seed, not exact_seed")
+
+    conn = duckdb.connect(
+        database=database,
+        read_only=database != ":memory:",
+        config={"threads": duckdb_threads},
+    )
+    try:
+        boost = CatBoostTrainer(
+            conn=conn,
+            df_excess_returns=excess_returns,
+            pred_col=pred_col,
+            seed=seed,
+            cutoff_date=cutoff_date,
+            arrow_pools=arrow_pools,
+            thread_count=catboost_threads,
+            borders_cache=cache if shared_borders else None,
+            timer=timer,
+            feature_subset=feature_subset,
+            compact_dtypes=compact_dtypes,
+            category_dictionary=(
+                cache.load_categories() if compact_dtypes and cache is not None else None
+            ),
+            shap_mode=shap_mode,
+            shap_top_k=shap_top_k,
+            snapshot_dir=snapshot_dir,
+            snapshot_interval=snapshot_interval,
+        )
+        if compact_dtypes and cache is not None:
+            cache.save_categories(boost.category_dictionary)
+        boost.df_train_df()
+        boost.model_init()
+        cache_hit = cache is not None and boost.load_cached_model(cache, exact_seed)
+        incremental_outcome = None
+        if not cache_hit:
+            if cache is not None and incremental is not None:
+                incremental_outcome = boost.incremental_fit(cache, **incremental)
+            else:
+                if not exact_seed:
+                    boost.adopt_snapshot_seed()
+                boost.split_train_test_pools()
+                boost.model_fit()
+            if cache is not None:
+                boost.save_cached_model(cache)
+        results, spool, spooled_rows = None, None, 0
+        if spool_dir is not None:
+            spool = spool_dir / f"{pred_col}_seed={seed}.arrow"
+            spooled_rows = spool_chunks(
+                boost.iter_ticker_shaps(chunk_tickers=chunk_tickers), {pred_col: spool}
+            )[pred_col]
+        else:
+            results = boost.all_ticker_shaps()
+    finally:
+        conn.close()
+
+    return {
+        "pred_col": pred_col,
+        "results": results,
+        "spool": spool,
+        "spooled_rows": spooled_rows,
+        "test_rmse": float(boost.test_rmse),
+        "seed": boost.seed,
+        "cache_hit": cache_hit,
+        "incremental": incremental_outcome,
+        "tree_count": int(boost.model.tree_count_ or 0),
+        "n_features": len(boost.model.feature_names_ or []),
+        "resumed_from_snapshot": boost.resumed_from_snapshot,
+        "train_timestamp": boost.train_timestamp,
+        "best_iteration": int(boost.model.get_best_iteration() or 0),
+        "catboost_threads": catboost_threads,
+        "duckdb_threads": duckdb_threads,
+        "wall_seconds": time.perf_counter() - start,
+        "stages": timer.to_dicts(),
+        "frame_mb": boost.df_excess_returns.estimated_size() / (1024 * 1024),
+        "memory_saved_mb": boost.memory_saved_mb,
+    }
+
+
+def train_multi_horizon(
+    excess_returns: pl.DataFrame | Path,
+    pred_cols: list[str],
+    seed: int,
+    cutoff_date: str | None = None,
+    catboost_threads: int = -1,
+    partial_labels: str = "drop",
+    feature_subset: list[str] | None = None,
+    compact_dtypes: bool = False,
+    spool_dir: Path | None = None,
+    chunk_tickers: int = DEFAULT_CHUNK_TICKERS,
+    shap_mode: str = "exact",
+    shap_top_k: int = DEFAULT_SHAP_TOP_K,
+    snapshot_dir: Path | None = None,
+    snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL,
+) -> list[dict]:
+    """Train one MultiRMSE model for all `pred_cols`, score and explain it.
+
+    The alternative to calling `train_horizon` per horizon, see `MultiRMSETrainer`.
+    With `spool_dir`, each horizon's results are spooled as in `train_horizon`.
+
+    Returns: a dict per horizon, with the same keys as `train_horizon`'s
+    """
+    start = time.perf_counter()
+    timer = StageTimer()
+    if isinstance(excess_returns, Path):
+        with timer.stage("load") as stage:
+            # Memory-mapped, Polars' default for IPC files
+            excess_returns = pl.read_ipc(excess_returns)
+            stage.rows, stage.cols = excess_returns.shape
+
+    with duckdb.connect(":memory:") as conn:
+        boost = MultiRMSETrainer(
+            conn=conn,
+            df_excess_returns=excess_returns,
+            pred_cols=pred_cols,
+            seed=seed,
+            partial_labels=partial_labels,
+            cutoff_date=cutoff_date,
+            arrow_pools=True,
+            thread_count=catboost_threads,
+            timer=timer,
+            feature_subset=feature_subset,
+            compact_dtypes=compact_dtypes,
+            shap_mode=shap_mode,
+            shap_top_k=shap_top_k,
+            snapshot_dir=snapshot_dir,
+            snapshot_interval=snapshot_interval,
+        )
+        boost.df_train_df()
+        boost.model_init()
+        boost.adopt_snapshot_seed("multi_rmse", "multi_rmse_imputation")
+        boost.split_train_test_pools()
+        boost.model_fit()
+        results, spools, spooled_rows = None, {}, dict.fromkeys(pred_cols, 0)
+        if spool_dir is not None:
+            spools = {pred_col: spool_dir / f"{pred_col}_seed={seed}.arrow" for pred_col in pred_cols}
+            spooled_rows = spool_chunks(boost.iter_ticker_shaps(chunk_tickers=chunk_tickers), spools)
+        else:
+            results = boost.all_ticker_shaps()
+    wall_seconds = time.perf_counter() - start
+
+    return [
+        {
+            "pred_col": pred_col,
+            "results": (
+                results.filter(pl.col("pred_col") == pred_col) if results is not None else None
+            ),
+            "spool": spools.get(pred_col),
+            "spooled_rows": spooled_rows[pred_col],
+            "test_rmse": boost.test_rmses[pred_col],
+            "seed": boost.seed,
+            "cache_hit": False,
+            "incremental": None,
+            "tree_count": int(boost.model.tree_count_ or 0),
+            "n_features": len(boost.feature_names),
+            "resumed_from_snapshot": boost.resumed_from_snapshot,
+            "train_timestamp": boost.train_timestamp,
+            "best_iteration": int(boost.model.get_best_iteration() or 0),
+            "catboost_threads": catboost_threads,
+            "duckdb_threads": 0,
+            # Shared by all horizons: one model, one run
+            "wall_seconds": wall_seconds,
+            "stages": timer.to_dicts(),
+            "frame_mb": boost.df_excess_returns.estimated_size() / (1024 * 1024),
+            "memory_saved_mb": boost.memory_saved_mb,
+        }
+        for pred_col in pred_cols
+    ]
@@ -1,11 +1,21 @@
+import os
 from os import environ
+import tempfile
+import time
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from dagster import (
     Definitions,
     asset,
-    resource,
+    multi_asset,
+    AssetOut,
+    in_process_executor,
     AssetExecutionContext,
+    AssetKey,
     Output,
     MetadataValue,
+    AssetSelection,
     TableColumn,
     TableSchema,
     define_asset_job,
@@ -15,75 +25,44 @@ import numpy as np
 import polars as pl
 import duckdb
 from pathlib import Path
-from src.catboost_trainer import CatBoostTrainer
+from typing import Iterator
+from src.duckdb_pool import PooledDuckDBResource
+from src.duckdb_writer import write_frame
+from src.polars_io_manager import PolarsArrowIOManager
+from src.instrumentation import summarize_stages, write_stages_jsonl
+from src.prediction_stream import append_predictions, read_spool
+from src.wide_statements import update_wide_statements
+
+# The trainer (CatBoost, sklearn, SHAP) is only imported by the assets that train,
+# so loading the code location and running the SQL assets doesn't pay for it.
+# See test_definitions_import_time.
 
 LOCAL = True if environ["APP_ENV"] == "dev" else False
 print(f"Running in {'local' if LOCAL else 'production'} mode")
 
-@resource(config_schema={"local": bool})
-def duckdb_resource(init_context):
-    local = init_context.resource_config["local"]
-    if local:
-        # Create a data directory if it doesn't exist
-        data_dir = Path("src")
-        data_dir.mkdir(exist_ok=True)
-        return {
-            "database": str(data_dir / "prod_copy_2024-11-08.db"),  # Local file-based database
-            "schema": "main",
-            "access_mode": "READ_WRITE",
-        }
-    else:
-        return {
-            "database": f"""md:{environ["APP_ENV"]}?motherduck_token={environ["MOTHERDUCK_TOKEN"]}""",
-            "schema": "main",
-        }
-
-
-def duckdb_query_polars(sql: str, db_config: dict[str, str]) -> pl.DataFrame:
-    """Query a DuckDB database and return the result as a Polars DataFrame """
-    con = duckdb.connect(database=db_config["database"], read_only=True)
-    try:
-        df = con.query(sql).pl()
-        return df
-    finally:
-        con.close()
-
-
-def duckdb_query(sql: str, db_config: dict[str, str]) -> None:
-    """Query a DuckDB database to create macros, views and tables"""
-    con = duckdb.connect(database=db_config["database"], read_only=False)
-    con.query(sql)
-    con.close()
-
-
-def write_table_duckdb(
-    table_name: str, df: pl.DataFrame, db_config: dict[str, str]
-) -> None:
-    df.write_database(
-        table_name=table_name,
-        connection=f"duckdb:///{db_config['database']}",
-        if_table_exists="replace",
-    )
+def query_duckdb_file(context: AssetExecutionContext, file: Path) -> None:
+    """Run a SQL file on the run's DuckDB connection, recording its latency as metadata."""
+    db = context.resources.duckdb
+    db.execute(file.read_text())
+    context.add_output_metadata(db.latency_metadata())
 
 
-def query_duckdb_file(file: Path, db_config: dict[str, str]) -> None:
-    sql = file.read_text()
-    duckdb_query(sql, db_config)
-
-
-@asset(required_resource_keys={"duckdb_config"})
+@asset(required_resource_keys={"duckdb"})
 def load_macros(context: AssetExecutionContext) -> None:
-    db_config = context.resources.duckdb_config
-    query_duckdb_file(Path("src/sql/macros.sql"), db_config)
+    query_duckdb_file(context, Path("src/sql/macros.sql"))
 
 
 @asset(
-    required_resource_keys={"duckdb_config"},
+    required_resource_keys={"duckdb"},
     deps=[load_macros],
-    config_schema={"cutoff_date": Field(str, is_required=False, default_value="current_date")}
+    config_schema={
+        "cutoff_date": Field(str, is_required=False, default_value="current_date"),
+        # Only recompute the tickers that changed since the last run, see src.wide_statements
+        "incremental": Field(bool, is_required=False, default_value=True),
+    }
 )
 def table_wide_statements(context: AssetExecutionContext) -> None:
-    db_config = context.resources.duckdb_config
+    db = context.resources.duckdb
 
     # Get the cutoff date from config, defaulting to current_date if not provided
     cutoff_date = context.op_config.get("cutoff_date", "current_date")
@@ -96,53 +75,54 @@ def table_wide_statements(context: AssetExecutionContext) -> None:
     if cutoff_date != "current_date" and not cutoff_date.startswith("'") and not cutoff_date.endswith("'"):
         cutoff_date = f"'{cutoff_date}'"
 
-    # Replace the parameter placeholder with the actual value
-    modified_sql = sql.replace("where date <= $cutoff_date", f"where date <= {cutoff_date}")
-
-    # Execute the modified SQL
-    conn = duckdb.connect(database=db_config["database"], read_only=False)
-    conn.execute(modified_sql)
-    conn.close()
+    with db.cursor() as cursor:
+        stats = update_wide_statements(
+            cursor, sql, cutoff_date, incremental=context.op_config.get("incremental", True)
+        )
+    context.add_output_metadata(
+        {
+            "mode": MetadataValue.text(stats.pop("mode")),
+            **{key: MetadataValue.int(value) for key, value in stats.items()},
+            **db.latency_metadata(),
+        }
+    )
 
 
 @asset(
-    required_resource_keys={"duckdb_config"},
+    required_resource_keys={"duckdb"},
     deps=[table_wide_statements],
 )
 def view_wide_with_daily_fundamentals(context: AssetExecutionContext) -> None:
-    db_config = context.resources.duckdb_config
-    query_duckdb_file(Path("src/sql/2_wide_with_daily_fundamentals.sql"), db_config)
+    query_duckdb_file(context, Path("src/sql/2_wide_with_daily_fundamentals.sql"))
 
 
 @asset(
-    required_resource_keys={"duckdb_config"},
+    required_resource_keys={"duckdb"},
     deps=[view_wide_with_daily_fundamentals]
 )
 def view_wide_with_combined_metrics(context: AssetExecutionContext) -> None:
-    db_config = context.resources.duckdb_config
-    query_duckdb_file(Path("src/sql/3_wide_with_combined_metrics.sql"), db_config)
+    query_duckdb_file(context, Path("src/sql/3_wide_with_combined_metrics.sql"))
 
 
 @asset(
-    required_resource_keys={"duckdb_config"},
+    required_resource_keys={"duckdb"},
     deps=[view_wide_with_combined_metrics]
 )
 def table_excess_returns(context: AssetExecutionContext) -> None:
-    db_config = context.resources.duckdb_config
-    query_duckdb_file(Path("src/sql/4_excess_returns.sql"), db_config)
+    query_duckdb_file(context, Path("src/sql/4_excess_returns.sql"))
 
 
 
 
 @asset(
-    required_resource_keys={"duckdb_config"},
+    required_resource_keys={"duckdb"},
     deps=[table_excess_returns]
 )
 def excess_returns(context: AssetExecutionContext) -> Output:
-    db_config = context.resources.duckdb_config
+    db = context.resources.duckdb
 
     # Be explicit about the schema
-    df = duckdb_query_polars("SELECT * FROM fundamentals.excess_returns", db_config)
+    df = db.query_polars("SELECT * FROM fundamentals.excess_returns")
 
     schema = [TableColumn(name=n, type=str(t)) for n, t in df.schema.items()]
     size_mb = df.estimated_size() / (1024 * 1024)
@@ -155,46 +135,616 @@ def excess_returns(context: AssetExecutionContext) -> Output:
             "dagster/column_schema": TableSchema(columns=schema),
             "preview": MetadataValue.md(df.head().to_pandas().to_markdown()),
             "size_mb": MetadataValue.float(round(size_mb, 2)),
+            **db.latency_metadata(),
         }
     )
 
 
-def _train_model_base(context: AssetExecutionContext, excess_returns: pl.DataFrame, pred_col: str) -> Output:
-    """Base training function used by all prediction column variants."""
-    db_config = context.resources.duckdb_config
+@asset(
+    required_resource_keys={"duckdb"},
+    deps=[load_macros],
+)
+def table_predictions(context: AssetExecutionContext) -> None:
+    """Create the columnar predictions table and its long-layout compatibility view."""
+    db = context.resources.duckdb
+    with db.cursor() as conn:
+        # main.predictions used to be the long table itself: keep its rows by
+        # renaming it, main.predictions becomes a view over both layouts.
+        table_type = conn.query("""
+            select table_type
+            from information_schema.tables
+            where table_schema = 'main' and table_name = 'predictions'
+        """).fetchone()
+        if table_type is not None and table_type[0] == "BASE TABLE":
+            context.log.info("Renaming main.predictions table to main.predictions_long")
+            conn.execute("alter table main.predictions rename to predictions_long")
+
+        conn.execute(Path("src/sql/predictions.sql").read_text())
+    context.add_output_metadata(db.latency_metadata())
+
+
+HORIZONS = {
+    "train_12m": "excess_return_ln_12m",
+    "train_24m": "excess_return_ln_24m",
+    "train_36m": "excess_return_ln_36m",
+}
+
+
+def split_cpu_budget(
+    cpu_budget: int, duckdb_threads: int, n_tasks: int
+) -> tuple[int, int]:
+    """Split a core budget over parallel training tasks.
+
+    Every worker gets `duckdb_threads` threads for its DuckDB connection, and the
+    remaining cores are shared evenly as CatBoost threads.
+
+    Returns: the number of worker processes and the CatBoost threads per worker
+    """
+    if cpu_budget < 1 or duckdb_threads < 1:
+        raise ValueError("cpu_budget and duckdb_threads must be at least 1")
+
+    # No more workers than there are tasks, or than the budget can give a core each
+    n_workers = max(1, min(n_tasks, cpu_budget // (duckdb_threads + 1)))
+    catboost_threads = max(1, (cpu_budget - n_workers * duckdb_threads) // n_workers)
+    return n_workers, catboost_threads
+
+
+def run_training_tasks(
+    tasks: list[dict], n_workers: int, catboost_threads: int, duckdb_threads: int
+) -> tuple[list[dict], float]:
+    """Run `train_horizon` for every task, in a process pool if `n_workers` > 1.
+
+    Returns: the results in task order and the wall time in seconds
+    """
+    from src.catboost_trainer import train_horizon
+
+    start = time.perf_counter()
+    kwargs = [
+        {
+            **task,
+            "catboost_threads": catboost_threads,
+            "duckdb_threads": duckdb_threads,
+        }
+        for task in tasks
+    ]
+
+    if n_workers == 1:
+        results = [train_horizon(**task_kwargs) for task_kwargs in kwargs]
+    else:
+        # Spawn, not fork: CatBoost's and DuckDB's thread pools don't survive a fork
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(train_horizon, **task_kwargs) for task_kwargs in kwargs
+            ]
+            results = [future.result() for future in futures]
+
+    return results, time.perf_counter() - start
+
+
+def combine_ensemble(members: list[dict], top_k: int | None = None) -> dict:
+    """Combine the `train_horizon` results of the seeds of one horizon.
+
+    Spooled results are combined chunk by chunk, see `append_spooled_results`.
+    Members are explained with exact SHAP values, as each seed has its own top
+    features: with `top_k`, the top-K features are kept after combining them.
+    """
+    from src.catboost_trainer import combine_seed_results, keep_top_k_shap
+
+    if len(members) == 1:
+        member = members[0]
+        return {**member, "seeds": [member["seed"]], "cached_seeds": int(member["cache_hit"])}
+
+    results = None
+    if members[0]["results"] is not None:
+        results = combine_seed_results([member["results"] for member in members])
+        if top_k is not None:
+            results = keep_top_k_shap(results, top_k)
+
+    return {
+        **members[0],
+        "results": results,
+        "spooled_rows": members[0]["spooled_rows"],
+        "test_rmse": float(np.mean([member["test_rmse"] for member in members])),
+        "seeds": [member["seed"] for member in members],
+        "cache_hit": all(member["cache_hit"] for member in members),
+        "resumed_from_snapshot": any(
+            member["resumed_from_snapshot"] for member in members
+        ),
+        "cached_seeds": sum(member["cache_hit"] for member in members),
+        "tree_count": sum(member["tree_count"] for member in members),
+        "best_iteration": int(np.mean([member["best_iteration"] for member in members])),
+        "wall_seconds": sum(member["wall_seconds"] for member in members),
+        "stages": [record for member in members for record in member["stages"]],
+    }
+
+
+def append_spooled_results(
+    results: list[dict], conn: duckdb.DuckDBPyConnection, top_k: int | None = None
+) -> dict[str, pl.Schema]:
+    """Append the spooled results of all horizons to `main.predictions_wide`.
+
+    Chunks are read one at a time, and the chunks of the seeds of an ensemble are
+    combined as they're read: every seed scores the same tickers in the same chunks.
+    `top_k` keeps the top-K features of combined chunks, see `combine_ensemble`.
+
+    Returns: the schema of the results of every horizon that had any
+    """
+    from src.catboost_trainer import combine_seed_results, keep_top_k_shap
+
+    schemas = {}
+
+    def chunks() -> Iterator[pl.DataFrame]:
+        for pred_col in HORIZONS.values():
+            spools = [
+                read_spool(result["spool"])
+                for result in results
+                if result["pred_col"] == pred_col
+            ]
+            for members in zip(*spools, strict=True):
+                chunk = combine_seed_results(list(members))
+                if top_k is not None and len(members) > 1:
+                    chunk = keep_top_k_shap(chunk, top_k)
+                schemas[pred_col] = chunk.schema
+                yield chunk
+
+    append_predictions(conn, chunks())
+    return schemas
+
+
+def excess_returns_ipc(
+    context: AssetExecutionContext, excess_returns: pl.DataFrame, tmp_dir: str
+) -> Path:
+    """An uncompressed IPC file of `excess_returns` for worker processes to memory-map:
+    the one the IO manager stored, or else a copy written to `tmp_dir`."""
+    io_manager = context.resources.io_manager
+    if isinstance(io_manager, PolarsArrowIOManager):
+        stored = io_manager.ipc_file(context.instance, AssetKey("excess_returns"))
+        if stored is not None:
+            return stored
+    ipc_path = Path(tmp_dir) / "excess_returns.arrow"
+    excess_returns.write_ipc(ipc_path, compression="uncompressed")
+    return ipc_path
+
+
+def markdown_table(df: pl.DataFrame, index: bool = True) -> str:
+    """`df` as a Markdown table, for Dagster metadata."""
+    return df.to_pandas().to_markdown(index=index) or ""
+
+
+def stage_metadata(records: list[dict]) -> dict:
+    """Dagster metadata of the per-stage cost of a training run, see `StageTimer`."""
+    summary = summarize_stages(records)
+    metadata = {}
+    for stage, totals in summary.items():
+        metadata[f"stage_{stage}_wall_seconds"] = MetadataValue.float(round(totals["wall_seconds"], 3))
+        metadata[f"stage_{stage}_cpu_seconds"] = MetadataValue.float(round(totals["cpu_seconds"], 3))
+        metadata[f"stage_{stage}_peak_rss_mb"] = MetadataValue.float(round(totals["peak_rss_mb"], 1))
+
+    table = pl.DataFrame(
+        [{"stage": stage, **totals} for stage, totals in summary.items()]
+    ).with_columns(pl.col("wall_seconds", "cpu_seconds", "peak_rss_mb").round(3))
+    metadata["stages"] = MetadataValue.md(markdown_table(table, index=False))
+    return metadata
+
+
+@multi_asset(
+    outs={name: AssetOut() for name in HORIZONS},
+    required_resource_keys={"duckdb", "io_manager"},
+    # Streamed results are appended to main.predictions_wide directly
+    deps=[table_predictions],
+    config_schema={
+        "cutoff_date": Field(str, is_required=False, default_value="current_date"),
+        "arrow_pools": Field(
+            bool,
+            is_required=False,
+            default_value=False,
+            description="Build the pools from the Polars frame without a pandas copy. "
+            "Orders the features numeric first and casts them to float32, so the "
+            "models differ from the pandas path's",
+        ),
+        "parallel": Field(bool, is_required=False, default_value=True),
+        "cpu_budget": Field(
+            int,
+            is_required=False,
+            description="Cores to use for training, defaults to all cores",
+        ),
+        "duckdb_threads": Field(int, is_required=False, default_value=1),
+        "compare_serial": Field(
+            bool,
+            is_required=False,
+            default_value=False,
+            description="Opt-in, as it doubles the training time: also train all "
+            "tasks serially after the parallel run, to report scheduler_speedup (serial "
+            "over parallel wall time). Without it only scheduler_task_overlap (summed "
+            "task wall time over elapsed wall time) is reported, an upper bound of the "
+            "speedup since parallel tasks share the cores",
+        ),
+        "model_cache": Field(bool, is_required=False, default_value=True),
+        "model_cache_dir": Field(
+            str,
+            is_required=False,
+            default_value="dagster/model_cache",
+            description="Kept between GitHub Actions runs with the Dagster state",
+        ),
+        "shared_borders": Field(
+            bool,
+            is_required=False,
+            default_value=False,
+            description="Compute quantization borders once for all horizons, from "
+            "their common training rows, instead of per model (with arrow_pools and "
+            "the model cache)",
+        ),
+        "incremental": Field(
+            bool,
+            is_required=False,
+            default_value=False,
+            description="Warm-start from the latest cached model on new rows only",
+        ),
+        "incremental_iterations": Field(int, is_required=False, default_value=200),
+        "incremental_max_new_fraction": Field(float, is_required=False, default_value=0.2),
+        "incremental_drift_tolerance": Field(float, is_required=False, default_value=0.25),
+        "incremental_rmse_tolerance": Field(float, is_required=False, default_value=0.05),
+        "stage_log": Field(
+            str,
+            is_required=False,
+            description="Append per-stage timings and memory to this JSON lines file",
+        ),
+        "ensemble_seeds": Field(
+            int,
+            is_required=False,
+            default_value=1,
+            description="Train seeds 0..N-1 per horizon and combine their predictions, "
+            "one random seed if 1",
+        ),
+        "feature_list": Field(
+            str,
+            is_required=False,
+            default_value="dagster/selected_features.json",
+            description="Features chosen by the feature_selection job, all features "
+            "if the file doesn't exist",
+        ),
+        "use_feature_list": Field(bool, is_required=False, default_value=True),
+        "compact_dtypes": Field(
+            bool,
+            is_required=False,
+            default_value=False,
+            description="Float32 features and Enum categoricals (with arrow_pools)",
+        ),
+        "engine": Field(
+            str,
+            is_required=False,
+            default_value="per_horizon",
+            description="per_horizon: a model per horizon, multi_rmse: one MultiRMSE "
+            "model for all horizons (compare them with src/engine_benchmark.py)",
+        ),
+        "partial_labels": Field(
+            str,
+            is_required=False,
+            default_value="drop",
+            description="multi_rmse: drop the rows without all labels, or impute "
+            "their missing labels",
+        ),
+        "stream_chunk_tickers": Field(
+            int,
+            is_required=False,
+            default_value=0,
+            description="Score in chunks of this many tickers and append the chunks "
+            "to main.predictions_wide as they come, instead of passing all results "
+            "on in memory. 0 to disable.",
+        ),
+        "shap_mode": Field(
+            str,
+            is_required=False,
+            default_value="exact",
+            description="exact, approximate (CatBoost's Approximate SHAP) or top_k "
+            "(exact, keeping the shap_top_k largest |SHAP| per row and summing the "
+            "rest into other_features)",
+        ),
+        "shap_top_k": Field(int, is_required=False, default_value=10),
+        "snapshots": Field(bool, is_required=False, default_value=True),
+        "snapshot_dir": Field(
+            str,
+            is_required=False,
+            default_value="dagster/snapshots",
+            description="Progress of fits interrupted by a cancelled or timed out run, "
+            "resumed by the next run. Kept between GitHub Actions runs with the "
+            "Dagster state.",
+        ),
+        "snapshot_interval": Field(
+            int, is_required=False, default_value=60, description="Seconds between snapshots"
+        ),
+    },
+)
+def train_models(context: AssetExecutionContext, excess_returns: pl.DataFrame):
+    """Train the models of all horizons, in parallel within a shared CPU budget."""
+    db = context.resources.duckdb
+    op_config = context.op_config
 
     # Get the cutoff date from the context if it was provided
-    cutoff_date = context.op_config.get("cutoff_date", None)
-
-    conn = duckdb.connect(database=db_config["database"], read_only=True)
-    seed = np.random.randint(0, 10)
-    boost = CatBoostTrainer(
-        conn=conn,
-        df_excess_returns=excess_returns,
-        pred_col=pred_col,
-        seed=seed,
-        cutoff_date=cutoff_date  # Pass the cutoff date to the trainer
+    cutoff_date = op_config.get("cutoff_date", None)
+    arrow_pools = op_config.get("arrow_pools", False)
+    cpu_budget = op_config.get("cpu_budget") or os.cpu_count() or 1
+    duckdb_threads = op_config.get("duckdb_threads", 1)
+    model_cache_dir = (
+        Path(op_config.get("model_cache_dir", "dagster/model_cache"))
+        if op_config.get("model_cache", True)
+        else None
+    )
+    shared_borders = (
+        op_config.get("shared_borders", False)
+        and arrow_pools
+        and model_cache_dir is not None
+    )
+    compact_dtypes = op_config.get("compact_dtypes", False) and arrow_pools
+    snapshot_dir = (
+        Path(op_config.get("snapshot_dir", "dagster/snapshots"))
+        if op_config.get("snapshots", True)
+        else None
     )
-    boost.df_train_df()
-    boost.split_train_test_pools()
-    boost.model_init()
-    boost.model_fit()
-    df = boost.all_ticker_shaps()
+    snapshot_interval = op_config.get("snapshot_interval", 60)
+    incremental = None
+    if op_config.get("incremental", False):
+        incremental = {
+            "iterations": op_config.get("incremental_iterations", 200),
+            "max_new_fraction": op_config.get("incremental_max_new_fraction", 0.2),
+            "drift_tolerance": op_config.get("incremental_drift_tolerance", 0.25),
+            "rmse_tolerance": op_config.get("incremental_rmse_tolerance", 0.05),
+        }
+
+    # Fixed ensemble seeds, so that a cached member is reused when seeds are added
+    ensemble_seeds = op_config.get("ensemble_seeds", 1)
+    if ensemble_seeds < 1:
+        raise ValueError("ensemble_seeds must be at least 1")
+    if ensemble_seeds > 1 and incremental is not None:
+        raise ValueError("incremental training doesn't support ensemble_seeds > 1")
+    seeds = (
+        list(range(ensemble_seeds))
+        if ensemble_seeds > 1
+        else [np.random.randint(0, 10)]
+    )
+
+    feature_subset = None
+    if op_config.get("use_feature_list", True):
+        from src.feature_selection import load_feature_list
+
+        feature_list_path = Path(
+            op_config.get("feature_list", "dagster/selected_features.json")
+        )
+        feature_subset = load_feature_list(feature_list_path)
+        if feature_subset is not None:
+            missing = set(feature_subset).difference(excess_returns.columns)
+            if missing:
+                context.log.warning(
+                    f"Selected features {sorted(missing)} no longer exist, "
+                    "training on all features"
+                )
+                feature_subset = None
+            else:
+                context.log.info(
+                    f"Training on {len(feature_subset)} features from {feature_list_path}"
+                )
+
+    engine = op_config.get("engine", "per_horizon")
+    if engine not in ("per_horizon", "multi_rmse"):
+        raise ValueError(f"Unknown engine: {engine}")
+    chunk_tickers = op_config.get("stream_chunk_tickers", 0)
+    schemas = {}
+    shap_mode = op_config.get("shap_mode", "exact")
+    shap_top_k = op_config.get("shap_top_k", 10)
+    # Ensemble members keep all features until they're combined
+    ensemble_top_k = shap_top_k if shap_mode == "top_k" and len(seeds) > 1 else None
+    member_shap_mode = "exact" if ensemble_top_k is not None else shap_mode
+
+    n_tasks = len(HORIZONS) * len(seeds)
+    n_workers, catboost_threads = split_cpu_budget(cpu_budget, duckdb_threads, n_tasks)
+    if not op_config.get("parallel", True) or engine == "multi_rmse":
+        n_workers, catboost_threads = 1, max(1, cpu_budget - duckdb_threads)
+
+    if engine == "multi_rmse":
+        from src.catboost_trainer import train_multi_horizon
+
+        if ensemble_seeds > 1 or incremental is not None:
+            raise ValueError("the multi_rmse engine doesn't support ensembles or incremental training")
+        context.log.info(
+            f"Training one MultiRMSE model for {len(HORIZONS)} horizons with "
+            f"{catboost_threads} CatBoost thread(s), without the model cache"
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = train_multi_horizon(
+                excess_returns,
+                list(HORIZONS.values()),
+                seed=seeds[0],
+                cutoff_date=cutoff_date,
+                catboost_threads=catboost_threads,
+                partial_labels=op_config.get("partial_labels", "drop"),
+                feature_subset=feature_subset,
+                compact_dtypes=compact_dtypes,
+                spool_dir=Path(tmp_dir) if chunk_tickers else None,
+                chunk_tickers=chunk_tickers,
+                shap_mode=shap_mode,
+                shap_top_k=shap_top_k,
+                snapshot_dir=snapshot_dir,
+                snapshot_interval=snapshot_interval,
+            )
+            if chunk_tickers:
+                with db.cursor() as conn:
+                    schemas = append_spooled_results(results, conn)
+        wall_seconds = task_seconds = results[0]["wall_seconds"]
+        serial_seconds = None
+    else:
+        context.log.info(
+            f"Training {len(HORIZONS)} horizons x {len(seeds)} seed(s) on {n_workers} "
+            f"worker(s) with {catboost_threads} CatBoost and {duckdb_threads} DuckDB "
+            "thread(s) each"
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Workers memory-map the same uncompressed IPC file instead of each
+            # receiving a pickled copy of the frame
+            ipc_path = excess_returns_ipc(context, excess_returns, tmp_dir)
+
+            tasks = [
+                {
+                    "excess_returns": ipc_path if n_workers > 1 else excess_returns,
+                    "pred_col": pred_col,
+                    "seed": seed,
+                    # The workers get the frame and don't query DuckDB, and the
+                    # run's connection holds the lock of a local database file
+                    "database": ":memory:",
+                    "cutoff_date": cutoff_date,
+                    "arrow_pools": arrow_pools,
+                    "model_cache_dir": model_cache_dir,
+                    "incremental": incremental,
+                    "shared_borders": shared_borders,
+                    "exact_seed": len(seeds) > 1,
+                    "feature_subset": feature_subset,
+                    "compact_dtypes": compact_dtypes,
+                    "spool_dir": Path(tmp_dir) if chunk_tickers else None,
+                    "chunk_tickers": chunk_tickers,
+                    "shap_mode": member_shap_mode,
+                    "shap_top_k": shap_top_k,
+                    "snapshot_dir": snapshot_dir,
+                    "snapshot_interval": snapshot_interval,
+                }
+                for pred_col in HORIZONS.values()
+                for seed in seeds
+            ]
+            results, wall_seconds = run_training_tasks(
+                tasks, n_workers, catboost_threads, duckdb_threads
+            )
+
+            # The sum of the task times over the wall time is how much the tasks
+            # overlapped, not a speedup: parallel tasks contend for the same cores,
+            # so each runs slower than it would alone
+            task_seconds = sum(result["wall_seconds"] for result in results)
+            serial_seconds = None
+            if op_config.get("compare_serial", False) and n_workers > 1:
+                # Without the model cache, which the parallel run just filled
+                serial_tasks = [
+                    {
+                        **task,
+                        "model_cache_dir": None,
+                        "incremental": None,
+                        "shared_borders": False,
+                        "spool_dir": None,
+                        "snapshot_dir": None,
+                    }
+                    for task in tasks
+                ]
+                _, serial_seconds = run_training_tasks(
+                    serial_tasks, 1, max(1, cpu_budget - duckdb_threads), duckdb_threads
+                )
+
+            if chunk_tickers:
+                with db.cursor() as conn:
+                    schemas = append_spooled_results(results, conn, ensemble_top_k)
+
+    scheduler_metadata = {
+        "scheduler_task_seconds": MetadataValue.float(round(task_seconds, 2)),
+        "scheduler_task_overlap": MetadataValue.float(
+            round(task_seconds / wall_seconds if wall_seconds > 0 else 1.0, 2)
+        ),
+    }
+    if serial_seconds is not None:
+        # Only a measured serial run gives the speedup over training serially
+        scheduler_metadata["scheduler_serial_seconds"] = MetadataValue.float(round(serial_seconds, 2))
+        scheduler_metadata["scheduler_speedup"] = MetadataValue.float(
+            round(serial_seconds / wall_seconds if wall_seconds > 0 else 1.0, 2)
+        )
+    duckdb_metadata = db.latency_metadata()
+
+    if op_config.get("stage_log"):
+        for result in results:
+            write_stages_jsonl(
+                Path(op_config["stage_log"]),
+                result["stages"],
+                run_id=context.run_id,
+                pred_col=result["pred_col"],
+                seed=result["seed"],
+                workers=n_workers,
+                catboost_threads=catboost_threads,
+            )
+
+    for output_name, pred_col in HORIZONS.items():
+        result = combine_ensemble(
+            [result for result in results if result["pred_col"] == pred_col],
+            ensemble_top_k,
+        )
+        df = result["results"]
+        if df is None:
+            # Already in main.predictions_wide: pass on no rows
+            df = pl.DataFrame(schema=schemas.get(pred_col))
+        schema = [TableColumn(name=n, type=str(t)) for n, t in df.schema.items()]
+        size_mb = df.estimated_size() / (1024 * 1024)
+
+        incremental_metadata = {}
+        if result["incremental"] is not None:
+            outcome = result["incremental"]
+            incremental_metadata = {
+                "incremental_decision": MetadataValue.text(outcome["decision"]),
+                "incremental_reason": MetadataValue.text(outcome["reason"]),
+                "incremental_new_rows": MetadataValue.int(int(outcome["new_rows"])),
+                "incremental_base_iterations": MetadataValue.int(int(outcome["base_iterations"])),
+                "incremental_added_iterations": MetadataValue.int(int(outcome["added_iterations"])),
+            }
+
+        yield Output(
+            value=df,
+            output_name=output_name,
+            metadata={
+                "model_test_rmse": MetadataValue.float(round(result["test_rmse"], 4)),
+                "model_seed": MetadataValue.int(int(result["seed"])),
+                "ensemble_seeds": MetadataValue.text(", ".join(str(seed) for seed in result["seeds"])),
+                "ensemble_cached_seeds": MetadataValue.int(int(result["cached_seeds"])),
+                "model_timestamp": MetadataValue.text(result["train_timestamp"].isoformat()),
+                "model_cutoff_date": MetadataValue.text(cutoff_date if cutoff_date else "current_date"),
+                "model_best_iteration": MetadataValue.int(result["best_iteration"]),
+                "model_engine": MetadataValue.text(engine),
+                "model_arrow_pools": MetadataValue.bool(arrow_pools),
+                "model_cache_hit": MetadataValue.bool(result["cache_hit"]),
+                "model_resumed_from_snapshot": MetadataValue.bool(result["resumed_from_snapshot"]),
+                "model_shared_borders": MetadataValue.bool(shared_borders),
+                "model_tree_count": MetadataValue.int(result["tree_count"]),
+                "model_features": MetadataValue.int(result["n_features"]),
+                "model_compact_dtypes": MetadataValue.bool(compact_dtypes),
+                "model_frame_mb": MetadataValue.float(round(result["frame_mb"], 2)),
+                "model_memory_saved_mb": MetadataValue.float(round(result["memory_saved_mb"], 2)),
+                "stream_chunk_tickers": MetadataValue.int(chunk_tickers),
+                "streamed_rows": MetadataValue.int(int(result["spooled_rows"])),
+                "shap_mode": MetadataValue.text(shap_mode),
+                "shap_top_k": MetadataValue.int(shap_top_k),
+                **incremental_metadata,
+                **stage_metadata(result["stages"]),
+                **duckdb_metadata,
+                "train_seconds": MetadataValue.float(round(result["wall_seconds"], 2)),
+                "scheduler_workers": MetadataValue.int(n_workers),
+                "scheduler_catboost_threads": MetadataValue.int(catboost_threads),
+                "scheduler_duckdb_threads": MetadataValue.int(duckdb_threads),
+                "scheduler_wall_seconds": MetadataValue.float(round(wall_seconds, 2)),
+                **scheduler_metadata,
+                "num_records": df.height,
+                "row_count": MetadataValue.int(df.height),
+                "column_schema": TableSchema(columns=schema),
+                "preview": MetadataValue.md(markdown_table(df.head())),
+                "size_mb": MetadataValue.float(round(size_mb, 2)),
+            },
+        )
 
+
+@asset
+def concat_results(train_12m: pl.DataFrame, train_24m: pl.DataFrame, train_36m: pl.DataFrame) -> Output:
+    df = pl.concat([train_12m, train_24m, train_36m])
     schema = [TableColumn(name=n, type=str(t)) for n, t in df.schema.items()]
     size_mb = df.estimated_size() / (1024 * 1024)
 
     return Output(
         value=df,
         metadata={
-            "model_test_rmse": MetadataValue.float(float(round(boost.test_rmse, 4))),
-            "model_seed": MetadataValue.int(seed),
-            "model_timestamp": MetadataValue.text(boost.train_timestamp.isoformat()),
-            "model_cutoff_date": MetadataValue.text(cutoff_date if cutoff_date else "current_date"),
-            "model_best_iteration": MetadataValue.int(int(boost.model.best_iteration_)),
             "num_records": df.height,
-            "row_count": MetadataValue.int(df.height),
-            "column_schema": TableSchema(columns=schema),
+            "dagster/row_count": MetadataValue.int(df.height),
+            "dagster/column_schema": TableSchema(columns=schema),
             "preview": MetadataValue.md(df.head().to_pandas().to_markdown()),
             "size_mb": MetadataValue.float(round(size_mb, 2)),
         }
@@ -202,68 +752,195 @@ def _train_model_base(context: AssetExecutionContext, excess_returns: pl.DataFra
 
 
 @asset(
-    required_resource_keys={"duckdb_config"},
-    config_schema={"cutoff_date": Field(str, is_required=False, default_value="current_date")}
+    required_resource_keys={"duckdb"},
+    deps=[table_predictions],
 )
-def train_12m(context: AssetExecutionContext, excess_returns: pl.DataFrame) -> Output:
-    return _train_model_base(context, excess_returns, "excess_return_ln_12m")
+def insert_into_duckdb(context: AssetExecutionContext, concat_results: pl.DataFrame) -> None:
+    if concat_results.is_empty():
+        context.log.info("No predictions to insert: train_models streamed them to DuckDB")
+        return
+
+    db = context.resources.duckdb
+    with db.cursor() as conn:
+        write_frame(conn, "main.predictions_wide", concat_results, mode="upsert")
+    context.add_output_metadata(db.latency_metadata())
 
-@asset(
-    required_resource_keys={"duckdb_config"},
-    config_schema={"cutoff_date": Field(str, is_required=False, default_value="current_date")}
-)
-def train_24m(context: AssetExecutionContext, excess_returns: pl.DataFrame) -> Output:
-    return _train_model_base(context, excess_returns, "excess_return_ln_24m")
 
 @asset(
-    required_resource_keys={"duckdb_config"},
-    config_schema={"cutoff_date": Field(str, is_required=False, default_value="current_date")}
+    required_resource_keys={"duckdb"},
+    deps=[insert_into_duckdb]
 )
-def train_36m(context: AssetExecutionContext, excess_returns: pl.DataFrame) -> Output:
-    return _train_model_base(context, excess_returns, "excess_return_ln_36m")
+def relevant_preds(context: AssetExecutionContext) -> None:
+    query_duckdb_file(context, Path("src/sql/relevant_preds.sql"))
 
 
-@asset
-def concat_results(train_12m: pl.DataFrame, train_24m: pl.DataFrame, train_36m: pl.DataFrame) -> Output:
-    df = pl.concat([train_12m, train_24m, train_36m])
-    schema = [TableColumn(name=n, type=str(t)) for n, t in df.schema.items()]
-    size_mb = df.estimated_size() / (1024 * 1024)
+@asset(
+    required_resource_keys={"duckdb", "io_manager"},
+    deps=[load_macros],
+    config_schema={
+        "cutoff_dates": Field(
+            [str],
+            is_required=False,
+            default_value=[],
+            description="Cutoff dates (YYYY-MM-DD), defaults to n_cutoffs quarterly cutoffs",
+        ),
+        "n_cutoffs": Field(int, is_required=False, default_value=8),
+        "cutoff_step_months": Field(int, is_required=False, default_value=3),
+        "horizons": Field(
+            [str], is_required=False, default_value=list(HORIZONS.values())
+        ),
+        "cpu_budget": Field(
+            int,
+            is_required=False,
+            description="Cores to use for training, defaults to all cores",
+        ),
+        "seed": Field(int, is_required=False, default_value=0),
+    },
+)
+def backtest_results(context: AssetExecutionContext, excess_returns: pl.DataFrame) -> Output:
+    """Walk-forward backtest: a model per cutoff date and horizon, scored against the realized returns."""
+    from src.backtest import backtest_summary, quarterly_cutoffs, run_backtest
+
+    db = context.resources.duckdb
+    op_config = context.op_config
+
+    last_date = excess_returns["date"].max()
+    if not isinstance(last_date, date):
+        raise ValueError("No excess returns to backtest on")
+    if op_config.get("cutoff_dates"):
+        cutoffs = sorted(date.fromisoformat(cutoff) for cutoff in op_config["cutoff_dates"])
+    else:
+        cutoffs = quarterly_cutoffs(
+            last_date,
+            op_config.get("n_cutoffs", 8),
+            op_config.get("cutoff_step_months", 3),
+        )
+    pred_cols = op_config.get("horizons", list(HORIZONS.values()))
+    cpu_budget = op_config.get("cpu_budget") or os.cpu_count() or 1
+
+    # No DuckDB connection in the workers: they only read the shared IPC file
+    n_workers, catboost_threads = split_cpu_budget(
+        cpu_budget, 1, len(cutoffs) * len(pred_cols)
+    )
+    context.log.info(
+        f"Backtesting {len(pred_cols)} horizon(s) at {len(cutoffs)} cutoff(s) on "
+        f"{n_workers} worker(s) with {catboost_threads} CatBoost thread(s) each"
+    )
 
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The feature table is built once, every task slices it at its cutoff
+        ipc_path = excess_returns_ipc(context, excess_returns, tmp_dir)
+        df = run_backtest(
+            ipc_path,
+            cutoffs,
+            pred_cols,
+            n_workers,
+            catboost_threads,
+            seed=op_config.get("seed", 0),
+        )
+    wall_seconds = time.perf_counter() - start
+
+    with db.cursor() as conn:
+        conn.execute(Path("src/sql/backtest_results.sql").read_text())
+        write_frame(conn, "main.backtest_results", df, mode="upsert")
+
+    summary = backtest_summary(df)
     return Output(
         value=df,
         metadata={
             "num_records": df.height,
             "dagster/row_count": MetadataValue.int(df.height),
-            "dagster/column_schema": TableSchema(columns=schema),
-            "preview": MetadataValue.md(df.head().to_pandas().to_markdown()),
-            "size_mb": MetadataValue.float(round(size_mb, 2)),
-        }
+            "cutoffs": MetadataValue.int(len(cutoffs)),
+            "scheduler_workers": MetadataValue.int(n_workers),
+            "scheduler_catboost_threads": MetadataValue.int(catboost_threads),
+            "scheduler_wall_seconds": MetadataValue.float(round(wall_seconds, 2)),
+            "summary": MetadataValue.md(markdown_table(summary)),
+            **db.latency_metadata(),
+        },
     )
 
 
-@asset(required_resource_keys={"duckdb_config"})
-def insert_into_duckdb(context: AssetExecutionContext, concat_results: pl.DataFrame) -> None:
-    db_config = context.resources.duckdb_config
-    conn = duckdb.connect(database=db_config["database"], read_only=False)
-
-    conn.query("""
-        insert or replace into main.predictions
-        select * from concat_results
-    """)
-
-
 @asset(
-    required_resource_keys={"duckdb_config"},
-    deps=[insert_into_duckdb]
+    config_schema={
+        "ks": Field(
+            [int],
+            is_required=False,
+            default_value=[10, 20, 40, 60],
+            description="Numbers of top features to evaluate",
+        ),
+        "rmse_tolerance": Field(
+            float,
+            is_required=False,
+            default_value=0.01,
+            description="Relative test RMSE increase allowed over all features",
+        ),
+        "feature_list": Field(
+            str, is_required=False, default_value="dagster/selected_features.json"
+        ),
+        "seed": Field(int, is_required=False, default_value=0),
+    },
 )
-def relevant_preds(context: AssetExecutionContext) -> None:
-    db_config = context.resources.duckdb_config
-    query_duckdb_file(Path("src/sql/relevant_preds.sql"), db_config)
+def feature_ranking(context: AssetExecutionContext, excess_returns: pl.DataFrame) -> Output:
+    """Rank features by mean |SHAP| across horizons and persist the smallest good top-K."""
+    from src.feature_selection import save_feature_list, select_features, tradeoff_summary
+
+    op_config = context.op_config
+    ranking, tradeoff, features = select_features(
+        excess_returns,
+        list(HORIZONS.values()),
+        ks=op_config.get("ks", [10, 20, 40, 60]),
+        seed=op_config.get("seed", 0),
+        rmse_tolerance=op_config.get("rmse_tolerance", 0.01),
+    )
+    summary = tradeoff_summary(tradeoff)
+
+    feature_list_path = Path(op_config.get("feature_list", "dagster/selected_features.json"))
+    save_feature_list(
+        feature_list_path,
+        features,
+        n_features_total=ranking.height,
+        rmse_tolerance=op_config.get("rmse_tolerance", 0.01),
+        tradeoff=summary.to_dicts(),
+    )
+    context.log.info(
+        f"Selected {len(features)} of {ranking.height} features, saved to {feature_list_path}"
+    )
+
+    return Output(
+        value=ranking,
+        metadata={
+            "selected_features": MetadataValue.int(len(features)),
+            "total_features": MetadataValue.int(ranking.height),
+            "feature_list": MetadataValue.path(str(feature_list_path)),
+            "tradeoff": MetadataValue.md(markdown_table(summary, index=False)),
+            "tradeoff_per_horizon": MetadataValue.md(
+                markdown_table(tradeoff.sort("k", "pred_col"), index=False)
+            ),
+            "ranking": MetadataValue.md(markdown_table(ranking.head(40), index=False)),
+        },
+    )
 
 
 ########## Dagster Job ##########
 
-catboost = define_asset_job(name="catboost")
+catboost = define_asset_job(
+    name="catboost",
+    selection=AssetSelection.all()
+    - AssetSelection.assets(backtest_results, feature_ranking),
+)
+
+# Builds the feature table once with all data up to today, then backtests on it
+backtest = define_asset_job(
+    name="backtest",
+    selection=AssetSelection.assets(backtest_results).upstream(),
+)
+
+# Chooses the features train_models uses from then on, run when features change
+feature_selection_job = define_asset_job(
+    name="feature_selection",
+    selection=AssetSelection.assets(feature_ranking).upstream(),
+)
 
 defs = Definitions(
     assets=[
@@ -273,15 +950,20 @@ defs = Definitions(
         view_wide_with_combined_metrics,
         table_excess_returns,
         excess_returns,
-        train_12m,
-        train_24m,
-        train_36m,
+        train_models,
         concat_results,
+        table_predictions,
         insert_into_duckdb,
         relevant_preds,
+        backtest_results,
+        feature_ranking,
     ],
     resources={
-        "duckdb_config": duckdb_resource.configured({"local": LOCAL})
+        "duckdb": PooledDuckDBResource(local=LOCAL),
+        # Frames between assets are memory-mapped Arrow IPC files, not pickles
+        "io_manager": PolarsArrowIOManager(),
     },
-    jobs=[catboost],
+    # Steps share the run's DuckDB connection, see src.duckdb_pool
+    executor=in_process_executor,
+    jobs=[catboost, backtest, feature_selection_job],
 )
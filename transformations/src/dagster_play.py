@@ -16,6 +16,8 @@ from dagster import (
 import polars as pl
 import duckdb
 
+from src.duckdb_writer import write_frame
+
 
 @resource
 def duckdb_resource(_):
@@ -35,11 +37,8 @@ def query_duckdb(sql: str, db_config: dict[str, str]) -> pl.DataFrame:
 def write_table_duckdb(
     table_name: str, df: pl.DataFrame, db_config: dict[str, str]
 ) -> None:
-    df.write_database(
-        table_name=table_name,
-        connection=f"duckdb:///{db_config['database']}",
-        if_table_exists="replace",
-    )
+    with duckdb.connect(database=db_config["database"]) as con:
+        write_frame(con, table_name, df, mode="replace")
 
 
 @asset(required_resource_keys={"duckdb_config"})
@@ -0,0 +1,114 @@
+"""A DuckDB connection shared by all assets of a Dagster run.
+
+Opening a connection to MotherDuck repeats the handshake and catalog sync, which
+is a large part of the wall time of the short SQL assets. `PooledDuckDBResource`
+opens one connection per run, on first use, and hands out cursors of it: DuckDB
+connections to the same database instance, which are cheap to create. Idle
+cursors are kept for reuse, up to `pool_size` of them.
+
+A DuckDB file can only be opened for writing by one process, so the jobs using
+this resource run their steps in-process, sharing the connection.
+"""
+
+import threading
+from contextlib import contextmanager
+from os import environ
+from pathlib import Path
+from typing import Iterator
+
+import duckdb
+import polars as pl
+from dagster import ConfigurableResource, InitResourceContext, MetadataValue
+from pydantic import PrivateAttr
+
+from src.instrumentation import StageTimer, summarize_stages
+
+# Local file-based database, e.g. one made by src/synthetic_data.py
+DEFAULT_LOCAL_DATABASE = "src/prod_copy_2024-11-08.db"
+
+
+class PooledDuckDBResource(ConfigurableResource):
+    """One DuckDB connection for the whole run, shared by the assets as cursors.
+
+    Connect and query latencies are recorded, see `latency_metadata`.
+    """
+
+    local: bool
+    pool_size: int = 4
+
+    _conn: duckdb.DuckDBPyConnection | None = PrivateAttr(default=None)
+    _idle: list[duckdb.DuckDBPyConnection] = PrivateAttr(default_factory=list)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _timer: StageTimer = PrivateAttr(default_factory=StageTimer)
+
+    @property
+    def database(self) -> str:
+        """Path of the local database file (`DUCKDB_PATH` if set), or the MotherDuck database."""
+        if self.local:
+            return environ.get("DUCKDB_PATH", DEFAULT_LOCAL_DATABASE)
+        return f"""md:{environ["APP_ENV"]}?motherduck_token={environ["MOTHERDUCK_TOKEN"]}"""
+
+    def teardown_after_execution(self, context: InitResourceContext) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for cursor in self._idle:
+                cursor.close()
+            self._idle.clear()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _acquire(self) -> duckdb.DuckDBPyConnection:
+        with self._lock:
+            if self._conn is None:
+                if self.local:
+                    Path(self.database).parent.mkdir(parents=True, exist_ok=True)
+                with self._timer.stage("duckdb_connect"):
+                    self._conn = duckdb.connect(database=self.database, read_only=False)
+            if self._idle:
+                return self._idle.pop()
+            return self._conn.cursor()
+
+    def _release(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            if self._conn is not None and len(self._idle) < self.pool_size:
+                self._idle.append(cursor)
+            else:
+                cursor.close()
+
+    @contextmanager
+    def cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """A cursor of the run's connection, connecting on first use. The time spent
+        in the block is recorded as a query."""
+        cursor = self._acquire()
+        try:
+            with self._timer.stage("duckdb_query"):
+                yield cursor
+        finally:
+            self._release(cursor)
+
+    def execute(self, sql: str) -> None:
+        """Run statements that create macros, views and tables."""
+        with self.cursor() as cursor:
+            cursor.execute(sql)
+
+    def query_polars(self, sql: str) -> pl.DataFrame:
+        """Query the database and return the result as a Polars DataFrame."""
+        with self.cursor() as cursor:
+            return cursor.query(sql).pl()
+
+    def latency_metadata(self) -> dict:
+        """Dagster metadata of the connect and query latencies recorded since the
+        last call, i.e. of the asset calling it."""
+        with self._lock:
+            summary = summarize_stages(self._timer.to_dicts())
+            self._timer.records.clear()
+        connect = summary.get("duckdb_connect", {"wall_seconds": 0.0})
+        query = summary.get("duckdb_query", {"wall_seconds": 0.0, "runs": 0})
+        return {
+            "duckdb_connect_seconds": MetadataValue.float(round(connect["wall_seconds"], 3)),
+            "duckdb_query_seconds": MetadataValue.float(round(query["wall_seconds"], 3)),
+            "duckdb_queries": MetadataValue.int(query["runs"]),
+        }
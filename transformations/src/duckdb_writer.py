@@ -0,0 +1,80 @@
+"""Bulk write Polars frames to DuckDB by registering them as Arrow tables.
+
+`pl.DataFrame.write_database` goes through duckdb-engine and SQLAlchemy, which
+insert the rows in batches of parameterized statements. Registering the frame's
+Arrow buffers on the connection lets DuckDB scan them directly instead, see
+`src.write_benchmark` for the difference.
+"""
+
+from typing import Iterable
+
+import duckdb
+import polars as pl
+import pyarrow as pa
+
+# replace: create or replace the table with the frame's schema
+# append: insert the rows, failing on a duplicate primary key
+# upsert: insert or replace the rows, on the primary key of the table
+WRITE_MODES = ("replace", "append", "upsert")
+DEFAULT_BATCH_ROWS = 1_000_000
+
+_FRAME_VIEW = "_write_frame"
+
+
+def write_batches(
+    conn: duckdb.DuckDBPyConnection,
+    table: str,
+    batches: Iterable[pl.DataFrame | pa.Table],
+    mode: str = "append",
+) -> int:
+    """Write batches of rows to `table` in one transaction, rolled back on an error.
+
+    Columns are matched by name. With mode `replace` the table is created from
+    the schema of the first batch, any other mode writes to an existing table.
+
+    Returns: number of rows written
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError(f"Unknown mode: {mode}, expected one of {list(WRITE_MODES)}")
+    # Batches after the first one of a replace are appended
+    insert = {"replace": "insert into", "append": "insert into", "upsert": "insert or replace into"}
+
+    rows = 0
+    conn.execute("begin transaction")
+    try:
+        for i, batch in enumerate(batches):
+            arrow = batch.to_arrow() if isinstance(batch, pl.DataFrame) else batch
+            conn.register(_FRAME_VIEW, arrow)
+            try:
+                if mode == "replace" and i == 0:
+                    conn.execute(f"create or replace table {table} as select * from {_FRAME_VIEW}")
+                else:
+                    conn.execute(f"{insert[mode]} {table} by name select * from {_FRAME_VIEW}")
+            finally:
+                conn.unregister(_FRAME_VIEW)
+            rows += arrow.num_rows
+    except Exception:
+        conn.execute("rollback")
+        raise
+    conn.execute("commit")
+    return rows
+
+
+def write_frame(
+    conn: duckdb.DuckDBPyConnection,
+    table: str,
+    df: pl.DataFrame,
+    mode: str = "append",
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> int:
+    """Write a frame to `table` in batches of `batch_rows` rows, in one transaction.
+
+    Batching bounds the memory DuckDB needs for a very large frame (the index
+    updates of an upsert in particular), without leaving a partial write behind.
+
+    Returns: number of rows written
+    """
+    if df.is_empty() and mode == "replace":
+        # Create the empty table with the frame's schema
+        return write_batches(conn, table, [df], mode)
+    return write_batches(conn, table, df.iter_slices(batch_rows), mode)
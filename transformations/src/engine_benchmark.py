@@ -0,0 +1,133 @@
+"""Benchmark the per-horizon models against a single MultiRMSE model.
+
+Both engines are trained on the same rows and evaluated on the same holdout: a
+sample of the rows with all labels, removed before training. Besides the holdout
+RMSE per horizon, the fit and SHAP times of training and explaining the latest row
+of every ticker (what `train_models` does) are recorded per engine.
+
+    APP_ENV=prod python -m src.engine_benchmark --database src/prod_copy.db
+"""
+
+import argparse
+import time
+
+import duckdb
+import numpy as np
+import polars as pl
+
+from src.catboost_trainer import CatBoostTrainer, MultiRMSETrainer
+from src.instrumentation import StageTimer, summarize_stages
+
+
+def _stage_seconds(timer: StageTimer, stage: str) -> float:
+    return summarize_stages(timer.to_dicts()).get(stage, {}).get("wall_seconds", 0.0)
+
+
+def _rmse(labels: np.ndarray, preds: np.ndarray) -> float:
+    return float(np.sqrt(np.mean((labels - preds) ** 2)))
+
+
+def split_holdout(
+    df: pl.DataFrame, pred_cols: list[str], holdout_fraction: float, seed: int
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Sample a holdout of the rows with all labels, and the rest of the rows."""
+    complete = df.filter(pl.all_horizontal(pl.col(pred_cols).is_not_null()))
+    holdout = complete.sample(fraction=holdout_fraction, seed=seed)
+    return df.join(holdout.select("ticker", "date"), on=["ticker", "date"], how="anti"), holdout
+
+
+def compare_engines(
+    df: pl.DataFrame,
+    pred_cols: list[str],
+    seed: int = 0,
+    thread_count: int = -1,
+    holdout_fraction: float = 0.1,
+    partial_labels: str = "impute",
+) -> pl.DataFrame:
+    """Holdout RMSE and cost of both engines, one row per engine and horizon."""
+    df_train, holdout = split_holdout(df, pred_cols, holdout_fraction, seed)
+    rows = []
+    with duckdb.connect(":memory:") as conn:
+        # One model per horizon, as train_models does by default
+        timer = StageTimer()
+        start = time.perf_counter()
+        holdout_rmses = {}
+        for pred_col in pred_cols:
+            trainer = CatBoostTrainer(
+                conn, df_train, pred_col, seed,
+                arrow_pools=True, thread_count=thread_count, timer=timer,
+            )
+            trainer.df_train_df()
+            trainer.split_train_test_pools()
+            trainer.model_init()
+            trainer.model_fit()
+            trainer.all_ticker_shaps()
+            pool, _ = trainer.scoring_pool(holdout)
+            holdout_rmses[pred_col] = _rmse(
+                holdout[pred_col].cast(pl.Float64).to_numpy(), trainer.model.predict(pool)[:, 0]
+            )
+        total_seconds = time.perf_counter() - start
+        for pred_col in pred_cols:
+            rows.append(
+                {
+                    "engine": "per_horizon",
+                    "pred_col": pred_col,
+                    "holdout_rmse": holdout_rmses[pred_col],
+                    "fit_seconds": _stage_seconds(timer, "fit"),
+                    "shap_seconds": _stage_seconds(timer, "shap"),
+                    "total_seconds": total_seconds,
+                }
+            )
+
+        # One model for all horizons
+        timer = StageTimer()
+        start = time.perf_counter()
+        trainer = MultiRMSETrainer(
+            conn, df_train, pred_cols, seed, partial_labels=partial_labels,
+            arrow_pools=True, thread_count=thread_count, timer=timer,
+        )
+        trainer.df_train_df()
+        trainer.split_train_test_pools()
+        trainer.model_init()
+        trainer.model_fit()
+        trainer.all_ticker_shaps()
+        pool, _ = trainer.scoring_pool(holdout)
+        predictions = trainer.model.predict(pool).reshape(holdout.height, -1)
+        total_seconds = time.perf_counter() - start
+        for i, pred_col in enumerate(pred_cols):
+            rows.append(
+                {
+                    "engine": f"multi_rmse_{partial_labels}",
+                    "pred_col": pred_col,
+                    "holdout_rmse": _rmse(
+                        holdout[pred_col].cast(pl.Float64).to_numpy(), predictions[:, i]
+                    ),
+                    "fit_seconds": _stage_seconds(timer, "fit"),
+                    "shap_seconds": _stage_seconds(timer, "shap"),
+                    "total_seconds": total_seconds,
+                }
+            )
+
+    return pl.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the per-horizon models against a single MultiRMSE model."
+    )
+    parser.add_argument("--database", required=True, help="DuckDB file with fundamentals.excess_returns")
+    parser.add_argument("--partial-labels", default="impute", choices=["drop", "impute"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with duckdb.connect(args.database, read_only=True) as db:
+        df_excess_returns = db.query("select * from fundamentals.excess_returns").pl()
+
+    result = compare_engines(
+        df_excess_returns,
+        ["excess_return_ln_12m", "excess_return_ln_24m", "excess_return_ln_36m"],
+        seed=args.seed,
+        partial_labels=args.partial_labels,
+    )
+    with pl.Config(tbl_rows=-1, tbl_cols=-1):
+        print(result)
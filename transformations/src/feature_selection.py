@@ -0,0 +1,187 @@
+"""Feature selection by mean |SHAP| across prediction horizons.
+
+A model is trained per horizon on all features, and the features are ranked by
+their mean absolute SHAP value. SHAP values are in log excess return units, which
+grow with the horizon, so each horizon's values are normalized to shares of its
+total before averaging over the horizons. Models are then retrained on the top-K
+features for several K, recording the holdout RMSE and fit time of each, and the
+smallest K within a tolerance of the all-features RMSE is chosen.
+
+The chosen features are saved as JSON and passed to `CatBoostTrainer` as
+`feature_subset`, so that the models, `all_ticker_shaps` and the predictions table
+only carry those features.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import polars as pl
+
+from src.catboost_trainer import CatBoostTrainer
+
+
+def _fit(
+    df: pl.DataFrame,
+    pred_col: str,
+    seed: int,
+    thread_count: int,
+    feature_subset: list[str] | None = None,
+) -> CatBoostTrainer:
+    trainer = CatBoostTrainer(
+        conn=duckdb.connect(":memory:"),
+        df_excess_returns=df,
+        pred_col=pred_col,
+        seed=seed,
+        arrow_pools=True,
+        thread_count=thread_count,
+        feature_subset=feature_subset,
+    )
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    return trainer
+
+
+def _fit_seconds(trainer: CatBoostTrainer) -> float:
+    return sum(
+        record.wall_seconds for record in trainer.timer.records if record.stage == "fit"
+    )
+
+
+def mean_abs_shap(trainer: CatBoostTrainer, sample_rows: int = 5000) -> pl.DataFrame:
+    """Mean |SHAP| per feature of a fitted trainer, over a sample of its training rows."""
+    df = trainer.df_preds
+    if not isinstance(df, pl.DataFrame):
+        raise ValueError("mean_abs_shap needs a trainer with arrow_pools")
+    if df.height > sample_rows:
+        df = df.sample(sample_rows, seed=trainer.seed)
+    pool, feature_names = trainer.scoring_pool(df)
+    _, _, shap_values = trainer.predict_with_shap(pool)
+
+    return pl.DataFrame(
+        {
+            "feature": feature_names,
+            # Without the bias term (last column)
+            "mean_abs_shap": np.abs(shap_values[:, :-1]).mean(axis=0),
+        }
+    )
+
+
+def rank_features(shaps: dict[str, pl.DataFrame]) -> pl.DataFrame:
+    """Rank features by their share of mean |SHAP|, averaged over the horizons.
+
+    Args:
+        shaps: `mean_abs_shap` per prediction column
+
+    Returns: one row per feature, most important first
+    """
+    shares = pl.concat(
+        [
+            df.with_columns(
+                (pl.col("mean_abs_shap") / pl.col("mean_abs_shap").sum())
+                .fill_nan(0.0)
+                .alias("shap_share"),
+                pl.lit(pred_col).alias("pred_col"),
+            )
+            for pred_col, df in shaps.items()
+        ]
+    )
+    return (
+        shares.group_by("feature")
+        .agg(pl.col("shap_share").mean())
+        .sort(["shap_share", "feature"], descending=[True, False])
+        .with_row_index("rank", offset=1)
+    )
+
+
+def select_features(
+    df: pl.DataFrame,
+    pred_cols: list[str],
+    ks: list[int],
+    seed: int = 0,
+    rmse_tolerance: float = 0.01,
+    thread_count: int = -1,
+    sample_rows: int = 5000,
+) -> tuple[pl.DataFrame, pl.DataFrame, list[str]]:
+    """Rank the features, evaluate the top-K for every K and choose the smallest K.
+
+    K is chosen as the smallest K whose mean test RMSE over the horizons is within
+    `rmse_tolerance` (relative) of the mean RMSE with all features.
+
+    Returns: the feature ranking, the trade-off table (one row per K and horizon,
+        with K = number of features for the all-features models) and the chosen
+        features, in rank order
+    """
+    shaps = {}
+    tradeoff = []
+    for pred_col in pred_cols:
+        trainer = _fit(df, pred_col, seed, thread_count)
+        shaps[pred_col] = mean_abs_shap(trainer, sample_rows)
+        tradeoff.append(
+            {
+                "k": len(trainer.feature_names),
+                "pred_col": pred_col,
+                "test_rmse": float(trainer.test_rmse),
+                "fit_seconds": _fit_seconds(trainer),
+            }
+        )
+    ranking = rank_features(shaps)
+    n_features = ranking.height
+
+    for k in sorted(set(ks)):
+        if k < 1 or k >= n_features:
+            continue
+        top_k = ranking["feature"].head(k).to_list()
+        for pred_col in pred_cols:
+            trainer = _fit(df, pred_col, seed, thread_count, feature_subset=top_k)
+            tradeoff.append(
+                {
+                    "k": k,
+                    "pred_col": pred_col,
+                    "test_rmse": float(trainer.test_rmse),
+                    "fit_seconds": _fit_seconds(trainer),
+                }
+            )
+
+    df_tradeoff = pl.DataFrame(tradeoff)
+    summary = tradeoff_summary(df_tradeoff)
+    full_rmse = summary.filter(pl.col("k") == n_features)["mean_test_rmse"][0]
+    chosen_k = summary.filter(
+        pl.col("mean_test_rmse") <= (1 + rmse_tolerance) * full_rmse
+    ).select(pl.col("k").min()).item()
+
+    return ranking, df_tradeoff, ranking["feature"].head(int(chosen_k)).to_list()
+
+
+def tradeoff_summary(tradeoff: pl.DataFrame) -> pl.DataFrame:
+    """Mean test RMSE and total fit time over the horizons, per K."""
+    return (
+        tradeoff.group_by("k")
+        .agg(
+            pl.col("test_rmse").mean().alias("mean_test_rmse"),
+            pl.col("fit_seconds").sum().alias("fit_seconds"),
+        )
+        .sort("k")
+    )
+
+
+def save_feature_list(path: Path, features: list[str], **metadata) -> None:
+    """Persist the chosen features, with e.g. the trade-off that led to them."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "features": features,
+        "selected_at": datetime.now().isoformat(),
+        **metadata,
+    }
+    path.write_text(json.dumps(payload, indent=2, default=str))
+
+
+def load_feature_list(path: Path) -> list[str] | None:
+    """The persisted feature list, None if no selection has been saved."""
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())["features"]
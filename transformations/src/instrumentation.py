@@ -0,0 +1,145 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process now, in MB. The peak so far where the
+    current RSS isn't available (outside Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return peak_rss_mb()
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RssSampler:
+    """Samples the RSS of this process in a background thread, to get the peak RSS
+    of a block of code rather than of the process so far.
+
+        with RssSampler() as sampler:
+            ...
+        sampler.peak_mb
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.start_mb: float = 0.0
+        self.peak_mb: float = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self) -> "RssSampler":
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+@dataclass
+class StageRecord:
+    """Cost of one run of a pipeline stage.
+
+    `cpu_seconds` is the CPU time of the whole process, summed over all its
+    threads, so with multi-threaded CatBoost it can exceed `wall_seconds`.
+    `start_rss_mb` is the RSS of the process when the stage started and
+    `peak_rss_mb` the highest RSS sampled while it ran, so `peak_rss_mb -
+    start_rss_mb` is the memory the stage itself needed.
+    """
+
+    stage: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    start_rss_mb: float = 0.0
+    peak_rss_mb: float = 0.0
+    rows: int | None = None
+    cols: int | None = None
+
+
+class StageTimer:
+    """Records wall time, CPU time, RSS at the start, peak RSS and data shape per
+    pipeline stage. The RSS is sampled by an `RssSampler` while the stage runs."""
+
+    def __init__(self) -> None:
+        self.records: list[StageRecord] = []
+
+    @contextmanager
+    def stage(
+        self, name: str, rows: int | None = None, cols: int | None = None
+    ) -> Iterator[StageRecord]:
+        """Time the block as stage `name`. Set `rows`/`cols` on the yielded record
+        if the shape is only known inside the block."""
+        record = StageRecord(stage=name, rows=rows, cols=cols)
+        sampler = RssSampler()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            with sampler:
+                yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            record.start_rss_mb = sampler.start_mb
+            record.peak_rss_mb = sampler.peak_mb
+            self.records.append(record)
+
+    def to_dicts(self) -> list[dict]:
+        """The records in the order the stages finished."""
+        return [asdict(record) for record in self.records]
+
+
+def summarize_stages(records: list[dict]) -> dict[str, dict]:
+    """Totals per stage name: summed times, max peak RSS and the largest shape."""
+    summary: dict[str, dict] = {}
+    for record in records:
+        stage = summary.setdefault(
+            record["stage"],
+            {
+                "runs": 0,
+                "wall_seconds": 0.0,
+                "cpu_seconds": 0.0,
+                "peak_rss_mb": 0.0,
+                "rows": None,
+                "cols": None,
+            },
+        )
+        stage["runs"] += 1
+        stage["wall_seconds"] += record["wall_seconds"]
+        stage["cpu_seconds"] += record["cpu_seconds"]
+        stage["peak_rss_mb"] = max(stage["peak_rss_mb"], record["peak_rss_mb"])
+        for dim in ("rows", "cols"):
+            if record[dim] is not None:
+                stage[dim] = max(stage[dim] or 0, record[dim])
+    return summary
+
+
+def write_stages_jsonl(path: Path, records: list[dict], **context) -> None:
+    """Append one JSON line per record to `path`, with `context` (run id, horizon,
+    ...) added to every line."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps({**context, **record}, default=str) + "\n")
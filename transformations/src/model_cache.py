@@ -0,0 +1,186 @@
+import fcntl
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import catboost
+import numpy as np
+import polars as pl
+from catboost import CatBoostRegressor
+
+# Parameters that don't change which model a training run produces, or that are
+# tracked per cache entry instead of in the key
+_NON_KEY_PARAMS = {"random_seed", "thread_count", "verbose"}
+
+
+def frame_fingerprint(df: pl.DataFrame) -> str:
+    """Fingerprint of a frame's schema and content, independent of row order.
+
+    Row hashes are sorted before hashing, since DuckDB gives no row order guarantee
+    for a `select *`. Polars' row hash is only stable within a Polars version, so
+    the version is part of the fingerprint.
+    """
+    digest = hashlib.sha256()
+    digest.update(pl.__version__.encode())
+    digest.update(repr(list(df.schema.items())).encode())
+    digest.update(str(df.height).encode())
+    row_hashes = np.sort(df.hash_rows(seed=0).to_numpy())
+    digest.update(row_hashes.tobytes())
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """Local content-addressed store of trained CatBoost models.
+
+    An entry is keyed by the fingerprint of the training frame and the model
+    parameters, and holds one model per random seed:
+
+        <cache_dir>/<key>/seed=<seed>.cbm       the model
+        <cache_dir>/<key>/seed=<seed>.json      test RMSE, feature indices, ...
+        <cache_dir>/<key>/seed=<seed>.rows.npy  hashes of the rows the model has seen
+
+    The latest model saved for a set of params, whatever the data, is tracked per
+    lineage in `<cache_dir>/latest/<lineage>.json`, as the starting point for
+    incremental training. Quantization borders, shared by the models of all
+    horizons, are stored per fingerprint of the training rows they're computed
+    from in `<cache_dir>/borders/`.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir: Path = cache_dir
+
+    @staticmethod
+    def _params_payload(params: dict) -> bytes:
+        key_params = {
+            name: value for name, value in params.items() if name not in _NON_KEY_PARAMS
+        }
+        payload = catboost.__version__ + json.dumps(key_params, sort_keys=True, default=str)
+        return payload.encode()
+
+    def key(self, df: pl.DataFrame, params: dict) -> str:
+        """Cache key of a model trained on `df` with `params`, across seeds."""
+        digest = hashlib.sha256(self._params_payload(params))
+        digest.update(frame_fingerprint(df).encode())
+        return digest.hexdigest()[:32]
+
+    def lineage(self, params: dict) -> str:
+        """Key of all models trained with `params`, across data and seeds."""
+        return hashlib.sha256(self._params_payload(params)).hexdigest()[:32]
+
+    def _paths(self, key: str, seed: int) -> tuple[Path, Path]:
+        entry_dir = self.cache_dir / key
+        return entry_dir / f"seed={seed}.cbm", entry_dir / f"seed={seed}.json"
+
+    def _rows_path(self, key: str, seed: int) -> Path:
+        return self.cache_dir / key / f"seed={seed}.rows.npy"
+
+    def seeds(self, key: str) -> list[int]:
+        """Seeds with a cached model for `key`, oldest first."""
+        entry_dir = self.cache_dir / key
+        if not entry_dir.is_dir():
+            return []
+        metadata_files = sorted(
+            entry_dir.glob("seed=*.json"), key=lambda path: path.stat().st_mtime
+        )
+        return [
+            int(path.stem.removeprefix("seed="))
+            for path in metadata_files
+            if path.with_suffix(".cbm").exists()
+        ]
+
+    def load(self, key: str, seed: int) -> tuple[CatBoostRegressor, dict] | None:
+        """Load the cached model and its metadata, None on a cache miss."""
+        model_path, metadata_path = self._paths(key, seed)
+        if not (model_path.exists() and metadata_path.exists()):
+            return None
+
+        model = CatBoostRegressor()
+        model.load_model(str(model_path))
+        metadata = json.loads(metadata_path.read_text())
+        return model, metadata
+
+    def load_row_hashes(self, key: str, seed: int) -> np.ndarray | None:
+        """Hashes of the rows the cached model has seen, None if not stored."""
+        rows_path = self._rows_path(key, seed)
+        if not rows_path.exists():
+            return None
+        return np.load(rows_path)
+
+    def latest(self, lineage: str) -> tuple[str, int] | None:
+        """Key and seed of the latest model saved for `lineage`, if still cached."""
+        pointer_path = self.cache_dir / "latest" / f"{lineage}.json"
+        if not pointer_path.exists():
+            return None
+        pointer = json.loads(pointer_path.read_text())
+        if pointer["seed"] not in self.seeds(pointer["key"]):
+            return None
+        return pointer["key"], pointer["seed"]
+
+    def save(
+        self,
+        key: str,
+        seed: int,
+        model: CatBoostRegressor,
+        metadata: dict,
+        row_hashes: np.ndarray | None = None,
+        lineage: str | None = None,
+    ) -> None:
+        """Store a trained model with its metadata under `key` and `seed`.
+
+        Args:
+            row_hashes: Hashes of the rows the model has seen, see `load_row_hashes`.
+            lineage: Also make this the latest model of `lineage`.
+        """
+        model_path, metadata_path = self._paths(key, seed)
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write the model first: an entry only counts once its metadata exists
+        model.save_model(str(model_path))
+        if row_hashes is not None:
+            np.save(self._rows_path(key, seed), np.sort(row_hashes))
+        metadata = {**metadata, "seed": seed, "cached_at": datetime.now().isoformat()}
+        metadata_path.write_text(json.dumps(metadata, indent=2, default=str))
+
+        if lineage is not None:
+            pointer_path = self.cache_dir / "latest" / f"{lineage}.json"
+            pointer_path.parent.mkdir(parents=True, exist_ok=True)
+            pointer_path.write_text(json.dumps({"key": key, "seed": seed}))
+
+    def load_categories(self) -> dict[str, list[str]]:
+        """Category dictionary of the compact dtype mode, empty if none saved yet."""
+        path = self.cache_dir / "categories.json"
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+
+    def save_categories(self, categories: dict[str, list[str]]) -> None:
+        """Save the (extended) category dictionary for the next runs."""
+        path = self.cache_dir / "categories.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Workers of one run write the same dictionary: replace the file atomically
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(categories, indent=2))
+        tmp_path.replace(path)
+
+    def borders(self, fingerprint: str, compute: Callable[[Path], None]) -> Path:
+        """Path of the quantization borders of `fingerprint`, computed at most once.
+
+        `compute` writes the borders to the path it's given. Concurrent callers, like
+        the workers training the horizons, wait on a file lock for the first one to
+        finish instead of computing the same borders in parallel.
+        """
+        borders_path = self.cache_dir / "borders" / f"{fingerprint[:32]}.tsv"
+        borders_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(borders_path.with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if not borders_path.exists():
+                tmp_path = borders_path.with_suffix(".tmp")
+                compute(tmp_path)
+                tmp_path.rename(borders_path)
+
+        return borders_path
+
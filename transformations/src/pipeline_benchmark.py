@@ -0,0 +1,215 @@
+"""Benchmark the SQL assets and trainer stages on synthetic data of several scales.
+
+Every scale is generated once with `src.synthetic_data` (and kept in the work
+directory), then the SQL of the `catboost` job (`1_wide_statements.sql` through
+`relevant_preds.sql`) and the stages of a `CatBoostTrainer` run against it, each
+timed with its peak RSS. Each scale runs in a fresh process, so the memory of one
+scale doesn't count towards the next.
+
+The results are appended to a JSON lines file and compared to a baseline of an
+earlier run on the same machine, a stage regresses when it is slower or uses
+more memory than the baseline by more than the tolerance. `APP_ENV` sets the
+number of CatBoost iterations, as in production:
+
+    APP_ENV=prod python -m src.pipeline_benchmark --scales 0.01 0.05 --update-baseline  # once
+    APP_ENV=prod python -m src.pipeline_benchmark --scales 0.01 0.05  # exits 1 on a regression
+"""
+
+import argparse
+import json
+import multiprocessing
+import shutil
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import duckdb
+import polars as pl
+
+from src.instrumentation import StageTimer, write_stages_jsonl
+from src.prediction_stream import append_predictions
+from src.synthetic_data import PRODUCTION_TICKERS, PRODUCTION_YEARS, generate
+from src.wide_statements import update_wide_statements
+
+SQL_DIR = Path(__file__).parent / "sql"
+# The SQL of the catboost job up to the training data, in the order it runs
+FEATURE_SQL = [
+    "macros.sql",
+    "1_wide_statements.sql",
+    "2_wide_with_daily_fundamentals.sql",
+    "3_wide_with_combined_metrics.sql",
+    "4_excess_returns.sql",
+]
+
+DEFAULT_SCALES = [0.01, 0.05]
+DEFAULT_PRED_COL = "excess_return_ln_12m"
+DEFAULT_TIME_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.25
+# Differences below these are noise, however large relative to the baseline
+MIN_SECONDS_DIFFERENCE = 0.5
+MIN_MB_DIFFERENCE = 50.0
+
+
+def benchmark_database(database: Path, pred_col: str = DEFAULT_PRED_COL, seed: int = 0) -> list[dict]:
+    """Run the SQL assets and the trainer stages on a synthetic `database`.
+
+    The tables the SQL creates are written to `database`.
+
+    Returns: one `StageTimer` record per stage, named `sql.<file>` or `trainer.<stage>`
+    """
+    # Imported here, like in the Dagster definitions, the SQL stages don't need it
+    from src.catboost_trainer import CatBoostTrainer
+
+    timer = StageTimer()
+    with duckdb.connect(str(database)) as conn:
+        for file in FEATURE_SQL:
+            sql = (SQL_DIR / file).read_text()
+            with timer.stage(f"sql.{file}"):
+                if file == "1_wide_statements.sql":
+                    # With main.rolling_stats, as the table_wide_statements asset builds it
+                    update_wide_statements(conn, sql, incremental=False)
+                else:
+                    conn.execute(sql)
+
+        with timer.stage("trainer.load"):
+            df_excess_returns = conn.query("select * from fundamentals.excess_returns").pl()
+        boost = CatBoostTrainer(
+            duckdb.connect(":memory:"), df_excess_returns, pred_col, seed, arrow_pools=True
+        )
+        for method in ["df_train_df", "split_train_test_pools", "model_init", "model_fit"]:
+            with timer.stage(f"trainer.{method}"):
+                getattr(boost, method)()
+        with timer.stage("trainer.all_ticker_shaps"):
+            results = boost.all_ticker_shaps()
+
+        with timer.stage("sql.predictions.sql"):
+            conn.execute((SQL_DIR / "predictions.sql").read_text())
+            append_predictions(conn, [results])
+        with timer.stage("sql.relevant_preds.sql"):
+            conn.execute((SQL_DIR / "relevant_preds.sql").read_text())
+
+    return timer.to_dicts()
+
+
+def run_scale(
+    scale: float,
+    work_dir: Path,
+    years: int = PRODUCTION_YEARS,
+    statement_density: float = 1.0,
+    seed: int = 0,
+    pred_col: str = DEFAULT_PRED_COL,
+) -> list[dict]:
+    """Benchmark a scale of the production size, generating its data if needed.
+
+    The generated tables are copied to a scratch database for every run, so that
+    the tables the SQL writes don't carry over to the next run.
+    """
+    n_tickers = max(round(PRODUCTION_TICKERS * scale), 1)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    source = work_dir / f"synthetic_tickers={n_tickers}_years={years}_density={statement_density}_seed={seed}.db"
+    if not source.exists():
+        partial = source.with_suffix(".partial")
+        partial.unlink(missing_ok=True)
+        generate(partial, n_tickers, years, statement_density, seed=seed, primary_keys=False)
+        partial.rename(source)
+
+    scratch = work_dir / "benchmark_run.db"
+    shutil.copyfile(source, scratch)
+    try:
+        return benchmark_database(scratch, pred_col, seed)
+    finally:
+        scratch.unlink(missing_ok=True)
+
+
+def load_baseline(path: Path) -> pl.DataFrame | None:
+    """The baseline records, None if there is no baseline yet."""
+    if not path.exists():
+        return None
+    return pl.DataFrame(json.loads(path.read_text()))
+
+
+def save_baseline(path: Path, records: list[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(records, indent=2, default=str))
+
+
+def compare_to_baseline(
+    records: list[dict],
+    baseline: pl.DataFrame,
+    time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+    memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE,
+) -> pl.DataFrame:
+    """Compare the wall time and peak RSS of every stage and scale to the baseline.
+
+    Returns: one row per stage and scale of `records`, with the baseline values
+        (null for stages without a baseline) and whether it regressed
+    """
+    current = pl.DataFrame(records).select("scale", "stage", "wall_seconds", "peak_rss_mb")
+    baseline = baseline.select(
+        "scale",
+        "stage",
+        pl.col("wall_seconds").alias("baseline_wall_seconds"),
+        pl.col("peak_rss_mb").alias("baseline_peak_rss_mb"),
+    )
+    seconds_diff = pl.col("wall_seconds") - pl.col("baseline_wall_seconds")
+    mb_diff = pl.col("peak_rss_mb") - pl.col("baseline_peak_rss_mb")
+    return (
+        current.join(baseline, on=["scale", "stage"], how="left")
+        .with_columns(
+            time_regressed=(
+                (pl.col("wall_seconds") > pl.col("baseline_wall_seconds") * (1 + time_tolerance))
+                & (seconds_diff > MIN_SECONDS_DIFFERENCE)
+            ).fill_null(False),
+            memory_regressed=(
+                (pl.col("peak_rss_mb") > pl.col("baseline_peak_rss_mb") * (1 + memory_tolerance))
+                & (mb_diff > MIN_MB_DIFFERENCE)
+            ).fill_null(False),
+        )
+        .with_columns(regressed=pl.col("time_regressed") | pl.col("memory_regressed"))
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the SQL assets and trainer stages on synthetic data of several scales."
+    )
+    parser.add_argument("--scales", type=float, nargs="+", default=DEFAULT_SCALES,
+                        help=f"Multiples of the production size of {PRODUCTION_TICKERS} tickers")
+    parser.add_argument("--years", type=int, default=PRODUCTION_YEARS)
+    parser.add_argument("--statement-density", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, default=Path("benchmarks/data"))
+    parser.add_argument("--results", type=Path, default=Path("benchmarks/results.jsonl"))
+    parser.add_argument("--baseline", type=Path, default=Path("benchmarks/baseline.json"))
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store this run as the baseline instead of comparing to it")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex
+    records = []
+    for scale in args.scales:
+        # A fresh process per scale, peak RSS never goes down within a process
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            scale_records = pool.submit(
+                run_scale, scale, args.work_dir, args.years, args.statement_density, args.seed
+            ).result()
+        records += [{"scale": scale, **record} for record in scale_records]
+        write_stages_jsonl(args.results, scale_records, run_id=run_id, scale=scale)
+
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline or baseline is None:
+        save_baseline(args.baseline, records)
+        print(f"Stored the baseline in {args.baseline}")
+        sys.exit(0)
+
+    comparison = compare_to_baseline(
+        records, baseline, args.time_tolerance, args.memory_tolerance
+    )
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=200, fmt_str_lengths=40):
+        print(comparison)
+    if comparison["regressed"].any():
+        print("Regressed:", comparison.filter("regressed")["stage"].to_list())
+        sys.exit(1)
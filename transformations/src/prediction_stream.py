@@ -0,0 +1,67 @@
+"""Stream predictions to `main.predictions_wide` in chunks of tickers.
+
+`CatBoostTrainer.iter_ticker_shaps` scores, explains and assembles the rows of a
+fixed number of tickers at a time. Training runs in worker processes, and a DuckDB
+file can only be opened for writing by one process, so the workers spool their
+chunks to Arrow IPC stream files, and the Dagster process appends the spooled
+chunks to DuckDB one at a time once the workers are done. Memory is then bounded
+by the chunk size on both sides, instead of by the number of tickers x features x
+horizons.
+"""
+
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import duckdb
+import polars as pl
+import pyarrow as pa
+
+from src.duckdb_writer import write_batches
+
+
+def spool_chunks(chunks: Iterable[pl.DataFrame], paths: dict[str, Path]) -> dict[str, int]:
+    """Write result chunks to one Arrow IPC stream file per `pred_col`.
+
+    Args:
+        chunks: `main.predictions_wide` rows, possibly of several horizons
+        paths: spool file per `pred_col` of the chunks
+
+    Returns: number of rows spooled per `pred_col`
+    """
+    writers: dict[str, pa.RecordBatchStreamWriter] = {}
+    rows = dict.fromkeys(paths, 0)
+    try:
+        for chunk in chunks:
+            for key, df in chunk.partition_by("pred_col", as_dict=True).items():
+                pred_col = str(key[0])
+                table = df.to_arrow()
+                if pred_col not in writers:
+                    writers[pred_col] = pa.ipc.new_stream(str(paths[pred_col]), table.schema)
+                writers[pred_col].write_table(table)
+                rows[pred_col] += df.height
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return rows
+
+
+def read_spool(path: Path) -> Iterator[pl.DataFrame]:
+    """The chunks of a spool file in the order they were written, one at a time."""
+    if not path.exists():
+        # Nothing was scored
+        return
+    with pa.OSFile(str(path), "rb") as source:
+        reader = pa.ipc.open_stream(source)
+        for batch in reader:
+            yield pl.DataFrame(batch)
+
+
+def append_predictions(conn: duckdb.DuckDBPyConnection, chunks: Iterable[pl.DataFrame]) -> int:
+    """Insert or replace chunks of rows into `main.predictions_wide`.
+
+    The chunks are written in one transaction, so a failed run leaves no partial
+    predictions behind.
+
+    Returns: number of rows written
+    """
+    return write_batches(conn, "main.predictions_wide", chunks, mode="upsert")
@@ -0,0 +1,171 @@
+"""Rolling price statistics per ticker and date, kept in main.rolling_stats.
+
+The `sma` and `index_volatility` macros evaluate a `row_number()` window and an
+avg or stddev window for every call, over the whole daily history, although
+1_wide_statements.sql only keeps one day per quarter. This table holds the
+statistics precomputed, and 1_wide_statements.sql joins them:
+
+- the SMAs of the adjusted close, over all rows of a ticker;
+- the volatility against the index and of the volume, over the rows
+  1_wide_statements.sql joins with the index and keeps (`in_subset`).
+
+Each window is evaluated once per partition, instead of once per macro call. An
+update only computes the rows of the tickers that changed, and for a ticker with
+new days it only reads the `LONGEST_WINDOW_ROWS` rows before them, which is all
+their windows reach back to.
+"""
+
+import duckdb
+
+TABLE = "main.rolling_stats"
+INDEX_TICKER = "SPY"
+# The longest window, 750 rows preceding
+LONGEST_WINDOW_ROWS = 750
+# Calendar days the rows of the longest window are looked for in, before falling
+# back to the ticker's whole history. Roughly twice the days of as many trading days.
+LOOKBACK_DAYS = 2 * LONGEST_WINDOW_ROWS
+
+_PRICES = f"""
+    select
+        da.ticker,
+        da.date,
+        da.adjClose,
+        da.adjVolume,
+        da.adjClose / idx.adjClose as index_ratio,
+        -- The rows 1_wide_statements.sql joins with the index and keeps
+        coalesce(
+            idx.date is not null and (
+                sut.assetType = 'Stock' and sut.exchange = 'NYSE'
+                or (sut.exchange = 'NASDAQ' and da.date >= '2002-10-01')
+            ),
+            false
+        ) as in_subset,
+    from main.daily_adjusted as da
+    {{join}}
+    left join main.daily_adjusted as idx
+        on idx.ticker = '{INDEX_TICKER}' and idx.date = da.date
+    left join main.selected_us_tickers as sut
+        on da.ticker = sut.ticker
+    where
+        da.date <= $cutoff_date
+        -- The index, and the tickers 1_wide_statements.sql keeps any rows of
+        and (
+            da.ticker = '{INDEX_TICKER}'
+            or sut.assetType = 'Stock' and sut.exchange = 'NYSE'
+            or sut.exchange = 'NASDAQ'
+        )
+"""
+
+_STATS = f"""
+    with prices as ({_PRICES})
+    select
+        ticker,
+        date,
+        in_subset,
+        if(row_number() over ticker_rows > 250, avg(adjClose) over ticker_12m, null) as SMA_12m,
+        if(row_number() over ticker_rows > 750, avg(adjClose) over ticker_36m, null) as SMA_36m,
+        if(in_subset and row_number() over subset_rows > 250, stddev(index_ratio) over subset_12m, null)
+            as volatility_12m,
+        if(in_subset and row_number() over subset_rows > 750, stddev(index_ratio) over subset_36m, null)
+            as volatility_36m,
+        if(in_subset and row_number() over subset_rows > 250, avg(adjVolume) over subset_12m, null)
+            as SMA_volume_12m,
+        if(in_subset, stddev(adjVolume) over subset_12m, null) / nullif(SMA_volume_12m, 0)
+            as volume_volatility_12m,
+    from prices
+    window
+        ticker_rows as (partition by ticker order by date),
+        ticker_12m as (partition by ticker order by date rows between 250 preceding and current row),
+        ticker_36m as (partition by ticker order by date rows between 750 preceding and current row),
+        subset_rows as (partition by ticker, in_subset order by date),
+        subset_12m as (partition by ticker, in_subset order by date rows between 250 preceding and current row),
+        subset_36m as (partition by ticker, in_subset order by date rows between 750 preceding and current row)
+"""
+
+# Per changed ticker, the first price row the windows of its new rows reach back
+# to: the earlier of the LONGEST_WINDOW_ROWS-th row and subset row before them.
+# Null to read all of them, if they aren't within LOOKBACK_DAYS.
+_STARTS = f"""
+    create or replace temp table _rs_starts as
+    with prices as ({_PRICES.format(join='''
+        join {changed} as c
+            on da.ticker = c.ticker
+            and da.date <= c.since
+            and da.date > c.since - {lookback_days}
+    ''')}), ranked as (
+        select
+            ticker,
+            date,
+            in_subset,
+            row_number() over (partition by ticker order by date desc) as n,
+            row_number() over (partition by ticker, in_subset order by date desc) as n_subset,
+        from prices
+    ), lookback as (
+        select
+            ticker,
+            count(*) as n_rows,
+            count(*) filter (where in_subset) as n_subset_rows,
+            any_value(date) filter (where n = {{longest}}) as start_date,
+            any_value(date) filter (where in_subset and n_subset = {{longest}}) as subset_start_date,
+        from ranked
+        group by ticker
+    )
+    select
+        c.ticker,
+        c.since,
+        case
+            when c.since is null or lookback.ticker is null then null
+            when lookback.n_rows < {{longest}} then null
+            when lookback.n_subset_rows between 1 and {{longest}} - 1 then null
+            else least(lookback.start_date, coalesce(lookback.subset_start_date, lookback.start_date))
+        end as start_date,
+    from {{changed}} as c
+    left join lookback
+        using (ticker)
+"""
+
+
+def update_rolling_stats(
+    conn: duckdb.DuckDBPyConnection,
+    cutoff_date: str = "current_date",
+    changed: str | None = None,
+) -> int:
+    """Compute the rolling statistics of the prices up to `cutoff_date`, a SQL date
+    expression.
+
+    Args:
+        changed: relation of the tickers to update, with columns `ticker` and
+            `since`: their rows after `since` are recomputed, all of them if it's
+            null. None rebuilds the table.
+
+    Returns: number of rows written
+    """
+    if changed is None:
+        conn.execute(
+            f"create or replace table {TABLE} as {_STATS.format(join='')}".replace("$cutoff_date", cutoff_date)
+        )
+        return conn.execute(f"select count(*) from {TABLE}").pl().item()
+
+    conn.execute(
+        _STARTS.format(changed=changed, lookback_days=LOOKBACK_DAYS, longest=LONGEST_WINDOW_ROWS)
+        .replace("$cutoff_date", cutoff_date)
+    )
+    conn.execute(f"""
+        delete from {TABLE} as stats
+        using _rs_starts as s
+        where stats.ticker = s.ticker and (s.since is null or stats.date > s.since)
+    """)
+    join = """
+        join _rs_starts as s
+            on da.ticker = s.ticker and (s.start_date is null or da.date >= s.start_date)
+    """
+    written = conn.execute(f"""
+        insert into {TABLE} by name
+        select stats.*
+        from ({_STATS.format(join=join)}) as stats
+        join _rs_starts as s
+            on stats.ticker = s.ticker
+        where s.since is null or stats.date > s.since
+    """.replace("$cutoff_date", cutoff_date)).pl().item()
+    conn.execute("drop table if exists _rs_starts")
+    return written
@@ -0,0 +1,199 @@
+"""Score saved models on Arrow record batches, without the training stack.
+
+A model is saved as a CatBoost `.cbm` file next to a JSON feature manifest. The
+metadata files of the model cache (see `ModelCache`) are valid manifests, so cached
+models can be scored directly:
+
+    scorer = Scorer.load(Path("dagster/model_cache/<key>/seed=3.cbm"))
+    for df in scorer.score_query(conn, "select * from fundamentals.excess_returns"):
+        ...
+
+Only CatBoost, Polars and PyArrow are imported: no DuckDB connection is needed to
+construct a scorer, no `APP_ENV`, and no sklearn or SHAP.
+"""
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import polars as pl
+import pyarrow as pa
+from catboost import CatBoostRegressor, FeaturesData, Pool
+
+# Columns passed through from the input to the scored output, when present
+KEY_COLUMNS = ["ticker", "date"]
+
+DEFAULT_BATCH_ROWS = 50_000
+
+
+@dataclass
+class FeatureManifest:
+    """What's needed to build scoring pools for a saved model.
+
+    The field names match the metadata stored with cached models, so that a model
+    cache metadata file can be read as a manifest.
+    """
+
+    pred_col: str
+    # Model features in the order the model was trained on
+    feature_names: list[str]
+    # Positions of the categorical features in `feature_names`
+    categorical_features_indices: list[int]
+    # Columns of the feature table that aren't model features
+    excluded_columns: list[str] = field(default_factory=list)
+    # Categories of the categorical columns in Enum code order, if trained on
+    # compact dtypes. Pools are built from the category strings, so scoring doesn't
+    # depend on it: values not seen in training are unseen categories either way.
+    categories: dict[str, list[str]] = field(default_factory=dict)
+
+    @property
+    def cat_feature_names(self) -> list[str]:
+        return [self.feature_names[idx] for idx in self.categorical_features_indices]
+
+    @property
+    def num_feature_names(self) -> list[str]:
+        cat_idx = set(self.categorical_features_indices)
+        return [
+            name for idx, name in enumerate(self.feature_names) if idx not in cat_idx
+        ]
+
+    @property
+    def numeric_first(self) -> bool:
+        """Whether the categorical features come after all numeric features."""
+        n_num = len(self.feature_names) - len(self.categorical_features_indices)
+        return list(self.categorical_features_indices) == list(
+            range(n_num, len(self.feature_names))
+        )
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps(asdict(self), indent=2))
+
+    @classmethod
+    def load(cls, path: Path) -> "FeatureManifest":
+        metadata = json.loads(path.read_text())
+        return cls(
+            pred_col=metadata["pred_col"],
+            feature_names=list(metadata["feature_names"]),
+            categorical_features_indices=[
+                int(idx) for idx in metadata["categorical_features_indices"]
+            ],
+            excluded_columns=list(metadata.get("excluded_columns", [])),
+            categories=dict(metadata.get("categories", {})),
+        )
+
+
+class Scorer:
+    """Predicts excess returns for batches of feature rows with a saved model."""
+
+    def __init__(self, model: CatBoostRegressor, manifest: FeatureManifest) -> None:
+        if list(model.feature_names_ or []) != manifest.feature_names:
+            raise ValueError("Model features don't match the feature manifest")
+        self.model: CatBoostRegressor = model
+        self.manifest: FeatureManifest = manifest
+
+    @classmethod
+    def load(cls, model_path: Path, manifest_path: Path | None = None) -> "Scorer":
+        """Load a model and its manifest, by default the `.json` next to the model."""
+        model = CatBoostRegressor()
+        model.load_model(str(model_path))
+        manifest = FeatureManifest.load(manifest_path or model_path.with_suffix(".json"))
+        return cls(model, manifest)
+
+    def pool(self, df: pl.DataFrame) -> Pool:
+        """Pool of the model features of `df`, in the order the model expects.
+
+        Numeric features become float32 (nulls are NaN, i.e. missing), categorical
+        features strings with nulls as "None", as in training.
+        """
+        missing = [name for name in self.manifest.feature_names if name not in df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+
+        num_names = self.manifest.num_feature_names
+        cat_names = self.manifest.cat_feature_names
+        num_data = (
+            df.select(pl.col(num_names).cast(pl.Float32)).to_numpy(order="c")
+            if num_names
+            else None
+        )
+        cat_data = (
+            df.select(pl.col(cat_names).cast(pl.String).fill_null("None")).to_numpy(
+                order="c"
+            )
+            if cat_names
+            else None
+        )
+
+        if self.manifest.numeric_first:
+            return Pool(
+                FeaturesData(
+                    num_feature_data=num_data,
+                    cat_feature_data=cat_data,
+                    num_feature_names=num_names or None,
+                    cat_feature_names=cat_names or None,
+                )
+            )
+
+        # Models trained on pandas frames interleave numeric and categorical
+        # features: put the columns back in training order in an object matrix
+        data = np.empty((df.height, len(self.manifest.feature_names)), dtype=object)
+        cat_idx = self.manifest.categorical_features_indices
+        num_idx = [
+            idx for idx in range(len(self.manifest.feature_names)) if idx not in cat_idx
+        ]
+        if num_data is not None:
+            data[:, num_idx] = num_data
+        if cat_data is not None:
+            data[:, cat_idx] = cat_data
+        return Pool(
+            data, cat_features=cat_idx, feature_names=self.manifest.feature_names
+        )
+
+    def score(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Predictions for the rows of `df`, with its key columns.
+
+        `predicted_std` is the standard deviation of the log-normal prediction, as
+        returned by `CatBoostTrainer.predict`.
+        """
+        predictions = self.model.predict(self.pool(df))
+        mean_preds = predictions[:, 0]
+        var_preds = predictions[:, 1]
+
+        return df.select(
+            [col for col in KEY_COLUMNS if col in df.columns]
+        ).with_columns(
+            pl.lit(self.manifest.pred_col).alias("pred_col"),
+            pl.Series("predicted_value_log", mean_preds, dtype=pl.Float64),
+            pl.Series("predicted_value", np.exp(mean_preds), dtype=pl.Float64),
+            pl.Series(
+                "predicted_std",
+                np.sqrt(np.exp(2 * mean_preds) * var_preds),
+                dtype=pl.Float64,
+            ),
+        )
+
+    def score_batches(
+        self, batches: pa.RecordBatchReader | Iterator[pa.RecordBatch]
+    ) -> Iterator[pl.DataFrame]:
+        """Score a stream of record batches one batch at a time.
+
+        Only the current batch and its pool are held in memory, so memory is bounded
+        by the batch size rather than by the size of the input.
+        """
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            yield self.score(pl.DataFrame(batch))
+
+    def score_query(
+        self, conn, sql: str, batch_rows: int = DEFAULT_BATCH_ROWS
+    ) -> Iterator[pl.DataFrame]:
+        """Score the rows of a DuckDB query, streamed in batches of `batch_rows`.
+
+        Args:
+            conn: DuckDB connection (or cursor) to run `sql` on.
+        """
+        reader = conn.execute(sql).fetch_record_batch(batch_rows)
+        yield from self.score_batches(reader)
@@ -0,0 +1,100 @@
+"""Compare the cost and fidelity of the SHAP modes of `all_ticker_shaps`.
+
+A fitted model explains the same rows in every mode of `SHAP_MODES`, recording the
+SHAP and assembly times, the size of the results and how far they are from the
+exact SHAP values:
+
+    APP_ENV=prod python -m src.shap_benchmark --database src/prod_copy.db --top-k 10
+"""
+
+import argparse
+
+import duckdb
+import numpy as np
+import polars as pl
+
+from src.catboost_trainer import DEFAULT_SHAP_TOP_K, SHAP_MODES, CatBoostTrainer
+from src.instrumentation import StageTimer, summarize_stages
+
+
+def _shap_matrix(results: pl.DataFrame) -> np.ndarray:
+    return results["shap_values"].explode().to_numpy().reshape(results.height, -1)
+
+
+def compare_shap_modes(
+    trainer: CatBoostTrainer,
+    since: str | None = None,
+    top_k: int = DEFAULT_SHAP_TOP_K,
+) -> pl.DataFrame:
+    """Explain the rows of `since` (see `all_ticker_shaps`) in every SHAP mode.
+
+    Returns: one row per mode with its cost, the number of stored values per row,
+        the mean absolute error vs exact SHAP (approximate mode) and the share of
+        the total |SHAP| kept as named features (top_k mode)
+    """
+    shap_mode, shap_top_k, timer = trainer.shap_mode, trainer.shap_top_k, trainer.timer
+    rows = []
+    exact = None
+    try:
+        for mode in SHAP_MODES:
+            trainer.shap_mode, trainer.shap_top_k = mode, top_k
+            trainer.timer = StageTimer()
+            results = trainer.all_ticker_shaps(since)
+            stages = summarize_stages(trainer.timer.to_dicts())
+            if mode == "exact":
+                exact = _shap_matrix(results)
+            elif exact is None:
+                raise ValueError("SHAP_MODES must list the exact mode first")
+
+            mean_abs_error = None
+            abs_shap_share = 1.0
+            if mode == "approximate":
+                mean_abs_error = float(np.abs(_shap_matrix(results) - exact).mean())
+            elif mode == "top_k":
+                kept = results["shap_values"].list.slice(0, top_k).list.eval(
+                    pl.element().abs()
+                ).list.sum().to_numpy()
+                abs_shap_share = float(kept.sum() / np.abs(exact).sum())
+
+            rows.append(
+                {
+                    "shap_mode": mode,
+                    "shap_seconds": stages["shap"]["wall_seconds"],
+                    "assemble_seconds": stages["assemble"]["wall_seconds"],
+                    "rows": results.height,
+                    "values_per_row": float(results["shap_values"].list.len().to_numpy().mean()),
+                    "size_mb": results.estimated_size() / (1024 * 1024),
+                    "mean_abs_error": mean_abs_error,
+                    "abs_shap_share": abs_shap_share,
+                }
+            )
+    finally:
+        trainer.shap_mode, trainer.shap_top_k, trainer.timer = shap_mode, shap_top_k, timer
+
+    return pl.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the cost and fidelity of the SHAP modes of all_ticker_shaps."
+    )
+    parser.add_argument("--database", required=True, help="DuckDB file with fundamentals.excess_returns")
+    parser.add_argument("--pred-col", default="excess_return_ln_12m")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_SHAP_TOP_K)
+    parser.add_argument("--since", help="Explain the rows from this date, the latest row per ticker by default")
+    args = parser.parse_args()
+
+    with duckdb.connect(args.database, read_only=True) as db:
+        df_excess_returns = db.query("select * from fundamentals.excess_returns").pl()
+
+    boost = CatBoostTrainer(
+        duckdb.connect(":memory:"), df_excess_returns, args.pred_col, 0, arrow_pools=True
+    )
+    boost.df_train_df()
+    boost.split_train_test_pools()
+    boost.model_init()
+    boost.model_fit()
+
+    result = compare_shap_modes(boost, since=args.since, top_k=args.top_k)
+    with pl.Config(tbl_rows=-1, tbl_cols=-1):
+        print(result)
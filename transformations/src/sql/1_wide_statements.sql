@@ -1,12 +1,17 @@
 create or replace table fundamentals.wide_statements as (
   with daily_adjusted_sma as (
-    from main.daily_adjusted
+    -- SMAs and volatilities are precomputed in main.rolling_stats, see src/rolling_stats.py
     select
-      *,
-      -- sma(adjClose, ticker, date, 125) as SMA_6m,
-      sma(adjClose, ticker, date, 250) as SMA_12m,
-      -- sma(adjClose, ticker, date, 500) as SMA_24m,
-      sma(adjClose, ticker, date, 750) as SMA_36m,
+      da.*,
+      rs.SMA_12m,
+      rs.SMA_36m,
+      rs.volatility_12m,
+      rs.volatility_36m,
+      rs.SMA_volume_12m,
+      rs.volume_volatility_12m,
+    from main.daily_adjusted as da
+    join main.rolling_stats as rs
+      using (ticker, date)
     -- Use parameter for training data cutoff
     where date <= $cutoff_date
   ), indices as (
@@ -51,17 +56,13 @@ create or replace table fundamentals.wide_statements as (
     join daily_subset as da
       on pivoted_price.date = da.date
   ), joined_with_volatility as (
-    select *,
-      -- index_volatility(adjClose, QQQ_adjClose, SPY_adjClose, exchange, ticker, date, 125) as volatility_6m,
-      index_volatility(adjClose, SPY_adjClose, ticker, date, 250) as volatility_12m,
-      -- index_volatility(adjClose, QQQ_adjClose, SPY_adjClose, exchange, ticker, date, 500) as volatility_24m,
-      index_volatility(adjClose, SPY_adjClose, ticker, date, 750) as volatility_36m,
-      sma(adjVolume, ticker, date, 250) as SMA_volume_12m,
-      stddev(adjVolume) over (
-        partition by ticker
-        order by date
-        rows between 250 preceding and current row
-      ) / nullif(sma(adjVolume, ticker, date, 250), 0) as volume_volatility_12m,
+    -- Where the window functions used to add them, to keep the column order
+    select
+      * exclude (volatility_12m, volatility_36m, SMA_volume_12m, volume_volatility_12m),
+      volatility_12m,
+      volatility_36m,
+      SMA_volume_12m,
+      volume_volatility_12m,
     from joined_pivot
   ), with_index as (
     select * exclude (date_1)
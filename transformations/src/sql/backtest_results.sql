@@ -0,0 +1,20 @@
+-- Walk-forward backtest results: one row per (cutoff_date, pred_col, ticker), with
+-- the prediction a model trained on data up to cutoff_date made for the latest row
+-- of the ticker, and the excess return realized after it (null until realized).
+create table if not exists main.backtest_results (
+    cutoff_date DATE,
+    pred_col VARCHAR,
+    ticker VARCHAR,
+    date DATE,
+    predicted_value_log DOUBLE,
+    predicted_value DOUBLE,
+    predicted_std DOUBLE,
+    actual_value_log DOUBLE,
+    actual_value DOUBLE,
+    test_rmse DOUBLE,
+    n_train_rows BIGINT,
+    seed INTEGER,
+    train_seconds DOUBLE,
+    trained_at TIMESTAMP,
+    primary key (cutoff_date, pred_col, ticker)
+);
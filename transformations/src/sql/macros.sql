@@ -41,22 +41,3 @@ nullif(
     (stock_sma / lag(stock_sma, 1) over (partition by partition_col order by date_col)) /
     (index_sma / lag(index_sma, 1) over (order by date_col)),
     0);
-
-
-create table if not exists main.predictions (
-    date DATE,
-    ticker VARCHAR,
-    feature VARCHAR,
-    shap_value FLOAT,
-    feature_value VARCHAR,
-    bias FLOAT,
-    predicted_value_log FLOAT,
-    actual_value_log FLOAT,
-    predicted_value FLOAT,
-    predicted_std FLOAT,
-    actual_value FLOAT,
-    pred_col VARCHAR,
-    trained_at TIMESTAMP,
-    trained_date DATE,
-    primary key (date, ticker, feature, pred_col, trained_date)
-);
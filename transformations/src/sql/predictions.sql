@@ -0,0 +1,69 @@
+-- Columnar prediction store: one row per (ticker, date, pred_col, trained_date).
+-- `features` lists the model features with numeric features first; `shap_values`
+-- is aligned with it, `numeric_values` holds the values of the numeric prefix and
+-- `categorical_values` the values of the remaining (categorical) features.
+create table if not exists main.predictions_wide (
+    date DATE,
+    ticker VARCHAR,
+    pred_col VARCHAR,
+    trained_date DATE,
+    trained_at TIMESTAMP,
+    bias FLOAT,
+    predicted_value_log FLOAT,
+    predicted_value FLOAT,
+    predicted_std FLOAT,
+    actual_value_log FLOAT,
+    actual_value FLOAT,
+    features VARCHAR[],
+    shap_values FLOAT[],
+    numeric_values DOUBLE[],
+    categorical_values VARCHAR[],
+    primary key (ticker, date, pred_col, trained_date)
+);
+
+-- Long (one row per feature) layout used before predictions_wide. Kept read-only
+-- for the training runs that were stored in it.
+create table if not exists main.predictions_long (
+    date DATE,
+    ticker VARCHAR,
+    feature VARCHAR,
+    shap_value FLOAT,
+    feature_value VARCHAR,
+    bias FLOAT,
+    predicted_value_log FLOAT,
+    actual_value_log FLOAT,
+    predicted_value FLOAT,
+    predicted_std FLOAT,
+    actual_value FLOAT,
+    pred_col VARCHAR,
+    trained_at TIMESTAMP,
+    trained_date DATE,
+    primary key (date, ticker, feature, pred_col, trained_date)
+);
+
+-- Compatibility view with the long layout, used by relevant_preds.sql and the dashboard
+create or replace view main.predictions as (
+    select * from main.predictions_long
+    union all by name
+    select
+        date,
+        ticker,
+        unnest(features) as feature,
+        unnest(shap_values) as shap_value,
+        unnest(
+            list_concat(
+                list_transform(numeric_values, x -> cast(x as varchar)),
+                categorical_values
+            )
+        ) as feature_value,
+        bias,
+        predicted_value_log,
+        actual_value_log,
+        predicted_value,
+        predicted_std,
+        actual_value,
+        pred_col,
+        trained_at,
+        trained_date,
+    from main.predictions_wide
+);
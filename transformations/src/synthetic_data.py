@@ -0,0 +1,505 @@
+"""Generate a synthetic DuckDB database with the tables the EtL pipeline loads.
+
+The Tiingo license doesn't allow sharing the data the models are trained on, so
+this fills `daily_adjusted`, `supported_tickers`, `fundamentals.daily`,
+`fundamentals.statements` and `fundamentals.meta` with made-up but plausible data:
+prices follow a geometric Brownian motion with a market factor (SPY), statements
+grow with the company and the daily fundamentals are derived from both. The
+tables are created from the EtL DDL, so the SQL assets and the `catboost` job run
+against the generated file as they do against a copy of prod:
+
+    python -m src.synthetic_data --database src/synthetic_1x.db --scale 1
+    APP_ENV=dev DUCKDB_PATH=src/synthetic_1x.db dagster job execute -m src.dagster_catboost -j catboost
+
+The database is written in batches of tickers, and the row counts grow linearly
+with the number of tickers. DuckDB keeps the primary key indexes of the EtL tables
+in memory though, and checking them is most of the insert time, so scales above
+1x are generated without them:
+
+    python -m src.synthetic_data --database src/synthetic_10x.db --scale 10 --no-primary-keys
+"""
+
+import argparse
+import datetime
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import polars as pl
+
+ETL_SQL_DIR = Path(__file__).resolve().parents[2] / "EtL" / "sql"
+ETL_DDL_FILES = [
+    "schemas.sql",
+    "table__supported_tickers.sql",
+    "table__daily_adjusted.sql",
+    "table__fundamentals_daily.sql",
+    "table__fundamentals_meta.sql",
+    "table__fundamentals_statements.sql",
+    "view__selected_us_tickers.sql",
+]
+TABLES = [
+    "daily_adjusted",
+    "supported_tickers",
+    "fundamentals.daily",
+    "fundamentals.statements",
+    "fundamentals.meta",
+]
+
+# Roughly the size of production: the US stocks with fundamentals and their
+# daily prices since the mid 1990s. Scales multiply the number of tickers.
+PRODUCTION_TICKERS = 5_000
+PRODUCTION_YEARS = 30
+DEFAULT_BATCH_TICKERS = 250
+
+INDEX_TICKER = "SPY"
+TRADING_DAYS_PER_YEAR = 252
+
+EXCHANGES = ["NYSE", "NASDAQ", "NYSE MKT", "OTC"]
+EXCHANGE_WEIGHTS = [0.4, 0.45, 0.1, 0.05]
+SECTORS = {
+    "Technology": ["Software - Application", "Semiconductors", "Computer Hardware"],
+    "Healthcare": ["Biotechnology", "Medical Devices", "Drug Manufacturers"],
+    "Financial Services": ["Banks - Regional", "Asset Management", "Insurance - Life"],
+    "Industrials": ["Aerospace & Defense", "Railroads", "Specialty Machinery"],
+    "Consumer Cyclical": ["Auto Parts", "Restaurants", "Specialty Retail"],
+    "Energy": ["Oil & Gas E&P", "Oil & Gas Midstream"],
+    "Utilities": ["Utilities - Regulated Electric"],
+}
+LOCATIONS = ["California; U.S.A", "New York; U.S.A", "Texas; U.S.A", "Massachusetts; U.S.A"]
+
+# Quarterly statement line items, as (statementType, dataCode). Every dataCode the
+# transformations reference is included, 1_wide_statements pivots them to columns.
+STATEMENT_CODES = [
+    ("incomeStatement", code) for code in [
+        "revenue", "costRev", "grossProfit", "sga", "rnd", "opex", "opinc", "ebitda", "ebit",
+        "intexp", "ebt", "taxExp", "netinc", "netIncComStock", "netIncDiscOps",
+        "consolidatedIncome", "nonControllingInterests", "prefDVDs", "eps", "epsDil",
+        "shareswa", "shareswaDil",
+    ]
+] + [
+    ("balanceSheet", code) for code in [
+        "totalAssets", "assetsCurrent", "cashAndEq", "investmentsCurrent", "acctRec",
+        "inventory", "taxAssets", "ppeq", "intangibles", "totalLiabilities",
+        "liabilitiesCurrent", "liabilitiesNonCurrent", "acctPay", "deferredRev", "deposits",
+        "taxLiabilities", "debt", "equity", "accoci", "retainedEarnings", "sharesBasic",
+    ]
+] + [
+    ("cashFlow", code) for code in [
+        "ncfo", "ncfi", "ncff", "ncfx", "ncf", "capex", "freeCashFlow", "depamor", "sbcomp",
+        "businessAcqDisposals", "issrepayDebt", "issrepayEquity", "payDiv",
+    ]
+] + [
+    ("overview", code) for code in [
+        "grossMargin", "profitMargin", "currentRatio", "debtEquity", "roe", "roa", "bvps",
+        "shareFactor", "piotroskiFScore",
+    ]
+]
+
+
+def ticker_symbols(n_tickers: int) -> list[str]:
+    """Distinct upper case symbols of four or five letters, none of them the index."""
+    symbols = []
+    for i in range(n_tickers):
+        width = 4 if i < 26**4 else 5
+        number = i if width == 4 else i - 26**4
+        letters = []
+        for _ in range(width):
+            number, remainder = divmod(number, 26)
+            letters.append(chr(ord("A") + remainder))
+        symbols.append("".join(reversed(letters)))
+    return symbols
+
+
+def trading_days(start: datetime.date, end: datetime.date) -> pl.Series:
+    """Weekdays from `start` to `end`, holidays are not left out."""
+    days = pl.date_range(start, end, interval="1d", eager=True).alias("date")
+    return days.filter(days.dt.weekday() <= 5)
+
+
+def _gbm(
+    rng: np.random.Generator, n_days: int, drift: np.ndarray, volatility: np.ndarray
+) -> np.ndarray:
+    """Daily log returns of geometric Brownian motions, one per annual drift and volatility."""
+    dt = 1 / TRADING_DAYS_PER_YEAR
+    drift, volatility = np.asarray(drift)[:, None], np.asarray(volatility)[:, None]
+    return rng.normal((drift - volatility**2 / 2) * dt, volatility * np.sqrt(dt), (len(drift), n_days))
+
+
+def _statement_values(revenue: np.ndarray, shares: np.ndarray, rng: np.random.Generator) -> dict[str, np.ndarray]:
+    """Line items of quarterly statements, consistent with `revenue` and `shares`."""
+
+    def share(low: float, high: float) -> np.ndarray:
+        return rng.uniform(low, high, revenue.shape)
+
+    values: dict[str, np.ndarray] = {"revenue": revenue}
+    values["costRev"] = revenue * share(0.3, 0.8)
+    values["grossProfit"] = revenue - values["costRev"]
+    values["sga"] = revenue * share(0.05, 0.25)
+    values["rnd"] = revenue * share(0.0, 0.15)
+    values["opex"] = values["sga"] + values["rnd"]
+    values["opinc"] = values["grossProfit"] - values["opex"]
+    values["depamor"] = revenue * share(0.01, 0.08)
+    values["ebit"] = values["opinc"]
+    values["ebitda"] = values["ebit"] + values["depamor"]
+    values["intexp"] = revenue * share(0.0, 0.04)
+    values["ebt"] = values["ebit"] - values["intexp"]
+    values["taxExp"] = np.maximum(values["ebt"], 0) * share(0.15, 0.3)
+    values["consolidatedIncome"] = values["ebt"] - values["taxExp"]
+    values["nonControllingInterests"] = values["consolidatedIncome"] * share(0.0, 0.02)
+    values["netIncDiscOps"] = np.where(share(0, 1) < 0.05, revenue * share(-0.05, 0.05), 0.0)
+    values["netinc"] = (
+        values["consolidatedIncome"] - values["nonControllingInterests"] + values["netIncDiscOps"]
+    )
+    values["prefDVDs"] = np.where(share(0, 1) < 0.1, revenue * share(0.0, 0.01), 0.0)
+    values["netIncComStock"] = values["netinc"] - values["prefDVDs"]
+    values["shareswa"] = shares
+    values["shareswaDil"] = shares * share(1.0, 1.05)
+    values["sharesBasic"] = shares * share(0.98, 1.02)
+    values["eps"] = values["netIncComStock"] / values["shareswa"]
+    values["epsDil"] = values["netIncComStock"] / values["shareswaDil"]
+
+    values["totalAssets"] = revenue * share(2.0, 8.0)
+    values["assetsCurrent"] = values["totalAssets"] * share(0.2, 0.5)
+    values["cashAndEq"] = values["assetsCurrent"] * share(0.1, 0.4)
+    values["investmentsCurrent"] = values["assetsCurrent"] * share(0.0, 0.2)
+    values["acctRec"] = values["assetsCurrent"] * share(0.1, 0.3)
+    values["inventory"] = values["assetsCurrent"] * share(0.0, 0.3)
+    values["taxAssets"] = values["totalAssets"] * share(0.0, 0.03)
+    values["ppeq"] = values["totalAssets"] * share(0.1, 0.4)
+    values["intangibles"] = values["totalAssets"] * share(0.0, 0.3)
+    values["totalLiabilities"] = values["totalAssets"] * share(0.3, 0.8)
+    values["liabilitiesCurrent"] = values["totalLiabilities"] * share(0.2, 0.5)
+    values["liabilitiesNonCurrent"] = values["totalLiabilities"] - values["liabilitiesCurrent"]
+    values["acctPay"] = values["liabilitiesCurrent"] * share(0.1, 0.4)
+    values["deferredRev"] = values["liabilitiesCurrent"] * share(0.0, 0.2)
+    values["deposits"] = np.where(share(0, 1) < 0.1, values["totalLiabilities"] * share(0.3, 0.8), 0.0)
+    values["taxLiabilities"] = values["totalLiabilities"] * share(0.0, 0.05)
+    values["debt"] = values["totalLiabilities"] * share(0.1, 0.6)
+    values["equity"] = values["totalAssets"] - values["totalLiabilities"]
+    values["accoci"] = values["equity"] * share(-0.05, 0.05)
+    values["retainedEarnings"] = values["equity"] * share(-0.5, 0.9)
+
+    values["ncfo"] = values["netinc"] + values["depamor"] + revenue * share(-0.05, 0.05)
+    values["capex"] = -revenue * share(0.02, 0.12)
+    values["businessAcqDisposals"] = np.where(share(0, 1) < 0.1, -revenue * share(0.0, 0.5), 0.0)
+    values["ncfi"] = values["capex"] + values["businessAcqDisposals"] + revenue * share(-0.03, 0.03)
+    values["issrepayDebt"] = revenue * share(-0.1, 0.1)
+    values["issrepayEquity"] = revenue * share(-0.05, 0.02)
+    values["payDiv"] = -np.maximum(values["netinc"], 0) * share(0.0, 0.5)
+    values["ncff"] = values["issrepayDebt"] + values["issrepayEquity"] + values["payDiv"]
+    values["ncfx"] = revenue * share(-0.005, 0.005)
+    values["ncf"] = values["ncfo"] + values["ncfi"] + values["ncff"] + values["ncfx"]
+    values["freeCashFlow"] = values["ncfo"] + values["capex"]
+    values["sbcomp"] = revenue * share(0.0, 0.05)
+
+    values["grossMargin"] = values["grossProfit"] / revenue
+    values["profitMargin"] = values["netinc"] / revenue
+    values["currentRatio"] = values["assetsCurrent"] / values["liabilitiesCurrent"]
+    values["debtEquity"] = values["totalLiabilities"] / values["equity"]
+    values["roe"] = 4 * values["netinc"] / values["equity"]
+    values["roa"] = 4 * values["netinc"] / values["totalAssets"]
+    values["bvps"] = values["equity"] / shares
+    values["shareFactor"] = np.ones(revenue.shape)
+    values["piotroskiFScore"] = rng.integers(0, 10, revenue.shape).astype(np.float64)
+    return values
+
+
+def _quarter_ends(start: datetime.date, end: datetime.date) -> pl.Series:
+    """Fiscal quarter ends (the last day of March, June, September and December)."""
+    months = pl.date_range(start.replace(day=1), end, interval="1mo", eager=True).dt.month_end()
+    quarter_ends = months.filter(months.dt.month().is_in([3, 6, 9, 12]))
+    return quarter_ends.filter((quarter_ends >= start) & (quarter_ends <= end)).alias("date")
+
+
+def _batch_tables(
+    tickers: list[str],
+    first_perma_ticker: int,
+    days: pl.Series,
+    market_returns: np.ndarray,
+    statement_density: float,
+    rng: np.random.Generator,
+) -> dict[str, pl.DataFrame]:
+    """The rows of `tickers` in every table."""
+    n, n_days = len(tickers), len(days)
+    years = n_days / TRADING_DAYS_PER_YEAR
+
+    # Listing periods: most tickers are listed from the start, the rest IPO later,
+    # and some are delisted before the end
+    first = np.where(
+        rng.uniform(size=n) < 0.6, 0, rng.integers(0, max(n_days - TRADING_DAYS_PER_YEAR, 1), n)
+    )
+    delisted = rng.uniform(size=n) < 0.15
+    last = np.where(
+        delisted,
+        np.minimum(first + rng.integers(TRADING_DAYS_PER_YEAR, n_days + 1, n), n_days - 1),
+        n_days - 1,
+    )
+
+    beta = rng.uniform(0.5, 1.6, n)
+    log_returns = beta[:, None] * market_returns[None, :] + _gbm(
+        rng, n_days, rng.uniform(-0.06, 0.04, n), rng.uniform(0.15, 0.45, n)
+    )
+    adj_close = rng.lognormal(3.0, 1.0, n)[:, None] * np.exp(np.cumsum(log_returns, axis=1))
+    # Dividends and splits make adjusted prices drift below the close over time
+    adjustment = np.exp(np.linspace(-years * 0.015, 0, n_days))[None, :] ** rng.uniform(0, 2, n)[:, None]
+    close = adj_close / adjustment
+    volume = rng.lognormal(13.0, 1.5, n)[:, None] * rng.lognormal(0.0, 0.4, (n, n_days))
+
+    listed = (np.arange(n_days)[None, :] >= first[:, None]) & (np.arange(n_days)[None, :] <= last[:, None])
+    ticker_idx, day_idx = np.nonzero(listed)
+    ticker_column = np.asarray(tickers)[ticker_idx]
+    daily_adjusted = pl.DataFrame(
+        {
+            "date": days.gather(day_idx),
+            "close": close[ticker_idx, day_idx],
+            "adjClose": adj_close[ticker_idx, day_idx],
+            "adjVolume": volume[ticker_idx, day_idx].astype(np.uint64),
+            "ticker": ticker_column,
+        }
+    )
+
+    # Companies grow their revenue and buy back or issue shares over time
+    revenue_growth = np.clip(rng.normal(0.06, 0.08, n), -0.1, 0.2)
+    base_revenue = rng.lognormal(18.5, 1.5, n)
+    base_shares = rng.lognormal(17.5, 1.0, n)
+    share_growth = rng.normal(0.0, 0.02, n)
+    elapsed_years = day_idx / TRADING_DAYS_PER_YEAR
+    annual_earnings = (
+        base_revenue[ticker_idx] * 4 * np.exp(revenue_growth[ticker_idx] * elapsed_years)
+        * rng.uniform(0.02, 0.15, n)[ticker_idx]
+    )
+    shares = base_shares[ticker_idx] * np.exp(share_growth[ticker_idx] * elapsed_years)
+    market_cap = daily_adjusted["close"].to_numpy() * shares
+    debt = market_cap * rng.uniform(0.0, 0.6, n)[ticker_idx]
+    pe_ratio = market_cap / annual_earnings
+    fundamentals_daily = pl.DataFrame(
+        {
+            "date": daily_adjusted["date"],
+            "marketCap": market_cap,
+            "enterpriseVal": market_cap + debt,
+            "peRatio": pe_ratio,
+            "pbRatio": market_cap / (annual_earnings * rng.uniform(3, 12, n)[ticker_idx]),
+            "trailingPEG1Y": pe_ratio / np.maximum(revenue_growth[ticker_idx] * 100, 1.0),
+            "ticker": ticker_column,
+        }
+    )
+
+    quarter_ends = _quarter_ends(days[0], days[-1])
+    quarter_day_idx = np.searchsorted(days.to_numpy(), quarter_ends.to_numpy())
+    q_listed = (quarter_day_idx[None, :] >= first[:, None]) & (quarter_day_idx[None, :] <= last[:, None])
+    # Not every quarter of every ticker has a statement
+    q_listed &= rng.uniform(size=q_listed.shape) < statement_density
+    q_ticker_idx, q_idx = np.nonzero(q_listed)
+    q_years = quarter_day_idx[q_idx] / TRADING_DAYS_PER_YEAR
+    q_revenue = (
+        base_revenue[q_ticker_idx] * np.exp(revenue_growth[q_ticker_idx] * q_years)
+        * rng.lognormal(0.0, 0.1, q_idx.shape)
+    )
+    q_shares = base_shares[q_ticker_idx] * np.exp(share_growth[q_ticker_idx] * q_years)
+    values = _statement_values(q_revenue, q_shares, rng)
+    q_dates = quarter_ends.gather(q_idx)
+    statements = pl.concat(
+        [
+            pl.DataFrame(
+                {
+                    "date": q_dates,
+                    "year": q_dates.dt.year().cast(pl.Int32),
+                    "quarter": q_dates.dt.quarter().cast(pl.Int16),
+                    "statementType": statement_type,
+                    "dataCode": data_code,
+                    "value": values[data_code],
+                    "ticker": np.asarray(tickers)[q_ticker_idx],
+                }
+            )
+            for statement_type, data_code in STATEMENT_CODES
+        ]
+    )
+    # Annual statements (quarter 0) sum the income and cash flow statements of the
+    # year's quarters, and repeat the year-end balance sheet and overview
+    flows = statements.filter(pl.col("statementType").is_in(["incomeStatement", "cashFlow"]))
+    annual = pl.concat(
+        [
+            flows.group_by("year", "statementType", "dataCode", "ticker").agg(
+                pl.col("date").max(), pl.col("value").sum(), pl.len().alias("quarters")
+            ),
+            statements.filter(~pl.col("statementType").is_in(["incomeStatement", "cashFlow"]))
+            .sort("date")
+            .group_by("year", "statementType", "dataCode", "ticker")
+            .agg(pl.col("date").last(), pl.col("value").last(), pl.len().alias("quarters")),
+        ]
+    )
+    annual = annual.filter(pl.col("quarters") == 4).select(
+        "date", "year", pl.lit(0, pl.Int16).alias("quarter"), "statementType", "dataCode", "value", "ticker"
+    )
+    statements = pl.concat([statements, annual])
+
+    sectors = list(SECTORS)
+    sector = np.asarray(sectors)[rng.integers(0, len(sectors), n)]
+    industry = [SECTORS[s][i % len(SECTORS[s])] for s, i in zip(sector, rng.integers(0, 3, n))]
+    end = days[-1]
+    meta = pl.DataFrame(
+        {
+            "permaTicker": [f"US{first_perma_ticker + i:09d}" for i in range(n)],
+            "ticker": [t.lower() for t in tickers],
+            "name": [f"{t.title()} Holdings Inc" for t in tickers],
+            "isActive": ~delisted,
+            "isADR": rng.uniform(size=n) < 0.05,
+            "sector": sector,
+            "industry": industry,
+            "sicCode": rng.integers(1000, 9999, n).astype(str),
+            "sicSector": sector,
+            "sicIndustry": industry,
+            "reportingCurrency": "usd",
+            "location": np.asarray(LOCATIONS)[rng.integers(0, len(LOCATIONS), n)],
+            "companyWebsite": [f"https://www.{t.lower()}.com" for t in tickers],
+            "secFilingWebsite": [f"https://www.sec.gov/cgi-bin/browse-edgar?CIK={t}" for t in tickers],
+            "statementLastUpdated": days.gather(last),
+            "dailyLastUpdated": days.gather(last),
+        }
+    )
+    supported_tickers = pl.DataFrame(
+        {
+            "ticker": tickers,
+            "exchange": rng.choice(EXCHANGES, n, p=EXCHANGE_WEIGHTS),
+            "assetType": "Stock",
+            "priceCurrency": "USD",
+            "startDate": days.gather(first),
+            "endDate": [end if not d else day for d, day in zip(delisted, days.gather(last))],
+        }
+    )
+    return {
+        "supported_tickers": supported_tickers,
+        "daily_adjusted": daily_adjusted,
+        "fundamentals.daily": fundamentals_daily,
+        "fundamentals.statements": statements,
+        "fundamentals.meta": meta,
+    }
+
+
+def _insert(conn: duckdb.DuckDBPyConnection, table: str, df: pl.DataFrame) -> None:
+    conn.execute(f"insert into {table} by name select * from df")
+
+
+def _drop_constraints(conn: duckdb.DuckDBPyConnection, table: str) -> None:
+    """Recreate an empty table with the same columns and types, but no constraints."""
+    schema, _, name = table.rpartition(".")
+    schema = schema or "main"
+    conn.execute(f"create table {schema}.{name}_unconstrained as from {table} limit 0")
+    conn.execute(f"drop table {table}")
+    conn.execute(f"alter table {schema}.{name}_unconstrained rename to {name}")
+
+
+def generate(
+    database: str | Path,
+    n_tickers: int,
+    years: int = PRODUCTION_YEARS,
+    statement_density: float = 1.0,
+    end_date: datetime.date | None = None,
+    seed: int = 0,
+    batch_tickers: int = DEFAULT_BATCH_TICKERS,
+    primary_keys: bool = True,
+) -> dict[str, int]:
+    """Create the EtL tables in `database` and fill them with synthetic data.
+
+    Args:
+        database: DuckDB file, created if it doesn't exist. Existing tables are replaced.
+        n_tickers: number of stocks, besides the SPY index
+        years: years of daily prices up to `end_date`
+        statement_density: share of the listed quarters of a ticker with a statement
+        end_date: last trading day, today by default
+        seed: seed of the random number generator, the same seed gives the same data
+        batch_tickers: number of tickers generated and inserted at a time
+        primary_keys: whether to keep the primary keys of the EtL tables. Without them
+            inserts are several times faster, and memory doesn't grow with the scale.
+
+    Returns: number of rows per table
+    """
+    if not 0 < statement_density <= 1:
+        raise ValueError(f"statement_density must be in (0, 1], got {statement_density}")
+    end_date = end_date or datetime.date.today()
+    start_date = end_date.replace(year=end_date.year - years)
+    days = trading_days(start_date, end_date)
+    rng = np.random.default_rng(seed)
+    market_returns = _gbm(rng, len(days), drift=np.array([0.08]), volatility=np.array([0.18]))[0]
+
+    rows: dict[str, int] = {}
+    with duckdb.connect(str(database)) as conn:
+        for table in TABLES:
+            conn.execute(f"drop table if exists {table}")
+        for file in ETL_DDL_FILES:
+            conn.execute((ETL_SQL_DIR / file).read_text())
+        if not primary_keys:
+            for table in TABLES:
+                _drop_constraints(conn, table)
+
+        index = pl.DataFrame(
+            {
+                "date": days,
+                "close": 100 * np.exp(np.cumsum(market_returns)),
+                "adjClose": 100 * np.exp(np.cumsum(market_returns)),
+                "adjVolume": rng.lognormal(17.5, 0.4, len(days)).astype(np.uint64),
+                "ticker": INDEX_TICKER,
+            }
+        )
+        _insert(conn, "daily_adjusted", index)
+        _insert(
+            conn,
+            "supported_tickers",
+            pl.DataFrame(
+                {
+                    "ticker": [INDEX_TICKER],
+                    "exchange": ["NYSE ARCA"],
+                    "assetType": ["ETF"],
+                    "priceCurrency": ["USD"],
+                    "startDate": [days[0]],
+                    "endDate": [days[-1]],
+                }
+            ),
+        )
+
+        tickers = ticker_symbols(n_tickers)
+        for i in range(0, n_tickers, batch_tickers):
+            tables = _batch_tables(
+                tickers[i:i + batch_tickers], i, days, market_returns, statement_density, rng
+            )
+            conn.execute("begin transaction")
+            for table, df in tables.items():
+                _insert(conn, table, df)
+            conn.execute("commit")
+
+        for table in TABLES:
+            rows[table] = conn.query(f"select count(*) from {table}").pl().item()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic DuckDB database with the tables the EtL pipeline loads."
+    )
+    parser.add_argument("--database", required=True, help="DuckDB file to create")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"Multiple of the production size of {PRODUCTION_TICKERS} tickers")
+    parser.add_argument("--tickers", type=int, help="Number of tickers, overrides --scale")
+    parser.add_argument("--years", type=int, default=PRODUCTION_YEARS)
+    parser.add_argument("--statement-density", type=float, default=1.0)
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-tickers", type=int, default=DEFAULT_BATCH_TICKERS)
+    parser.add_argument("--no-primary-keys", action="store_true",
+                        help="Leave out the primary keys of the EtL tables, for large scales")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = generate(
+        args.database,
+        args.tickers or round(PRODUCTION_TICKERS * args.scale),
+        years=args.years,
+        statement_density=args.statement_density,
+        end_date=args.end_date,
+        seed=args.seed,
+        batch_tickers=args.batch_tickers,
+        primary_keys=not args.no_primary_keys,
+    )
+    print(pl.DataFrame({"table": list(rows), "rows": list(rows.values())}))
+    print(f"Generated in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,74 @@
+import os
+import duckdb
+import numpy as np
+import polars as pl
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def set_app_env():
+    os.environ['APP_ENV'] = 'test'
+    yield
+    del os.environ['APP_ENV']
+
+
+@pytest.fixture
+def df_excess_returns():
+    n_rows = 60
+    return pl.DataFrame({
+        'ticker': [f'T{i % 6}' for i in range(n_rows)],
+        'name': [f'Company {i % 6}' for i in range(n_rows)],
+        'date': pl.date_range(
+            pl.date(2010, 1, 1), pl.date(2010, 1, 1) + pl.duration(days=n_rows - 1), eager=True
+        ),
+        'sector': [['Tech', 'Energy', None][i % 3] for i in range(n_rows)],
+        'excess_return_ln_6m': [0.01 * i for i in range(n_rows)],
+        'excess_return_ln_12m': [0.02 * i for i in range(n_rows)],
+        'excess_return_ln_24m': [0.03 * i for i in range(n_rows)],
+        'excess_return_ln_36m': [0.04 * i for i in range(n_rows)],
+        'feature1': [float(i) for i in range(n_rows)],
+        'feature2': [float(i % 7) if i % 5 else None for i in range(n_rows)],
+    })
+
+
+@pytest.fixture
+def setup_larger_test_env(df_excess_returns):
+    # Every tenth row without a label
+    missing_labels = pl.int_range(pl.len()) % 10 == 0
+    df_excess_returns = df_excess_returns.with_columns(
+        pl.when(~missing_labels).then(pl.col('excess_return_ln_12m')).alias('excess_return_ln_12m')
+    )
+    return duckdb.connect(':memory:'), df_excess_returns
+
+
+@pytest.fixture
+def df_recent_labels_missing(df_excess_returns):
+    # The longer the horizon, the more of the latest rows lack a label, as in production
+    row = pl.int_range(pl.len())
+    return df_excess_returns.with_columns(
+        pl.when(row < 50).then(pl.col('excess_return_ln_24m')).alias('excess_return_ln_24m'),
+        pl.when(row < 40).then(pl.col('excess_return_ln_36m')).alias('excess_return_ln_36m'),
+    )
+
+
+@pytest.fixture
+def df_signal_and_noise():
+    # Labels proportional to one feature, and two features of noise
+    n_rows = 120
+    rng = np.random.default_rng(0)
+    signal = rng.normal(size=n_rows)
+    return pl.DataFrame({
+        'ticker': [f'T{i % 6}' for i in range(n_rows)],
+        'name': [f'Company {i % 6}' for i in range(n_rows)],
+        'date': pl.date_range(
+            pl.date(2010, 1, 1), pl.date(2010, 1, 1) + pl.duration(days=n_rows - 1), eager=True
+        ),
+        'sector': [['Tech', 'Energy', None][i % 3] for i in range(n_rows)],
+        'excess_return_ln_6m': 0.1 * signal,
+        'excess_return_ln_12m': 0.2 * signal,
+        'excess_return_ln_24m': 0.3 * signal,
+        'excess_return_ln_36m': 0.4 * signal,
+        'signal': signal,
+        'noise1': rng.normal(size=n_rows),
+        'noise2': rng.normal(size=n_rows),
+    })
@@ -0,0 +1,77 @@
+from datetime import date
+from pathlib import Path
+import polars as pl
+import pytest
+from src.backtest import (
+    BACKTEST_RESULTS_COLUMNS,
+    backtest_summary,
+    quarterly_cutoffs,
+    run_backtest,
+    slice_at_cutoff,
+)
+
+
+@pytest.fixture
+def excess_returns():
+    # Quarterly rows for 6 tickers over 10 years, like fundamentals.excess_returns
+    quarters = pl.date_range(
+        pl.date(2010, 2, 17), pl.date(2019, 11, 17), interval='3mo', eager=True
+    ).to_list()
+    rows = [(f'T{t}', d, q) for q, d in enumerate(quarters) for t in range(6)]
+    n_rows = len(rows)
+    return pl.DataFrame({
+        'ticker': [ticker for ticker, _, _ in rows],
+        'name': [f'Company {ticker}' for ticker, _, _ in rows],
+        'date': [d for _, d, _ in rows],
+        'sector': [['Tech', 'Energy', None][i % 3] for i in range(n_rows)],
+        'excess_return_ln_6m': [0.01 * (i % 11) for i in range(n_rows)],
+        'excess_return_ln_12m': [0.02 * (i % 13) for i in range(n_rows)],
+        'excess_return_ln_24m': [0.03 * (i % 17) for i in range(n_rows)],
+        'excess_return_ln_36m': [0.04 * (i % 19) for i in range(n_rows)],
+        'feature1': [float(q) for _, _, q in rows],
+        'feature2': [float(i % 7) if i % 5 else None for i in range(n_rows)],
+    })
+
+
+def test_slice_at_cutoff_hides_unrealized_labels(excess_returns):
+    cutoff = date(2015, 1, 1)
+    df = slice_at_cutoff(excess_returns, cutoff)
+
+    assert (df['date'] <= cutoff).all()
+    for label_col, months in [('excess_return_ln_12m', 12), ('excess_return_ln_36m', 36)]:
+        realized = df.filter(pl.col(label_col).is_not_null())['date']
+        assert (realized.dt.offset_by(f'{months}mo') <= cutoff).all()
+        # Rows whose label was realized by the cutoff keep it
+        assert realized.len() > 0
+    # Features are untouched
+    assert df['feature1'].null_count() == 0
+
+
+def test_quarterly_cutoffs():
+    cutoffs = quarterly_cutoffs(date(2020, 5, 31), 3)
+    assert cutoffs == [date(2019, 8, 31), date(2019, 11, 30), date(2020, 2, 29)]
+
+
+def test_run_backtest_in_process_pool(excess_returns, tmp_path: Path):
+    ipc_path = tmp_path / 'excess_returns.arrow'
+    excess_returns.write_ipc(ipc_path, compression='uncompressed')
+    cutoffs = [date(2016, 1, 1), date(2017, 1, 1)]
+
+    df = run_backtest(
+        ipc_path, cutoffs, ['excess_return_ln_12m'], n_workers=2, catboost_threads=1
+    )
+
+    assert df.columns == BACKTEST_RESULTS_COLUMNS
+    # One prediction per ticker and cutoff, for the latest row before the cutoff
+    assert df.height == 6 * len(cutoffs)
+    assert (df['date'] <= df['cutoff_date']).all()
+
+    # Realized labels are looked up in the full table
+    realized = df.join(excess_returns, on=['ticker', 'date'], how='left')
+    assert realized['actual_value_log'].to_list() == pytest.approx(
+        realized['excess_return_ln_12m'].to_list()
+    )
+
+    summary = backtest_summary(df)
+    assert summary.height == len(cutoffs)
+    assert (summary['n_realized'] == 6).all()
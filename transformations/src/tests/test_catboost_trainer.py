@@ -1,16 +1,18 @@
 import pytest
 import duckdb
+import numpy as np
 import polars as pl
-from catboost import CatBoostRegressor
-from src.catboost_trainer import CatBoostTrainer
-import os
-
-
-@pytest.fixture(autouse=True)
-def set_app_env():
-    os.environ['APP_ENV'] = 'test'
-    yield
-    del os.environ['APP_ENV']
+from catboost import CatBoostError, CatBoostRegressor
+from src.catboost_trainer import (
+    OTHER_FEATURES,
+    CatBoostTrainer,
+    MultiRMSETrainer,
+    combine_seed_results,
+    keep_top_k_shap,
+    train_horizon,
+)
+from datetime import date
+from pathlib import Path
 
 
 @pytest.fixture
@@ -70,5 +72,445 @@ def test_model_init(setup_test_env):
     assert trainer.model.get_param('model_size_reg') == 0.1
     assert trainer.model.get_param('subsample') == 0.8
 
+def test_arrow_pools_match_pandas_split(setup_larger_test_env):
+    conn, df_excess_returns = setup_larger_test_env
+    pandas_trainer = CatBoostTrainer(conn, df_excess_returns, 'excess_return_ln_12m', 42)
+    pandas_trainer.df_train_df()
+    pandas_trainer.split_train_test_pools()
+
+    arrow_trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 42, arrow_pools=True,
+    )
+    arrow_trainer.df_train_df()
+    arrow_trainer.split_train_test_pools()
+
+    assert isinstance(arrow_trainer.df_preds, pl.DataFrame)
+    assert arrow_trainer.feature_names == ['feature1', 'feature2', 'sector']
+    assert list(arrow_trainer.categorical_features_indices) == [2]
+    assert arrow_trainer.train_pool.num_row() == pandas_trainer.train_pool.num_row()
+    assert arrow_trainer.eval_pool.num_row() == pandas_trainer.eval_pool.num_row()
+    # Same seed, same rows in the holdout set
+    assert sorted(arrow_trainer.test_pool.get_label()) == pytest.approx(
+        sorted(pandas_trainer.test_pool.get_label())
+    )
+
+
+def test_arrow_pools_all_ticker_shaps(setup_larger_test_env):
+    conn, df_excess_returns = setup_larger_test_env
+    trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 42, arrow_pools=True,
+    )
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    df = trainer.all_ticker_shaps()
+
+    # Latest row per ticker, features in list columns
+    assert df.height == 6
+    assert df['features'][0].to_list() == ['feature1', 'feature2', 'sector']
+    assert df['shap_values'].list.len().to_list() == [3] * 6
+    assert df['numeric_values'].list.len().to_list() == [2] * 6
+    assert df['categorical_values'].list.len().to_list() == [1] * 6
+
+
+def test_predictions_compatibility_view(setup_larger_test_env):
+    conn, df_excess_returns = setup_larger_test_env
+    trainer = CatBoostTrainer(conn, df_excess_returns, 'excess_return_ln_12m', 42)
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    df = trainer.all_ticker_shaps()
+    assert df.height == 6
+    assert {'ticker', 'date', 'features', 'shap_values', 'numeric_values', 'categorical_values'} <= set(df.columns)
+
+    conn.execute(Path('src/sql/predictions.sql').read_text())
+    conn.register('wide', df)
+    conn.execute('insert or replace into main.predictions_wide by name select * from wide')
+    long = conn.query('''
+        select feature, shap_value, feature_value
+        from main.predictions
+        where ticker = 'T1'
+        order by abs(shap_value) desc
+    ''').pl()
+
+    assert long.height == 3
+    assert set(long['feature']) == {'feature1', 'feature2', 'sector'}
+    sector = long.filter(pl.col('feature') == 'sector')['feature_value'][0]
+    assert sector in {'Tech', 'Energy', 'None'}
+
+
+def test_explain_multiple_tickers(setup_larger_test_env):
+    conn, df_excess_returns = setup_larger_test_env
+    trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 42, arrow_pools=True,
+    )
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+
+    df = trainer.explain(['t1', 'T2'], since='2010-01-20', until='2010-02-10')
+    n_rows = df_excess_returns.filter(
+        pl.col('ticker').is_in(['T1', 'T2'])
+        & pl.col('date').is_between(pl.date(2010, 1, 20), pl.date(2010, 2, 10))
+    ).height
+    assert df.height == n_rows * 3
+    assert set(df['ticker']) == {'T1', 'T2'}
+
+    # Sorted by descending |SHAP| within each prediction
+    abs_shap_sorted = df.group_by(['date', 'ticker'], maintain_order=True).agg(
+        (pl.col('shap_value').abs().diff().drop_nulls() <= 0).all().alias('is_sorted')
+    )
+    assert abs_shap_sorted['is_sorted'].all()
+
+    preds = trainer.predict(['T1', 'T2'], since='2010-01-20', until='2010-02-10')
+    assert preds.height == n_rows
+    assert preds.columns == [
+        'predicted_excess_return', 'predicted_std', 'ticker', 'date', 'actual_excess_return',
+    ]
+
+    # Without since, only the latest row per ticker
+    assert trainer.predict(['T1', 'T2']).height == 2
+
+
 if __name__ == '__main__':
     pytest.main([__file__])
+
+
+def test_combine_seed_results(setup_larger_test_env):
+    conn, df_excess_returns = setup_larger_test_env
+    members = []
+    for seed in (0, 1, 2):
+        trainer = CatBoostTrainer(
+            conn, df_excess_returns, 'excess_return_ln_12m', seed, arrow_pools=True,
+        )
+        trainer.df_train_df()
+        trainer.split_train_test_pools()
+        trainer.model_init()
+        trainer.model_fit()
+        members.append(trainer.all_ticker_shaps())
+
+    assert combine_seed_results(members[:1]) is members[0]
+
+    df = combine_seed_results(members)
+    assert df.columns == members[0].columns
+    means = np.stack([member['predicted_value_log'].to_numpy() for member in members])
+    np.testing.assert_allclose(df['predicted_value_log'].to_numpy(), means.mean(axis=0))
+    np.testing.assert_allclose(df['predicted_value'].to_numpy(), np.exp(means.mean(axis=0)))
+
+    # Mixture variance: mean of the member variances plus the variance of their means
+    variances = np.stack([
+        member['predicted_std'].to_numpy() ** 2 / (2 * np.exp(member['predicted_value_log'].to_numpy()))
+        for member in members
+    ])
+    expected_var = variances.mean(axis=0) + means.var(axis=0)
+    np.testing.assert_allclose(
+        df['predicted_std'].to_numpy(),
+        np.sqrt(np.exp(means.mean(axis=0)) * 2 * expected_var),
+        rtol=1e-6,
+    )
+    shaps = np.stack([np.vstack(member['shap_values'].to_list()) for member in members])
+    np.testing.assert_allclose(
+        np.vstack(df['shap_values'].to_list()), shaps.mean(axis=0), rtol=1e-5, atol=1e-7
+    )
+
+    with pytest.raises(ValueError):
+        combine_seed_results([members[0], members[1].head(3)])
+
+
+def test_compact_dtypes(setup_larger_test_env):
+    conn, df_excess_returns = setup_larger_test_env
+    df_excess_returns = df_excess_returns.with_columns(
+        pl.Series('exchange', [['NYSE', 'NASDAQ'][i % 2] for i in range(60)])
+    )
+    trainers, results = {}, {}
+    for compact in (False, True):
+        trainers[compact] = CatBoostTrainer(
+            conn, df_excess_returns, 'excess_return_ln_12m', 42,
+            arrow_pools=True, compact_dtypes=compact,
+        )
+        trainers[compact].df_train_df()
+        trainers[compact].split_train_test_pools()
+        trainers[compact].model_init()
+        trainers[compact].model_fit()
+        results[compact] = trainers[compact].all_ticker_shaps()
+
+    trainer = trainers[True]
+    schema = trainer.df_excess_returns.schema
+    assert schema['feature1'] == pl.Float32
+    assert schema['excess_return_ln_12m'] == pl.Float64
+    assert schema['sector'] == pl.Enum(['Energy', 'None', 'Tech'])
+    assert schema['ticker'] == pl.String
+    assert trainer.memory_saved_mb > 0
+    assert trainer.feature_manifest().categories['exchange'] == ['NASDAQ', 'NYSE']
+
+    # The pools are float32 either way: same model, same predictions and values
+    np.testing.assert_allclose(
+        results[True]['predicted_value'].to_numpy(), results[False]['predicted_value'].to_numpy(),
+    )
+    assert results[True]['categorical_values'].to_list() == results[False]['categorical_values'].to_list()
+
+    # The categorical matrix built from the Enum codes holds the same strings
+    frame = trainer.df_excess_returns.with_columns(
+        pl.when(pl.int_range(pl.len()) != 3).then(pl.col('sector')).alias('sector'),
+    )
+    compact_values = CatBoostTrainer._category_values(frame['sector'])
+    assert compact_values.dtype == object
+    assert compact_values.tolist() == CatBoostTrainer._category_values(
+        frame['sector'].cast(pl.String)
+    ).tolist()
+    assert compact_values[3] == 'None'
+
+    # Known categories keep their codes, new ones are appended
+    next_trainer = CatBoostTrainer(
+        conn, df_excess_returns.with_columns(pl.lit('AMEX').alias('exchange')),
+        'excess_return_ln_12m', 42, arrow_pools=True, compact_dtypes=True,
+        category_dictionary=trainer.category_dictionary,
+    )
+    assert next_trainer.category_dictionary['exchange'] == ['NASDAQ', 'NYSE', 'AMEX']
+
+    with pytest.raises(ValueError, match='arrow_pools'):
+        CatBoostTrainer(conn, df_excess_returns, 'excess_return_ln_12m', 42, compact_dtypes=True)
+
+
+@pytest.mark.parametrize('partial_labels, n_rows', [('drop', 54), ('impute', 60)])
+def test_multi_rmse_trainer(setup_larger_test_env, partial_labels, n_rows):
+    conn, df_excess_returns = setup_larger_test_env
+    pred_cols = ['excess_return_ln_12m', 'excess_return_ln_24m', 'excess_return_ln_36m']
+    trainer = MultiRMSETrainer(
+        conn, df_excess_returns, pred_cols, 42,
+        partial_labels=partial_labels, arrow_pools=True,
+    )
+    trainer.df_train_df()
+    # Every tenth row lacks the 12m label
+    assert trainer.df_preds.height == n_rows
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    df = trainer.all_ticker_shaps()
+
+    assert set(trainer.test_rmses) == set(pred_cols)
+    # Latest row per ticker, per horizon
+    assert df.height == 6 * 3
+    assert sorted(df['pred_col'].unique().to_list()) == pred_cols
+    # The SHAP values of each horizon explain that horizon's prediction
+    np.testing.assert_allclose(
+        (df['bias'] + df['shap_values'].list.sum()).to_numpy(),
+        df['predicted_value_log'].to_numpy(),
+        atol=1e-5,
+    )
+    assert (df['predicted_std'] > 0).all()
+
+    with pytest.raises(ValueError, match='partial_labels'):
+        MultiRMSETrainer(conn, df_excess_returns, pred_cols, 42, partial_labels='zero', arrow_pools=True)
+
+
+@pytest.mark.parametrize('shap_mode', ['approximate', 'top_k'])
+def test_shap_modes(setup_larger_test_env, shap_mode):
+    conn, df_excess_returns = setup_larger_test_env
+    trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 42,
+        arrow_pools=True, shap_mode=shap_mode, shap_top_k=1,
+    )
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    df = trainer.all_ticker_shaps(since='2010-02-01')
+
+    # SHAP values still add up to the prediction
+    np.testing.assert_allclose(
+        (df['bias'] + df['shap_values'].list.sum()).to_numpy(),
+        df['predicted_value_log'].to_numpy(),
+        atol=1e-5,
+    )
+    if shap_mode == 'top_k':
+        assert df['features'].list.len().to_list() == [2] * df.height
+        assert df['features'].list.last().to_list() == [OTHER_FEATURES] * df.height
+        # The kept feature's value, and a null value for the bucket
+        assert (
+            df['numeric_values'].list.len() + df['categorical_values'].list.len()
+        ).to_list() == [2] * df.height
+
+    with pytest.raises(ValueError, match='shap_mode'):
+        CatBoostTrainer(conn, df_excess_returns, 'excess_return_ln_12m', 42, shap_mode='sampled')
+
+
+def _shap_results(features, shap_values, numeric_values, categorical_values) -> pl.DataFrame:
+    """Exact `all_ticker_shaps` results of two tickers."""
+    return pl.DataFrame({
+        'date': [date(2024, 1, 1)] * 2,
+        'ticker': ['A', 'B'],
+        'pred_col': ['excess_return_ln_12m'] * 2,
+        'trained_date': [date(2024, 1, 2)] * 2,
+        'trained_at': [None, None],
+        'bias': [0.1, 0.1],
+        'predicted_value_log': [0.5, -0.1],
+        'predicted_value': [1.6, 0.9],
+        'predicted_std': [0.1, 0.1],
+        'actual_value_log': [None, None],
+        'actual_value': [None, None],
+        'features': [features] * 2,
+        'shap_values': shap_values,
+        'numeric_values': numeric_values,
+        'categorical_values': categorical_values,
+    }, schema_overrides={
+        'trained_at': pl.Datetime, 'actual_value_log': pl.Float64, 'actual_value': pl.Float64,
+        'shap_values': pl.List(pl.Float32), 'numeric_values': pl.List(pl.Float64),
+        'categorical_values': pl.List(pl.Utf8),
+    })
+
+
+def test_keep_top_k_shap():
+    results = _shap_results(
+        ['f1', 'f2', 'sector'],
+        [[0.3, 0.05, 0.04], [-0.04, 0.05, -0.2]],
+        [[1.0, None], [2.0, 3.0]],
+        [['Tech'], ['Energy']],
+    )
+
+    df = keep_top_k_shap(results, 2)
+
+    assert df.schema == results.schema
+    # Numeric features first, then categorical, then the rest of the SHAP values
+    assert df['features'].to_list() == [['f1', 'f2', OTHER_FEATURES], ['f2', 'sector', OTHER_FEATURES]]
+    assert df['shap_values'].to_list()[0] == pytest.approx([0.3, 0.05, 0.04])
+    assert df['shap_values'].to_list()[1] == pytest.approx([0.05, -0.2, -0.04])
+    assert df['numeric_values'].to_list() == [[1.0, None], [3.0]]
+    assert df['categorical_values'].to_list() == [[None], ['Energy', None]]
+    assert keep_top_k_shap(results, 3).equals(results)
+
+
+def test_keep_top_k_shap_single_feature_type():
+    # Feature subsets can leave a model without categorical or numeric features
+    numeric_only = keep_top_k_shap(
+        _shap_results(['f1', 'f2'], [[0.3, 0.05], [-0.04, 0.05]], [[1.0, None], [2.0, 3.0]], [[], []]),
+        1,
+    )
+    assert numeric_only['features'].to_list() == [['f1', OTHER_FEATURES], ['f2', OTHER_FEATURES]]
+    assert numeric_only['numeric_values'].to_list() == [[1.0], [3.0]]
+    assert numeric_only['categorical_values'].to_list() == [[None], [None]]
+
+    categorical_only = keep_top_k_shap(
+        _shap_results(
+            ['sector', 'industry'], [[0.3, 0.05], [-0.04, 0.05]], [[], []],
+            [['Tech', 'Software'], ['Energy', None]],
+        ),
+        1,
+    )
+    assert categorical_only['features'].to_list() == [['sector', OTHER_FEATURES], ['industry', OTHER_FEATURES]]
+    assert categorical_only['numeric_values'].to_list() == [[], []]
+    assert categorical_only['categorical_values'].to_list() == [['Tech', None], [None, None]]
+
+
+class _Interrupt:
+    """CatBoost callback that fails a fit after some iterations, like a cancelled run."""
+
+    def __init__(self, iterations: int) -> None:
+        self.iterations = iterations
+
+    def after_iteration(self, info) -> bool:
+        if info.iteration == self.iterations:
+            raise KeyboardInterrupt('cancelled')
+        return True
+
+
+def test_resume_from_snapshot(setup_larger_test_env, tmp_path: Path):
+    conn, df_excess_returns = setup_larger_test_env
+
+    def trainer(snapshot_dir):
+        trainer = CatBoostTrainer(
+            conn, df_excess_returns, 'excess_return_ln_12m', 42, arrow_pools=True,
+            thread_count=1, snapshot_dir=snapshot_dir, snapshot_interval=0,
+        )
+        trainer.training_iterations = 40
+        trainer.df_train_df()
+        trainer.split_train_test_pools()
+        trainer.model_init()
+        trainer.model.set_params(early_stopping_rounds=None)
+        return trainer
+
+    resumed = trainer(tmp_path)
+    snapshot = resumed.snapshot_file()
+    assert snapshot is not None
+    # A snapshot of an interrupted fit on older data
+    stale = tmp_path / 'excess_return_ln_12m_seed=42_0000.cbsnapshot'
+    stale.touch()
+    with pytest.raises(CatBoostError, match='cancelled'):
+        resumed.model.copy().fit(
+            resumed.train_pool, eval_set=resumed.eval_pool, use_best_model=True, verbose=100,
+            save_snapshot=True, snapshot_file=str(snapshot), snapshot_interval=0,
+            callbacks=[_Interrupt(20)],
+        )
+    assert snapshot.exists()
+
+    resumed.model_fit()
+    assert resumed.resumed_from_snapshot
+    assert list(tmp_path.iterdir()) == []
+
+    # Same model as a fit that wasn't interrupted
+    uninterrupted = trainer(None)
+    uninterrupted.model_fit()
+    assert not uninterrupted.resumed_from_snapshot
+    np.testing.assert_allclose(
+        resumed.model.predict(resumed.test_pool), uninterrupted.model.predict(uninterrupted.test_pool)
+    )
+
+    # A snapshot that can't be loaded is discarded
+    broken = trainer(tmp_path)
+    broken_snapshot = broken.snapshot_file()
+    assert broken_snapshot is not None
+    broken_snapshot.write_bytes(b'not a snapshot')
+    broken.model_fit()
+    assert not broken.resumed_from_snapshot
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_resume_from_snapshot_without_fixed_seed(setup_larger_test_env, tmp_path: Path):
+    conn, df_excess_returns = setup_larger_test_env
+
+    def trainer(seed):
+        trainer = CatBoostTrainer(
+            conn, df_excess_returns, 'excess_return_ln_12m', seed, arrow_pools=True,
+            thread_count=1, snapshot_dir=tmp_path, snapshot_interval=0,
+        )
+        trainer.training_iterations = 40
+        trainer.df_train_df()
+        trainer.model_init()
+        trainer.model.set_params(early_stopping_rounds=None)
+        return trainer
+
+    interrupted = trainer(3)
+    assert not interrupted.adopt_snapshot_seed()
+    interrupted.split_train_test_pools()
+    snapshot = interrupted.snapshot_file()
+    assert snapshot is not None
+    with pytest.raises(CatBoostError, match='cancelled'):
+        interrupted.model.copy().fit(
+            interrupted.train_pool, eval_set=interrupted.eval_pool, use_best_model=True,
+            verbose=100, save_snapshot=True, snapshot_file=str(snapshot), snapshot_interval=0,
+            callbacks=[_Interrupt(20)],
+        )
+
+    # A rerun draws another seed, and resumes the interrupted fit with its seed
+    rerun = trainer(7)
+    assert rerun.adopt_snapshot_seed()
+    assert rerun.seed == 3
+    assert rerun.model.get_params()['random_seed'] == 3
+    rerun.split_train_test_pools()
+    assert rerun.snapshot_file() == snapshot
+    rerun.model_fit()
+    assert rerun.resumed_from_snapshot
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('arrow_pools', [False, True])
+def test_train_horizon(setup_larger_test_env, arrow_pools):
+    _, df_excess_returns = setup_larger_test_env
+    result = train_horizon(
+        df_excess_returns, 'excess_return_ln_12m', 1, ':memory:', arrow_pools=arrow_pools,
+    )
+    assert result['n_features'] == 3
+    assert result['results'].height == 6
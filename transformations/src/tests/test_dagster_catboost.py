@@ -0,0 +1,164 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+import duckdb
+import polars as pl
+import pytest
+
+# Seconds loading the Dagster definitions may take, in a fresh interpreter. About
+# 4 s locally with the trainer imported lazily, 13 s when it was imported eagerly.
+IMPORT_TIME_BUDGET = float(os.environ.get('IMPORT_TIME_BUDGET', 8.0))
+
+
+@pytest.mark.parametrize(
+    'cpu_budget, duckdb_threads, n_tasks, expected',
+    [
+        (4, 1, 3, (2, 1)),
+        (8, 1, 3, (3, 1)),
+        (16, 1, 3, (3, 4)),
+        (16, 2, 3, (3, 3)),
+        (2, 1, 3, (1, 1)),
+        (1, 1, 3, (1, 1)),
+    ],
+)
+def test_split_cpu_budget(cpu_budget, duckdb_threads, n_tasks, expected):
+    from src.dagster_catboost import split_cpu_budget
+
+    assert split_cpu_budget(cpu_budget, duckdb_threads, n_tasks) == expected
+
+
+def test_run_training_tasks_in_process_pool(df_recent_labels_missing, tmp_path: Path):
+    from src.dagster_catboost import HORIZONS, run_training_tasks
+
+    ipc_path = tmp_path / 'excess_returns.arrow'
+    df_recent_labels_missing.write_ipc(ipc_path, compression='uncompressed')
+    tasks = [
+        {
+            'excess_returns': ipc_path,
+            'pred_col': pred_col,
+            'seed': 42,
+            'database': ':memory:',
+            'arrow_pools': True,
+        }
+        for pred_col in HORIZONS.values()
+    ]
+
+    results, wall_seconds = run_training_tasks(
+        tasks, n_workers=2, catboost_threads=1, duckdb_threads=1,
+    )
+
+    assert [result['pred_col'] for result in results] == list(HORIZONS.values())
+    assert all(result['catboost_threads'] == 1 for result in results)
+    assert all(result['results'].height == 6 for result in results)
+    assert wall_seconds > 0
+
+    # Every stage is timed in the worker and returned with the results
+    stages = {record['stage'] for record in results[0]['stages']}
+    assert stages == {'load', 'pool_build', 'fit', 'predict', 'shap', 'assemble'}
+
+
+def test_append_spooled_results(df_recent_labels_missing, tmp_path: Path):
+    from src.dagster_catboost import HORIZONS, append_spooled_results, run_training_tasks
+
+    # Two ensemble seeds per horizon, spooled in chunks of 4 tickers
+    tasks = [
+        {
+            'excess_returns': df_recent_labels_missing,
+            'pred_col': pred_col,
+            'seed': seed,
+            'database': ':memory:',
+            'arrow_pools': True,
+            'spool_dir': tmp_path,
+            'chunk_tickers': 4,
+        }
+        for pred_col in HORIZONS.values()
+        for seed in (0, 1)
+    ]
+    results, _ = run_training_tasks(tasks, n_workers=1, catboost_threads=1, duckdb_threads=1)
+    assert all(result['results'] is None for result in results)
+    assert all(result['spooled_rows'] == 6 for result in results)
+
+    with duckdb.connect(str(tmp_path / 'predictions.db')) as conn:
+        conn.execute(Path('src/sql/predictions.sql').read_text())
+        schemas = append_spooled_results(results, conn)
+        counts = dict(conn.query(
+            'select pred_col, count(*) from main.predictions_wide group by pred_col'
+        ).fetchall())
+
+    assert set(schemas) == set(HORIZONS.values())
+    # One combined row per ticker and horizon
+    assert counts == {pred_col: 6 for pred_col in HORIZONS.values()}
+
+
+def test_stage_metadata():
+    from src.dagster_catboost import stage_metadata
+
+    records = [
+        {'stage': 'fit', 'wall_seconds': 1.0, 'cpu_seconds': 3.0, 'peak_rss_mb': 100.0, 'rows': 10, 'cols': 4},
+        {'stage': 'fit', 'wall_seconds': 0.5, 'cpu_seconds': 1.0, 'peak_rss_mb': 120.0, 'rows': 5, 'cols': 4},
+        {'stage': 'shap', 'wall_seconds': 2.0, 'cpu_seconds': 2.0, 'peak_rss_mb': 130.0, 'rows': 6, 'cols': 4},
+    ]
+    metadata = stage_metadata(records)
+
+    assert metadata['stage_fit_wall_seconds'].value == 1.5
+    assert metadata['stage_fit_peak_rss_mb'].value == 120.0
+    assert metadata['stage_shap_cpu_seconds'].value == 2.0
+    assert 'stages' in metadata
+
+
+def test_definitions_import_time():
+    code = """
+import json, sys, time
+start = time.perf_counter()
+from src.dagster_catboost import defs
+defs.get_all_job_defs()
+elapsed = time.perf_counter() - start
+heavy = [m for m in ('catboost', 'shap', 'sklearn', 'matplotlib') if m in sys.modules]
+print(json.dumps({'seconds': elapsed, 'heavy': heavy}))
+"""
+    completed = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True, text=True, check=True, env={**os.environ, 'APP_ENV': 'test'},
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert result['heavy'] == []
+    assert result['seconds'] < IMPORT_TIME_BUDGET
+
+
+def test_default_job_skips_backtest_and_feature_ranking():
+    from src.dagster_catboost import defs
+
+    def job_assets(name: str) -> set[str]:
+        keys = defs.get_job_def(name).asset_layer.executable_asset_keys
+        return {key.to_user_string() for key in keys}
+
+    # `task dagster:run` runs the catboost job: the backtest trains 8 cutoffs
+    # x 3 horizons and the feature ranking about 15 SHAP fits, so they only run
+    # in their own jobs
+    assert not {'backtest_results', 'feature_ranking'} & job_assets('catboost')
+    assert {'train_12m', 'table_predictions'} <= job_assets('catboost')
+    assert 'backtest_results' in job_assets('backtest')
+    assert 'feature_ranking' in job_assets('feature_selection')
+
+
+def test_excess_returns_ipc(df_recent_labels_missing, tmp_path: Path):
+    from dagster import build_asset_context, mem_io_manager
+    from src.dagster_catboost import excess_returns_ipc
+    from src.polars_io_manager import PolarsArrowIOManager
+
+    io_manager = PolarsArrowIOManager(base_dir=str(tmp_path / 'storage'))
+    with build_asset_context(resources={'io_manager': io_manager}) as context:
+        # Not stored yet: a copy in the temporary directory
+        assert excess_returns_ipc(context, df_recent_labels_missing, str(tmp_path)) == tmp_path / 'excess_returns.arrow'
+        stored = tmp_path / 'storage' / 'excess_returns.arrow'
+        stored.parent.mkdir()
+        df_recent_labels_missing.write_ipc(stored, compression='uncompressed')
+        assert excess_returns_ipc(context, df_recent_labels_missing, str(tmp_path)) == stored
+
+    (tmp_path / 'tmp').mkdir()
+    with build_asset_context(resources={'io_manager': mem_io_manager}) as context:
+        path = excess_returns_ipc(context, df_recent_labels_missing, str(tmp_path / 'tmp'))
+    assert pl.read_ipc(path).equals(df_recent_labels_missing)
@@ -0,0 +1,71 @@
+from pathlib import Path
+import pytest
+from dagster import build_init_resource_context
+
+from src.duckdb_pool import PooledDuckDBResource
+
+
+@pytest.fixture
+def local_database(tmp_path: Path, monkeypatch):
+    database = tmp_path / 'data' / 'local.db'
+    monkeypatch.setenv('DUCKDB_PATH', str(database))
+    return database
+
+
+def test_connects_once_and_reuses_cursors(local_database: Path):
+    db = PooledDuckDBResource(local=True, pool_size=1)
+    assert db.database == str(local_database)
+
+    db.execute('create table numbers as select range as n from range(5)')
+    with db.cursor() as first:
+        with db.cursor() as second:
+            assert second is not first
+        # Tables written through one cursor are visible to the others
+        assert first.query('select count(*) from numbers').fetchone() == (5,)
+    with db.cursor() as cursor:
+        # Only pool_size idle cursors are kept
+        assert cursor is first or cursor is second
+    assert db.query_polars('select sum(n) as total from numbers')['total'].to_list() == [10]
+
+    metadata = db.latency_metadata()
+    assert metadata['duckdb_queries'].value == 5
+    assert metadata['duckdb_connect_seconds'].value >= 0
+    # Latencies are reported once, to the asset that recorded them
+    assert db.latency_metadata()['duckdb_queries'].value == 0
+
+    db.teardown_after_execution(build_init_resource_context())
+    assert local_database.exists()
+
+
+def test_run_shares_one_connection(local_database: Path):
+    from dagster import Definitions, asset, in_process_executor
+
+    @asset(required_resource_keys={'duckdb'})
+    def write(context) -> None:
+        context.resources.duckdb.execute('create table t as select 1 as x')
+        context.add_output_metadata(context.resources.duckdb.latency_metadata())
+
+    @asset(required_resource_keys={'duckdb'}, deps=[write])
+    def read(context) -> None:
+        context.add_output_metadata({
+            'rows': len(context.resources.duckdb.query_polars('select * from t')),
+            **context.resources.duckdb.latency_metadata(),
+        })
+
+    defs = Definitions(
+        assets=[write, read],
+        resources={'duckdb': PooledDuckDBResource(local=True)},
+        executor=in_process_executor,
+    )
+    result = defs.get_implicit_global_asset_job_def().execute_in_process()
+
+    assert result.success
+    metadata = {
+        event.materialization.asset_key.path[-1]: event.materialization.metadata
+        for event in result.get_asset_materialization_events()
+    }
+    # Only the first asset connected
+    connect_seconds = metadata['write']['duckdb_connect_seconds'].value
+    assert isinstance(connect_seconds, float) and connect_seconds > 0
+    assert metadata['read']['duckdb_connect_seconds'].value == 0
+    assert metadata['read']['rows'].value == 1
@@ -0,0 +1,68 @@
+import duckdb
+import polars as pl
+import pytest
+
+from src.duckdb_writer import write_batches, write_frame
+from src.write_benchmark import compare_writers, predictions_frame
+
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect(':memory:')
+    conn.execute('create table prices (ticker varchar, date int, close double, primary key (ticker, date))')
+    yield conn
+    conn.close()
+
+
+def prices(conn) -> pl.DataFrame:
+    return conn.query('select * from prices order by ticker, date').pl()
+
+
+def test_modes(conn):
+    df = pl.DataFrame({'ticker': ['A', 'A', 'B'], 'date': [1, 2, 1], 'close': [1.0, 2.0, 3.0]})
+    assert write_frame(conn, 'prices', df, batch_rows=2) == 3
+    assert prices(conn).equals(df)
+
+    # Columns are matched by name
+    update = pl.DataFrame({'close': [20.0, 4.0], 'date': [2, 2], 'ticker': ['A', 'B']})
+    with pytest.raises(duckdb.ConstraintException):
+        write_frame(conn, 'prices', update)
+
+    write_frame(conn, 'prices', update, mode='upsert')
+    assert prices(conn)['close'].to_list() == [1.0, 20.0, 3.0, 4.0]
+
+    assert write_frame(conn, 'prices', df.head(1), mode='replace') == 1
+    assert prices(conn).equals(df.head(1))
+
+    with pytest.raises(ValueError, match='Unknown mode'):
+        write_frame(conn, 'prices', df, mode='merge')
+
+
+def test_failed_batch_rolls_back_the_whole_write(conn):
+    batches = [
+        pl.DataFrame({'ticker': ['A'], 'date': [1], 'close': [1.0]}),
+        pl.DataFrame({'ticker': ['B'], 'date': [1], 'close': [2.0]}),
+        pl.DataFrame({'ticker': ['A'], 'date': [1], 'close': [3.0]}),
+    ]
+    with pytest.raises(duckdb.ConstraintException):
+        write_batches(conn, 'prices', batches)
+
+    assert prices(conn).is_empty()
+    # The connection is usable again
+    assert write_batches(conn, 'prices', batches[:2]) == 2
+
+
+def test_replace_with_empty_frame(conn):
+    empty = pl.DataFrame(schema={'ticker': pl.String, 'value': pl.Float32})
+    assert write_frame(conn, 'prices', empty, mode='replace') == 0
+    assert conn.query('select * from prices').pl().schema == empty.schema
+
+
+def test_compare_writers():
+    df = predictions_frame(120, n_features=6)
+    result = compare_writers(df, batch_rows=50)
+
+    assert result['method'].to_list() == [
+        'sqlalchemy_replace', 'arrow_replace', 'arrow_append', 'arrow_upsert',
+    ]
+    assert result['rows'].to_list() == [df.height] * 4
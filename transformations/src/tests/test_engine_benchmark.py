@@ -0,0 +1,38 @@
+import polars as pl
+import pytest
+from src.engine_benchmark import compare_engines, split_holdout
+
+
+@pytest.fixture
+def df_excess_returns(df_signal_and_noise):
+    # The latest rows have no 36m label yet
+    return df_signal_and_noise.with_columns(
+        pl.when(pl.int_range(pl.len()) < 100).then(pl.col('excess_return_ln_36m'))
+        .alias('excess_return_ln_36m')
+    )
+
+
+PRED_COLS = ['excess_return_ln_12m', 'excess_return_ln_24m', 'excess_return_ln_36m']
+
+
+def test_split_holdout(df_excess_returns):
+    df_train, holdout = split_holdout(df_excess_returns, PRED_COLS, 0.2, seed=0)
+
+    assert holdout.height == 20
+    assert holdout['excess_return_ln_36m'].null_count() == 0
+    assert df_train.height + holdout.height == df_excess_returns.height
+    assert df_train.join(holdout, on=['ticker', 'date']).is_empty()
+
+
+@pytest.mark.parametrize('partial_labels', ['drop', 'impute'])
+def test_compare_engines(df_excess_returns, partial_labels):
+    result = compare_engines(
+        df_excess_returns, PRED_COLS, thread_count=1, holdout_fraction=0.2,
+        partial_labels=partial_labels,
+    )
+
+    assert result['engine'].to_list() == ['per_horizon'] * 3 + [f'multi_rmse_{partial_labels}'] * 3
+    assert result['pred_col'].to_list() == PRED_COLS * 2
+    assert (result['holdout_rmse'] > 0).all()
+    assert (result['fit_seconds'] > 0).all()
+    assert (result['total_seconds'] >= result['fit_seconds']).all()
@@ -0,0 +1,68 @@
+from pathlib import Path
+import duckdb
+import polars as pl
+import pytest
+from src.catboost_trainer import CatBoostTrainer
+from src.feature_selection import (
+    load_feature_list,
+    rank_features,
+    save_feature_list,
+    select_features,
+    tradeoff_summary,
+)
+
+
+def test_rank_features_normalizes_horizons():
+    shaps = {
+        'excess_return_ln_12m': pl.DataFrame({'feature': ['a', 'b'], 'mean_abs_shap': [0.3, 0.1]}),
+        'excess_return_ln_24m': pl.DataFrame({'feature': ['a', 'b'], 'mean_abs_shap': [0.3, 0.1]}),
+        # Larger SHAP values of the longest horizon don't dominate the ranking
+        'excess_return_ln_36m': pl.DataFrame({'feature': ['a', 'b'], 'mean_abs_shap': [1.0, 3.0]}),
+    }
+    ranking = rank_features(shaps)
+
+    assert ranking['feature'].to_list() == ['a', 'b']
+    assert ranking['shap_share'].to_list() == pytest.approx([1.75 / 3, 1.25 / 3])
+    assert ranking['rank'].to_list() == [1, 2]
+
+
+def test_select_features(df_signal_and_noise, tmp_path: Path):
+    pred_cols = ['excess_return_ln_12m', 'excess_return_ln_36m']
+
+    ranking, tradeoff, features = select_features(
+        df_signal_and_noise, pred_cols, ks=[1, 2, 10], thread_count=1, rmse_tolerance=0.5,
+    )
+
+    assert set(ranking['feature']) == {'signal', 'noise1', 'noise2', 'sector'}
+    assert ranking['feature'][0] == 'signal'
+    # K=10 is more than there are features: only 1, 2 and all (4) are evaluated
+    assert sorted(set(tradeoff['k'])) == [1, 2, 4]
+    assert tradeoff.height == 3 * len(pred_cols)
+    assert tradeoff_summary(tradeoff)['k'].to_list() == [1, 2, 4]
+    assert features == ranking['feature'].head(len(features)).to_list()
+
+    path = tmp_path / 'selected_features.json'
+    assert load_feature_list(path) is None
+    save_feature_list(path, features, tradeoff=tradeoff_summary(tradeoff).to_dicts())
+    assert load_feature_list(path) == features
+
+
+def test_trainer_feature_subset(df_signal_and_noise):
+    trainer = CatBoostTrainer(
+        duckdb.connect(':memory:'), df_signal_and_noise, 'excess_return_ln_12m', 0,
+        arrow_pools=True, feature_subset=['signal', 'sector'],
+    )
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    df = trainer.all_ticker_shaps()
+
+    assert df['features'][0].to_list() == ['signal', 'sector']
+    assert df['shap_values'].list.len().to_list() == [2] * 6
+
+    with pytest.raises(ValueError, match='not in data'):
+        CatBoostTrainer(
+            duckdb.connect(':memory:'), df_signal_and_noise, 'excess_return_ln_12m', 0,
+            feature_subset=['missing'],
+        )
@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+import pytest
+from src.instrumentation import (
+    RssSampler, StageTimer, current_rss_mb, summarize_stages, write_stages_jsonl
+)
+
+
+def test_stage_timer_records_stages():
+    timer = StageTimer()
+    with timer.stage('load', rows=10, cols=3):
+        sum(range(100_000))
+    with timer.stage('fit') as stage:
+        stage.rows, stage.cols = 8, 2
+
+    records = timer.to_dicts()
+    assert [record['stage'] for record in records] == ['load', 'fit']
+    assert records[0]['rows'] == 10 and records[0]['cols'] == 3
+    assert records[1]['rows'] == 8 and records[1]['cols'] == 2
+    assert all(record['wall_seconds'] >= 0 for record in records)
+    assert all(record['cpu_seconds'] >= 0 for record in records)
+    assert all(record['peak_rss_mb'] > 0 for record in records)
+
+
+def test_stage_timer_records_memory_per_stage():
+    timer = StageTimer()
+    with timer.stage('large'):
+        buffer = bytearray(200 * 1024 * 1024)
+        buffer[::4096] = b'x' * len(buffer[::4096])
+        del buffer
+    with timer.stage('small'):
+        sum(range(100_000))
+
+    large, small = timer.records
+    assert large.peak_rss_mb - large.start_rss_mb > 150
+    # The process peak of the earlier stage doesn't carry over
+    assert small.peak_rss_mb < large.peak_rss_mb - 150
+
+
+def test_stage_timer_records_failed_stage():
+    timer = StageTimer()
+    with pytest.raises(ValueError):
+        with timer.stage('fit'):
+            raise ValueError('no data')
+
+    assert [record.stage for record in timer.records] == ['fit']
+
+
+def test_summarize_and_write_stages(tmp_path: Path):
+    timer = StageTimer()
+    for rows in (10, 20):
+        with timer.stage('pool_build', rows=rows, cols=4):
+            pass
+    records = timer.to_dicts()
+
+    summary = summarize_stages(records)
+    assert summary['pool_build']['runs'] == 2
+    assert summary['pool_build']['rows'] == 20
+
+    path = tmp_path / 'logs' / 'stages.jsonl'
+    write_stages_jsonl(path, records, run_id='abc', pred_col='excess_return_ln_12m')
+    write_stages_jsonl(path, records, run_id='def', pred_col='excess_return_ln_12m')
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 4
+    assert lines[0]['run_id'] == 'abc' and lines[0]['stage'] == 'pool_build'
+
+
+def test_rss_sampler_records_peak_of_block():
+    with RssSampler(interval=0.001) as sampler:
+        buffer = bytearray(200 * 1024 * 1024)
+        buffer[::4096] = b'x' * len(buffer[::4096])
+        del buffer
+
+    assert sampler.start_mb > 0
+    assert sampler.peak_mb - sampler.start_mb > 150
+    assert current_rss_mb() < sampler.peak_mb
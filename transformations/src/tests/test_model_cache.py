@@ -0,0 +1,201 @@
+from datetime import date, timedelta
+from pathlib import Path
+import duckdb
+import numpy as np
+import polars as pl
+import pytest
+from src.catboost_trainer import CatBoostTrainer
+from src.model_cache import ModelCache, frame_fingerprint
+
+
+def test_frame_fingerprint(df_excess_returns):
+    fingerprint = frame_fingerprint(df_excess_returns)
+    assert frame_fingerprint(df_excess_returns.reverse()) == fingerprint
+    changed = df_excess_returns.with_columns(
+        pl.when(pl.col('feature1') == 3.0).then(4.0).otherwise(pl.col('feature1')).alias('feature1')
+    )
+    assert frame_fingerprint(changed) != fingerprint
+    assert frame_fingerprint(df_excess_returns.drop('feature2')) != fingerprint
+
+
+def test_key_ignores_seed_and_threads(df_excess_returns, tmp_path: Path):
+    cache = ModelCache(tmp_path)
+    params = {'depth': 6, 'random_seed': 1, 'thread_count': 2}
+    key = cache.key(df_excess_returns, params)
+    assert cache.key(df_excess_returns, {**params, 'random_seed': 7, 'thread_count': -1}) == key
+    assert cache.key(df_excess_returns, {**params, 'depth': 4}) != key
+
+
+@pytest.mark.parametrize('arrow_pools', [False, True])
+def test_cached_model_skips_fit(df_excess_returns, tmp_path: Path, arrow_pools):
+    conn = duckdb.connect(':memory:')
+    cache = ModelCache(tmp_path)
+
+    trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 3, arrow_pools=arrow_pools,
+    )
+    trainer.df_train_df()
+    trainer.model_init()
+    assert not trainer.load_cached_model(cache)
+    trainer.split_train_test_pools()
+    trainer.model_fit()
+    trainer.save_cached_model(cache)
+    expected = trainer.all_ticker_shaps()
+
+    # Other seed, same data and params: the cached model and its seed are reused
+    cached_trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 5, arrow_pools=arrow_pools,
+    )
+    cached_trainer.df_train_df()
+    cached_trainer.model_init()
+    assert cached_trainer.load_cached_model(cache)
+    assert cached_trainer.seed == 3
+    assert cached_trainer.test_rmse == pytest.approx(trainer.test_rmse)
+    results = cached_trainer.all_ticker_shaps()
+    np.testing.assert_allclose(
+        results['predicted_value'].to_numpy(), expected['predicted_value'].to_numpy(),
+    )
+
+    # Ensemble members only take the model of their own seed
+    member_trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 5, arrow_pools=arrow_pools,
+    )
+    member_trainer.df_train_df()
+    member_trainer.model_init()
+    assert not member_trainer.load_cached_model(cache, exact_seed=True)
+
+    # Other data: cache miss
+    other_trainer = CatBoostTrainer(
+        conn, df_excess_returns.head(50), 'excess_return_ln_12m', 3, arrow_pools=arrow_pools,
+    )
+    other_trainer.df_train_df()
+    other_trainer.model_init()
+    assert not other_trainer.load_cached_model(cache)
+
+
+def _frame(n_rows: int) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 0.1, 1000)[:n_rows]
+    return pl.DataFrame({
+        'ticker': [f'T{i % 6}' for i in range(n_rows)],
+        'name': [f'Company {i % 6}' for i in range(n_rows)],
+        'date': [date(2000, 1, 1) + timedelta(days=i) for i in range(n_rows)],
+        'excess_return_ln_6m': [0.0] * n_rows,
+        'excess_return_ln_12m': [float(i % 10) / 10 + noise[i] for i in range(n_rows)],
+        'excess_return_ln_24m': [0.0] * n_rows,
+        'excess_return_ln_36m': [0.0] * n_rows,
+        'feature1': [float(i % 10) for i in range(n_rows)],
+        'feature2': [float(i % 3) for i in range(n_rows)],
+    })
+
+
+def _incremental_trainer(df: pl.DataFrame) -> CatBoostTrainer:
+    trainer = CatBoostTrainer(
+        duckdb.connect(':memory:'), df, 'excess_return_ln_12m', 1, arrow_pools=True,
+    )
+    trainer.df_train_df()
+    trainer.model_init()
+    return trainer
+
+
+def test_incremental_fit_decisions(tmp_path: Path):
+    cache = ModelCache(tmp_path)
+    # Tolerances that never trigger, so the decisions only depend on row counts
+    kwargs = {'iterations': 5, 'min_new_rows': 10, 'drift_tolerance': 1e9, 'rmse_tolerance': 1e9}
+
+    trainer = _incremental_trainer(_frame(200))
+    outcome = trainer.incremental_fit(cache, **kwargs)
+    assert outcome['decision'] == 'full'
+    assert outcome['reason'] == 'no previous model'
+    trainer.save_cached_model(cache)
+    base_trees = trainer.model.tree_count_
+
+    trainer = _incremental_trainer(_frame(205))
+    outcome = trainer.incremental_fit(cache, **kwargs)
+    assert outcome['decision'] == 'reuse'
+    assert outcome['new_rows'] == 5
+    trainer.save_cached_model(cache)
+
+    trainer = _incremental_trainer(_frame(230))
+    outcome = trainer.incremental_fit(cache, **kwargs)
+    assert outcome['decision'] == 'warm_start'
+    # Rows reused in the previous run still count as new: that model never saw them
+    assert outcome['new_rows'] == 30
+    assert outcome['base_iterations'] == base_trees
+    assert trainer.model.tree_count_ == base_trees + outcome['added_iterations']
+    trainer.save_cached_model(cache)
+    assert len(trainer.all_ticker_shaps()) == 6
+
+    trainer = _incremental_trainer(_frame(400))
+    outcome = trainer.incremental_fit(cache, **kwargs)
+    assert outcome['decision'] == 'full'
+    assert outcome['reason'] == 'too many new rows'
+
+
+def test_shared_quantization_borders(df_excess_returns, tmp_path: Path):
+    # The longest horizon has fewer labels, and the latest rows have none
+    labels = [col for col in df_excess_returns.columns if col.startswith('excess_return')]
+    df_excess_returns = df_excess_returns.with_columns(
+        pl.when(pl.int_range(pl.len()) < 50).then(pl.col('excess_return_ln_36m')),
+    ).with_columns(
+        pl.when(pl.int_range(pl.len()) < 55).then(pl.col(labels)),
+    )
+    cache = ModelCache(tmp_path)
+    borders_paths = []
+    for pred_col in ['excess_return_ln_12m', 'excess_return_ln_36m']:
+        trainer = CatBoostTrainer(
+            duckdb.connect(':memory:'), df_excess_returns, pred_col, 1,
+            arrow_pools=True, borders_cache=cache,
+        )
+        trainer.df_train_df()
+        trainer.split_train_test_pools()
+        assert trainer.train_pool.is_quantized()
+        trainer.model_init()
+        trainer.model_fit()
+        borders_paths.append(trainer.quantization_borders())
+
+        # Neither the rows this horizon holds out nor unlabeled rows set the borders
+        df_preds = trainer.training_frame()
+        _, val_idx, test_idx = trainer._split_indices(df_preds.height, 0.03, 0.05)
+        held_out = df_preds[np.concatenate([val_idx, test_idx])].select('ticker', 'date')
+        border_rows = trainer.border_rows().select('ticker', 'date')
+        assert held_out.height > 0
+        assert held_out.join(border_rows, on=['ticker', 'date']).height == 0
+        assert border_rows['date'].max() < df_excess_returns['date'][55]
+
+    # Same training rows for both horizons: one borders file
+    assert borders_paths[0] == borders_paths[1]
+    assert list((tmp_path / 'borders').glob('*.tsv')) == [borders_paths[0]]
+
+
+def test_shared_borders_require_arrow_pools(df_excess_returns, tmp_path: Path):
+    with pytest.raises(ValueError):
+        CatBoostTrainer(
+            duckdb.connect(':memory:'), df_excess_returns, 'excess_return_ln_12m', 1,
+            borders_cache=ModelCache(tmp_path),
+        )
+
+
+def test_compact_dtypes_keep_categories(df_excess_returns, tmp_path: Path):
+    from src.catboost_trainer import train_horizon
+
+    result = train_horizon(
+        df_excess_returns, 'excess_return_ln_12m', 3, ':memory:',
+        arrow_pools=True, model_cache_dir=tmp_path, compact_dtypes=True,
+    )
+    cache = ModelCache(tmp_path)
+    assert cache.load_categories() == {'sector': ['Energy', 'None', 'Tech']}
+    assert result['memory_saved_mb'] > 0
+
+    # The dictionary is saved with the model, and extended by the next run
+    key = next(path for path in tmp_path.iterdir() if (path / 'seed=3.json').exists())
+    cached = cache.load(key.name, 3)
+    assert cached is not None
+    assert cached[1]['categories'] == {'sector': ['Energy', 'None', 'Tech']}
+
+    train_horizon(
+        df_excess_returns.with_columns(pl.lit('Utilities').alias('sector')),
+        'excess_return_ln_12m', 3, ':memory:',
+        arrow_pools=True, model_cache_dir=tmp_path, compact_dtypes=True,
+    )
+    assert cache.load_categories() == {'sector': ['Energy', 'None', 'Tech', 'Utilities']}
@@ -0,0 +1,49 @@
+from pathlib import Path
+import polars as pl
+
+from src.pipeline_benchmark import FEATURE_SQL, compare_to_baseline, run_scale
+
+
+def test_compare_to_baseline():
+    baseline = [
+        {'scale': 0.01, 'stage': 'sql.1_wide_statements.sql', 'wall_seconds': 10.0, 'peak_rss_mb': 1000.0},
+        {'scale': 0.01, 'stage': 'trainer.model_fit', 'wall_seconds': 20.0, 'peak_rss_mb': 500.0},
+        {'scale': 0.01, 'stage': 'sql.macros.sql', 'wall_seconds': 0.01, 'peak_rss_mb': 200.0},
+    ]
+    records = [
+        {'scale': 0.01, 'stage': 'sql.1_wide_statements.sql', 'wall_seconds': 14.0, 'peak_rss_mb': 1100.0},
+        {'scale': 0.01, 'stage': 'trainer.model_fit', 'wall_seconds': 21.0, 'peak_rss_mb': 800.0},
+        # 5x slower, but by less than the noise floor
+        {'scale': 0.01, 'stage': 'sql.macros.sql', 'wall_seconds': 0.05, 'peak_rss_mb': 200.0},
+        # No baseline
+        {'scale': 0.05, 'stage': 'trainer.model_fit', 'wall_seconds': 100.0, 'peak_rss_mb': 900.0},
+    ]
+    comparison = compare_to_baseline(
+        records, pl.DataFrame(baseline), time_tolerance=0.25, memory_tolerance=0.25
+    )
+
+    assert comparison['time_regressed'].to_list() == [True, False, False, False]
+    assert comparison['memory_regressed'].to_list() == [False, True, False, False]
+    assert comparison['regressed'].to_list() == [True, True, False, False]
+    assert comparison['baseline_wall_seconds'].to_list()[-1] is None
+
+
+def test_run_scale(tmp_path: Path):
+    records = run_scale(0.002, tmp_path, years=5)
+
+    stages = [record['stage'] for record in records]
+    assert stages == [f'sql.{file}' for file in FEATURE_SQL] + [
+        'trainer.load',
+        'trainer.df_train_df',
+        'trainer.split_train_test_pools',
+        'trainer.model_init',
+        'trainer.model_fit',
+        'trainer.all_ticker_shaps',
+        'sql.predictions.sql',
+        'sql.relevant_preds.sql',
+    ]
+    assert all(record['peak_rss_mb'] > 0 for record in records)
+    # The generated data is kept for the next run, the scratch copy is not
+    assert [path.name for path in tmp_path.iterdir()] == [
+        'synthetic_tickers=10_years=5_density=1.0_seed=0.db'
+    ]
@@ -0,0 +1,69 @@
+from pathlib import Path
+import polars as pl
+import pytest
+from dagster import AssetIn, AssetKey, DagsterInstance, asset, materialize
+
+from src.polars_io_manager import PolarsArrowIOManager
+
+
+FRAME = pl.DataFrame({'ticker': ['A', 'B', 'C'], 'date': [1, 2, 3], 'value': [1.0, 2.0, 3.0]})
+
+
+@asset
+def frame() -> pl.DataFrame:
+    return FRAME
+
+
+@pytest.mark.parametrize('format', ['ipc', 'parquet'])
+def test_round_trip(tmp_path: Path, format: str):
+    loaded = {}
+
+    @asset
+    def eager(frame: pl.DataFrame) -> None:
+        loaded['eager'] = frame
+
+    @asset
+    def lazy(frame: pl.LazyFrame) -> None:
+        loaded['lazy'] = frame
+
+    @asset(ins={'frame': AssetIn(metadata={'columns': ['ticker', 'value']})})
+    def projected(frame: pl.DataFrame) -> None:
+        loaded['projected'] = frame
+
+    io_manager = PolarsArrowIOManager(base_dir=str(tmp_path), format=format)
+    result = materialize([frame, eager, lazy, projected], resources={'io_manager': io_manager})
+
+    assert result.success
+    expected = FRAME
+    assert loaded['eager'].equals(expected)
+    assert isinstance(loaded['lazy'], pl.LazyFrame)
+    assert loaded['lazy'].collect().equals(expected)
+    assert loaded['projected'].columns == ['ticker', 'value']
+
+    suffix = '.arrow' if format == 'ipc' else '.parquet'
+    assert [path.name for path in tmp_path.iterdir()] == [f'frame{suffix}']
+    [materialization] = [
+        event.materialization for event in result.get_asset_materialization_events()
+        if event.asset_key == AssetKey('frame')
+    ]
+    assert materialization.metadata['path'].value == str(tmp_path / f'frame{suffix}')
+
+    instance = DagsterInstance.ephemeral()
+    stored = io_manager.ipc_file(instance, AssetKey('frame'))
+    assert stored == (tmp_path / 'frame.arrow' if format == 'ipc' else None)
+
+
+def test_overwrite_keeps_mapped_readers_valid(tmp_path: Path):
+    io_manager = PolarsArrowIOManager(base_dir=str(tmp_path))
+    assert materialize([frame], resources={'io_manager': io_manager}).success
+    # Memory-mapped, Polars' default for IPC files
+    mapped = pl.read_ipc(tmp_path / 'frame.arrow')
+
+    @asset(name='frame')
+    def larger_frame() -> pl.DataFrame:
+        return pl.DataFrame({'ticker': ['D'] * 1000, 'date': range(1000), 'value': [0.0] * 1000})
+
+    assert materialize([larger_frame], resources={'io_manager': io_manager}).success
+    # The new file replaced the old one instead of being written into it
+    assert mapped.equals(FRAME)
+    assert pl.read_ipc(tmp_path / 'frame.arrow').height == 1000
@@ -0,0 +1,57 @@
+from pathlib import Path
+import duckdb
+import polars as pl
+import pytest
+from src.catboost_trainer import CatBoostTrainer
+from src.prediction_stream import append_predictions, read_spool, spool_chunks
+
+
+@pytest.fixture
+def trainer(setup_larger_test_env):
+    conn, df_excess_returns = setup_larger_test_env
+    trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 42, arrow_pools=True,
+    )
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    return trainer
+
+
+def test_iter_ticker_shaps_matches_all_ticker_shaps(trainer):
+    chunks = list(trainer.iter_ticker_shaps(since='2010-02-01', chunk_tickers=4))
+
+    # 6 tickers in chunks of 4
+    assert [chunk['ticker'].n_unique() for chunk in chunks] == [4, 2]
+    expected = trainer.all_ticker_shaps(since='2010-02-01').drop('trained_at')
+    streamed = pl.concat(chunks).drop('trained_at')
+    assert streamed.sort('date', 'ticker').equals(expected.sort('date', 'ticker'))
+
+
+def test_spool_and_append(trainer, tmp_path: Path):
+    paths = {'excess_return_ln_12m': tmp_path / 'excess_return_ln_12m.arrow'}
+    rows = spool_chunks(trainer.iter_ticker_shaps(chunk_tickers=2), paths)
+    assert rows == {'excess_return_ln_12m': 6}
+
+    chunks = list(read_spool(paths['excess_return_ln_12m']))
+    assert [chunk.height for chunk in chunks] == [2, 2, 2]
+    # A horizon without rows has no spool file
+    assert list(read_spool(tmp_path / 'missing.arrow')) == []
+
+    conn = duckdb.connect(':memory:')
+    conn.execute(Path('src/sql/predictions.sql').read_text())
+    assert append_predictions(conn, chunks) == 6
+    # Rows of the same training date are replaced, not duplicated
+    assert append_predictions(conn, chunks) == 6
+    assert conn.query('select count(*) from main.predictions_wide').fetchone() == (6,)
+    assert conn.query('select count(*) from main.predictions').fetchone() == (6 * 3,)
+
+    def failing_chunks():
+        yield chunks[0].with_columns(pl.lit('excess_return_ln_24m').alias('pred_col'))
+        raise RuntimeError('worker failed')
+
+    with pytest.raises(RuntimeError):
+        append_predictions(conn, failing_chunks())
+    # The partial write was rolled back
+    assert conn.query('select count(*) from main.predictions_wide').fetchone() == (6,)
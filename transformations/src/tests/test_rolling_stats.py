@@ -0,0 +1,112 @@
+import datetime
+import shutil
+from pathlib import Path
+import duckdb
+import pytest
+from polars.testing import assert_frame_equal
+
+from src.rolling_stats import update_rolling_stats
+from src.synthetic_data import generate
+
+# The statistics as 1_wide_statements.sql computed them with the macros
+MACRO_STATS = """
+    with daily_adjusted_sma as (
+        select
+            *,
+            sma(adjClose, ticker, date, 250) as SMA_12m,
+            sma(adjClose, ticker, date, 750) as SMA_36m,
+        from daily_adjusted
+        where date <= current_date
+    ), joined as (
+        select da.*, spy.adjClose as SPY_adjClose
+        from daily_adjusted_sma as da
+        join selected_us_tickers as sut
+            using (ticker)
+        join daily_adjusted as spy
+            on spy.ticker = 'SPY' and spy.date = da.date
+        where
+            sut.assetType = 'Stock'
+            and sut.exchange = 'NYSE'
+            or (sut.exchange = 'NASDAQ' and da.date >= '2002-10-01')
+    )
+    select
+        ticker,
+        date,
+        SMA_12m,
+        SMA_36m,
+        index_volatility(adjClose, SPY_adjClose, ticker, date, 250) as volatility_12m,
+        index_volatility(adjClose, SPY_adjClose, ticker, date, 750) as volatility_36m,
+        sma(adjVolume, ticker, date, 250) as SMA_volume_12m,
+        stddev(adjVolume) over (
+            partition by ticker order by date rows between 250 preceding and current row
+        ) / nullif(sma(adjVolume, ticker, date, 250), 0) as volume_volatility_12m,
+    from joined
+    order by ticker, date
+"""
+
+
+@pytest.fixture(scope='module')
+def synthetic_db(tmp_path_factory) -> Path:
+    # Across 2002-10-01, when the Nasdaq tickers' rows start being used
+    database = tmp_path_factory.mktemp('rolling_stats') / 'synthetic.db'
+    generate(database, n_tickers=12, years=6, end_date=datetime.date(2004, 6, 30), batch_tickers=6)
+    with duckdb.connect(str(database)) as conn:
+        conn.execute(Path('src/sql/macros.sql').read_text())
+    return database
+
+
+@pytest.fixture
+def conn(synthetic_db: Path, tmp_path: Path):
+    database = tmp_path / 'synthetic.db'
+    shutil.copyfile(synthetic_db, database)
+    conn = duckdb.connect(str(database))
+    yield conn
+    conn.close()
+
+
+def assert_matches_macros(conn):
+    expected = conn.query(MACRO_STATS).pl()
+    stats = conn.query(f"""
+        select {', '.join(expected.columns)}
+        from rolling_stats
+        semi join ({MACRO_STATS}) as expected
+            using (ticker, date)
+        order by ticker, date
+    """).pl()
+    assert expected.height > 0
+    assert expected['volatility_36m'].is_not_null().any()
+    assert_frame_equal(stats, expected, check_exact=False, rel_tol=1e-9)
+
+
+def test_rolling_stats_match_macros(conn):
+    assert conn.execute("select count(*) from selected_us_tickers where exchange = 'NASDAQ'").fetchone()[0] > 0
+
+    assert update_rolling_stats(conn) == conn.query('select count(*) from rolling_stats').fetchone()[0]
+    assert_matches_macros(conn)
+
+
+def test_update_continues_from_stored_rows(conn):
+    conn.execute("""
+        create table held_prices as from daily_adjusted where date > '2003-01-15';
+        delete from daily_adjusted where date > '2003-01-15';
+    """)
+    update_rolling_stats(conn)
+    conn.execute("""
+        insert into daily_adjusted from held_prices;
+        create table changed as
+        select ticker, max(date) as since
+        from daily_adjusted
+        where date <= '2003-01-15'
+        group by ticker;
+    """)
+
+    written = update_rolling_stats(conn, changed='changed')
+
+    assert 0 < written < conn.query('select count(*) from rolling_stats').fetchone()[0]
+    assert_matches_macros(conn)
+    incremental = conn.query('select * from rolling_stats order by ticker, date').pl()
+    update_rolling_stats(conn)
+    assert_frame_equal(
+        incremental, conn.query('select * from rolling_stats order by ticker, date').pl(),
+        check_exact=False, rel_tol=1e-9,
+    )
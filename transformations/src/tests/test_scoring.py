@@ -0,0 +1,92 @@
+from pathlib import Path
+import duckdb
+import numpy as np
+import polars as pl
+import pytest
+from src.catboost_trainer import CatBoostTrainer
+from src.model_cache import ModelCache
+from src.scoring import FeatureManifest, Scorer
+
+
+@pytest.fixture
+def df_excess_returns(df_excess_returns):
+    # A second numeric feature
+    return df_excess_returns.with_columns(
+        sector_rank=(pl.int_range(pl.len()) % 4).cast(pl.Float64)
+    )
+
+
+def _fitted_trainer(df: pl.DataFrame, arrow_pools: bool) -> CatBoostTrainer:
+    trainer = CatBoostTrainer(
+        duckdb.connect(':memory:'), df, 'excess_return_ln_12m', 42, arrow_pools=arrow_pools,
+    )
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    return trainer
+
+
+@pytest.mark.parametrize('arrow_pools', [False, True])
+def test_scorer_matches_trainer(df_excess_returns, tmp_path: Path, arrow_pools):
+    trainer = _fitted_trainer(df_excess_returns, arrow_pools)
+    model_path = trainer.save_scorer(tmp_path)
+
+    scorer = Scorer.load(model_path)
+    # The pandas path keeps the frame's column order, with sector between numeric features
+    assert scorer.manifest.numeric_first == arrow_pools
+    assert 'ticker' in scorer.manifest.excluded_columns
+
+    tickers = [f'T{i}' for i in range(6)]
+    expected = trainer.predict(tickers, since='2010-01-01')
+    df = df_excess_returns.sort(['ticker', 'date'], descending=[False, True])
+    scored = scorer.score(df)
+
+    assert scored.columns == [
+        'ticker', 'date', 'pred_col', 'predicted_value_log', 'predicted_value', 'predicted_std',
+    ]
+    np.testing.assert_allclose(
+        scored['predicted_value'].to_numpy(), expected['predicted_excess_return'].to_numpy(),
+        rtol=1e-6,
+    )
+    np.testing.assert_allclose(
+        scored['predicted_std'].to_numpy(), expected['predicted_std'].to_numpy(), rtol=1e-6,
+    )
+
+
+def test_score_query_in_batches(df_excess_returns, tmp_path: Path):
+    trainer = _fitted_trainer(df_excess_returns, arrow_pools=True)
+    scorer = Scorer(trainer.model, trainer.feature_manifest())
+
+    conn = duckdb.connect(':memory:')
+    conn.register('excess_returns', df_excess_returns)
+    batches = list(scorer.score_query(conn, 'select * from excess_returns order by ticker, date', batch_rows=16))
+
+    assert [batch.height for batch in batches] == [16, 16, 16, 12]
+    streamed = pl.concat(batches)
+    expected = scorer.score(df_excess_returns.sort(['ticker', 'date']))
+    np.testing.assert_allclose(
+        streamed['predicted_value'].to_numpy(), expected['predicted_value'].to_numpy(),
+    )
+
+
+def test_cached_model_is_a_scorer(df_excess_returns, tmp_path: Path):
+    trainer = _fitted_trainer(df_excess_returns, arrow_pools=True)
+    cache = ModelCache(tmp_path)
+    trainer.save_cached_model(cache)
+    key = trainer.cache_key(cache)
+
+    scorer = Scorer.load(tmp_path / key / 'seed=42.cbm')
+    assert scorer.manifest == trainer.feature_manifest()
+
+
+def test_scorer_checks_features(df_excess_returns, tmp_path: Path):
+    trainer = _fitted_trainer(df_excess_returns, arrow_pools=True)
+    manifest = trainer.feature_manifest()
+
+    with pytest.raises(ValueError, match='Missing feature columns'):
+        Scorer(trainer.model, manifest).score(df_excess_returns.drop('feature2'))
+
+    other = FeatureManifest(**{**manifest.__dict__, 'feature_names': manifest.feature_names[::-1]})
+    with pytest.raises(ValueError, match="don't match"):
+        Scorer(trainer.model, other)
@@ -0,0 +1,24 @@
+from src.catboost_trainer import SHAP_MODES, CatBoostTrainer
+from src.shap_benchmark import compare_shap_modes
+
+
+def test_compare_shap_modes(setup_larger_test_env):
+    conn, df_excess_returns = setup_larger_test_env
+    trainer = CatBoostTrainer(
+        conn, df_excess_returns, 'excess_return_ln_12m', 42, arrow_pools=True,
+    )
+    trainer.df_train_df()
+    trainer.split_train_test_pools()
+    trainer.model_init()
+    trainer.model_fit()
+    timer = trainer.timer
+
+    result = compare_shap_modes(trainer, since='2010-02-01', top_k=1)
+
+    assert result['shap_mode'].to_list() == list(SHAP_MODES)
+    assert result['values_per_row'].to_list() == [3.0, 3.0, 2.0]
+    assert result['mean_abs_error'][1] >= 0
+    assert 0 <= result['abs_shap_share'][2] <= 1
+    # The trainer is left as it was
+    assert trainer.shap_mode == 'exact'
+    assert trainer.timer is timer
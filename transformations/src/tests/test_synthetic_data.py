@@ -0,0 +1,98 @@
+import datetime
+from pathlib import Path
+import duckdb
+import pytest
+
+from src.synthetic_data import INDEX_TICKER, STATEMENT_CODES, generate, ticker_symbols
+from src.wide_statements import update_wide_statements
+
+
+@pytest.fixture(scope='module')
+def synthetic_db(tmp_path_factory) -> Path:
+    database = tmp_path_factory.mktemp('synthetic') / 'synthetic.db'
+    generate(
+        database, n_tickers=12, years=5, statement_density=0.9,
+        end_date=datetime.date(2024, 11, 8), batch_tickers=5,
+    )
+    return database
+
+
+def test_ticker_symbols():
+    symbols = ticker_symbols(26**4 + 2)
+    assert symbols[:2] == ['AAAA', 'AAAB']
+    assert symbols[-2:] == ['AAAAA', 'AAAAB']
+    assert len(set(symbols)) == len(symbols)
+    assert INDEX_TICKER not in symbols
+
+
+def test_generate_is_reproducible(synthetic_db: Path, tmp_path: Path):
+    rows = generate(
+        tmp_path / 'again.db', n_tickers=12, years=5, statement_density=0.9,
+        end_date=datetime.date(2024, 11, 8), batch_tickers=5,
+    )
+    with duckdb.connect(str(synthetic_db), read_only=True) as conn:
+        assert rows == {
+            table: conn.execute(f'select count(*) from {table}').pl().item() for table in rows
+        }
+        assert conn.execute('select count(*) from selected_us_tickers').pl().item() > 0
+        daily = conn.execute('select sum(adjClose) from daily_adjusted').pl().item()
+    with duckdb.connect(str(tmp_path / 'again.db'), read_only=True) as conn:
+        assert conn.execute('select sum(adjClose) from daily_adjusted').pl().item() == daily
+
+    with pytest.raises(ValueError, match='statement_density'):
+        generate(tmp_path / 'empty.db', n_tickers=1, years=1, statement_density=0)
+
+
+def test_sql_assets_run_on_synthetic_data(synthetic_db: Path):
+    with duckdb.connect(str(synthetic_db)) as conn:
+        assert conn.execute("""
+            select count(distinct concat_ws('_', statementType, dataCode))
+            from fundamentals.statements
+        """).pl().item() == len(STATEMENT_CODES)
+
+        conn.execute(Path('src/sql/macros.sql').read_text())
+        update_wide_statements(conn, Path('src/sql/1_wide_statements.sql').read_text(), incremental=False)
+        for file in [
+            '2_wide_with_daily_fundamentals.sql',
+            '3_wide_with_combined_metrics.sql',
+            '4_excess_returns.sql',
+        ]:
+            conn.execute(Path('src/sql', file).read_text())
+
+        n_rows, n_labels, n_tickers = conn.execute("""
+            select count(*), count(excess_return_ln_12m), count(distinct ticker)
+            from fundamentals.excess_returns
+        """).pl().row(0)
+    assert n_tickers > 1
+    assert 0 < n_labels < n_rows
+
+
+def test_generate_without_primary_keys(synthetic_db: Path, tmp_path: Path):
+    database = tmp_path / 'no_keys.db'
+    generate(
+        database, n_tickers=3, years=2, end_date=datetime.date(2024, 11, 8), primary_keys=False
+    )
+    describe = 'select column_name, column_type from (describe {})'
+    with duckdb.connect(str(database), read_only=True) as conn:
+        assert conn.execute(
+            "select count(*) from duckdb_constraints() where constraint_type = 'PRIMARY KEY'"
+        ).pl().item() == 0
+        columns = conn.execute(describe.format('fundamentals.statements')).fetchall()
+    with duckdb.connect(str(synthetic_db), read_only=True) as conn:
+        assert columns == conn.execute(describe.format('fundamentals.statements')).fetchall()
+
+
+def test_row_counts_scale_with_tickers(tmp_path: Path):
+    rows = {
+        n_tickers: generate(
+            tmp_path / f'tickers={n_tickers}.db', n_tickers=n_tickers, years=2,
+            end_date=datetime.date(2024, 11, 8), primary_keys=False,
+        )
+        for n_tickers in (10, 100)
+    }
+    # One row per ticker, plus SPY in supported_tickers
+    assert rows[100]['supported_tickers'] == 101
+    assert rows[100]['fundamentals.meta'] == 100
+    # The other tables grow with the tickers, up to the random listing periods
+    for table in ['daily_adjusted', 'fundamentals.daily', 'fundamentals.statements']:
+        assert 8 < rows[100][table] / rows[10][table] < 12
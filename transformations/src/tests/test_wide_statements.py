@@ -0,0 +1,123 @@
+import datetime
+import shutil
+from pathlib import Path
+import duckdb
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from src.synthetic_data import INDEX_TICKER, generate
+from src.wide_statements import TABLE, update_wide_statements
+
+SQL = Path('src/sql/1_wide_statements.sql').read_text()
+
+
+@pytest.fixture(scope='module')
+def synthetic_db(tmp_path_factory) -> Path:
+    database = tmp_path_factory.mktemp('wide_statements') / 'synthetic.db'
+    generate(database, n_tickers=10, years=5, end_date=datetime.date(2024, 11, 8), batch_tickers=5)
+    with duckdb.connect(str(database)) as conn:
+        conn.execute(Path('src/sql/macros.sql').read_text())
+    return database
+
+
+@pytest.fixture
+def conn(synthetic_db: Path, tmp_path: Path):
+    database = tmp_path / 'synthetic.db'
+    shutil.copyfile(synthetic_db, database)
+    conn = duckdb.connect(str(database))
+    yield conn
+    conn.close()
+
+
+def wide_statements(conn) -> pl.DataFrame:
+    return conn.query(f'select * from {TABLE} order by ticker, date').pl()
+
+
+def rolling_stats(conn) -> pl.DataFrame:
+    return conn.query('select * from rolling_stats order by ticker, date').pl()
+
+
+def assert_matches_full_rebuild(conn):
+    incremental = wide_statements(conn), rolling_stats(conn)
+    update_wide_statements(conn, SQL, incremental=False)
+    for updated, full in zip(incremental, [wide_statements(conn), rolling_stats(conn)]):
+        assert updated.height == full.height
+        assert_frame_equal(updated.select(full.columns), full, check_exact=False, rel_tol=1e-9)
+
+
+def test_incremental_update_matches_full_rebuild(conn):
+    tickers = [row[0] for row in conn.execute(
+        f"select distinct ticker from fundamentals.statements where ticker != '{INDEX_TICKER}' order by 1"
+    ).fetchall()]
+    new_prices, new_statements, backfilled, delisted = tickers[:4]
+    # The state of the previous run: the last quarter of prices and of one
+    # ticker's statements weren't loaded yet
+    conn.execute("""
+        create table held_prices as from daily_adjusted where date > '2024-08-01';
+        delete from daily_adjusted where date > '2024-08-01';
+    """)
+    conn.execute(f"""
+        create table held_statements as
+        from fundamentals.statements
+        where ticker = '{new_statements}' and date = (
+            select max(date) from fundamentals.statements where ticker = '{new_statements}'
+        );
+        delete from fundamentals.statements using held_statements
+        where statements.ticker = held_statements.ticker and statements.date = held_statements.date;
+        update fundamentals.meta set statementLastUpdated = statementLastUpdated - 30
+        where upper(ticker) = '{new_statements}';
+    """)
+    assert update_wide_statements(conn, SQL)['mode'] == 'full'
+    assert update_wide_statements(conn, SQL) == {
+        'mode': 'incremental', 'changed_tickers': 0, 'rows_deleted': 0, 'rows_inserted': 0,
+        'rows': wide_statements(conn).height,
+    }
+
+    conn.execute(f"""
+        insert into daily_adjusted from held_prices where ticker != '{delisted}';
+        insert into fundamentals.statements from held_statements;
+        update fundamentals.meta set statementLastUpdated = statementLastUpdated + 30
+        where upper(ticker) = '{new_statements}';
+        -- A dividend adjusts the whole history
+        update daily_adjusted set adjClose = adjClose * 0.99 where ticker = '{backfilled}';
+        delete from daily_adjusted where ticker = '{delisted}' and date < '2024-01-01';
+    """)
+    stats = update_wide_statements(conn, SQL)
+
+    assert stats['mode'] == 'incremental'
+    # Every ticker still trading, including the index, got new prices
+    assert stats['changed_tickers'] == conn.execute(
+        'select count(distinct ticker) from held_prices'
+    ).fetchone()[0]
+    assert stats['rows_inserted'] < stats['rows']
+    assert_matches_full_rebuild(conn)
+
+
+def test_full_rebuild_when_cutoff_moves_back_or_index_changes(conn):
+    assert update_wide_statements(conn, SQL, "'2024-06-30'")['mode'] == 'full'
+    assert update_wide_statements(conn, SQL)['mode'] == 'incremental'
+    assert_matches_full_rebuild(conn)
+
+    assert update_wide_statements(conn, SQL, "'2024-06-30'")['mode'] == 'full'
+    assert (wide_statements(conn)['date'] <= datetime.date(2024, 6, 30)).all()
+
+    conn.execute(f"update daily_adjusted set adjClose = adjClose * 0.99 where ticker = '{INDEX_TICKER}'")
+    assert update_wide_statements(conn, SQL, "'2024-06-30'")['mode'] == 'full'
+
+
+def test_failed_update_is_rolled_back(conn):
+    update_wide_statements(conn, SQL)
+    before = wide_statements(conn)
+    conn.execute('''
+        insert into daily_adjusted
+        select date + 1, close, adjClose, adjVolume, ticker
+        from daily_adjusted
+        where date = (select max(date) from daily_adjusted)
+    ''')
+
+    with pytest.raises(duckdb.Error):
+        update_wide_statements(conn, SQL.replace('rs.SMA_12m', 'rs.SMA_11m'))
+
+    assert wide_statements(conn).equals(before)
+    assert update_wide_statements(conn, SQL)['changed_tickers'] > 0
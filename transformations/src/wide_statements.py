@@ -0,0 +1,252 @@
+"""Build fundamentals.wide_statements in full, or incrementally from watermarks.
+
+`1_wide_statements.sql` joins the rolling statistics of all of `daily_adjusted`,
+re-pivots all of `fundamentals.statements` and redoes the asof join for every
+ticker. A daily run only adds a day of prices to most tickers, though, and new
+statements to a few of them. So per ticker, the last price date, a hash of the
+adjusted price history, `meta.statementLastUpdated` and the listing are kept in
+`fundamentals.wide_statements_watermarks`, and an incremental update:
+
+- recomputes the rows after the last price date of a ticker with new prices,
+  from its prices since the start of that quarter (one day per quarter is kept);
+- recomputes all rows of a ticker with updated statements, a rewritten price
+  history (the EtL backfills the history of a ticker after a split or dividend),
+  a changed listing, or no watermark;
+- drops the rows of tickers that are no longer in `daily_adjusted`;
+
+and merges them into the table, in one transaction. `main.rolling_stats` is
+updated for the same tickers and rows first, see `src.rolling_stats`. It falls
+back to a full rebuild of both when there is no table or watermarks yet, the
+cutoff date moved back, the history of the index ticker changed (every row has
+its prices) or new statement codes appear (new columns).
+"""
+
+import duckdb
+
+from src import rolling_stats
+from src.rolling_stats import INDEX_TICKER, update_rolling_stats
+
+TABLE = "fundamentals.wide_statements"
+WATERMARKS_TABLE = "fundamentals.wide_statements_watermarks"
+# 1_wide_statements.sql joins statements from 45 days after their fiscal date
+SAFE_RELEASE_DAYS = 45
+
+_WATERMARKS_DDL = f"""
+    create table if not exists {WATERMARKS_TABLE} (
+        ticker VARCHAR,
+        max_date DATE,
+        history_hash UBIGINT,
+        statement_last_updated DATE,
+        exchange VARCHAR,
+        asset_type VARCHAR,
+        cutoff_date DATE
+    )
+"""
+
+_CURRENT_WATERMARKS = f"""
+    create or replace temp table _ws_current as
+    with prices as (
+        select
+            da.ticker,
+            max(da.date) as max_date,
+            bit_xor(hash(da.date, da.adjClose)) as history_hash,
+            -- The hash of the rows the stored watermark was taken of
+            bit_xor(hash(da.date, da.adjClose)) filter (where da.date <= w.max_date) as prior_history_hash,
+        from main.daily_adjusted as da
+        left join {WATERMARKS_TABLE} as w
+            using (ticker)
+        where da.date <= $cutoff_date
+        group by da.ticker
+    ), statements as (
+        select upper(ticker) as ticker, max(statementLastUpdated) as statement_last_updated
+        from fundamentals.meta
+        group by all
+    )
+    select
+        prices.*,
+        statements.statement_last_updated,
+        sut.exchange,
+        sut.assetType as asset_type,
+    from prices
+    left join statements
+        using (ticker)
+    left join main.selected_us_tickers as sut
+        using (ticker)
+"""
+
+# since: the rows after it are recomputed, null for all rows of the ticker
+_CHANGED_TICKERS = f"""
+    create or replace temp table _ws_changed as
+    select ticker, since
+    from (
+        select
+            coalesce(c.ticker, w.ticker) as ticker,
+            case
+                when c.ticker is null
+                    or w.ticker is null
+                    or c.prior_history_hash is distinct from w.history_hash
+                    or c.statement_last_updated is distinct from w.statement_last_updated
+                    or c.exchange is distinct from w.exchange
+                    or c.asset_type is distinct from w.asset_type
+                then null
+                else w.max_date
+            end as since,
+            c.max_date > w.max_date as new_prices,
+        from _ws_current as c
+        full join {WATERMARKS_TABLE} as w
+            on c.ticker = w.ticker
+    )
+    where since is null or new_prices
+"""
+
+# The prices of the changed tickers since the start of the quarter of their first
+# new row, for sampling the quarter's day. The index ticker is pivoted to columns
+# of every row, so its prices are included from the earliest start.
+_PRICE_SLICE = f"""
+    create or replace temp table _ws_daily_adjusted as
+    with starts as (
+        select ticker, date_trunc('quarter', since)::date as start_date
+        from _ws_changed
+    ), with_index as (
+        select * from starts
+        union all
+        select '{INDEX_TICKER}', if(bool_or(start_date is null), null, min(start_date))
+        from starts
+    ), ranges as (
+        select ticker, if(bool_or(start_date is null), null, min(start_date)) as start_date
+        from with_index
+        group by ticker
+    )
+    select da.*
+    from main.daily_adjusted as da
+    join ranges
+        on da.ticker = ranges.ticker
+    where ranges.start_date is null or da.date >= ranges.start_date
+"""
+
+# The statements of the changed tickers the recomputed rows can be joined to:
+# the ones released after the first new row, and the last one before it
+_STATEMENTS_SLICE = f"""
+    create or replace temp table _ws_statements as
+    with released as (
+        select c.ticker, max(s.date) as first_date
+        from _ws_changed as c
+        join fundamentals.statements as s
+            on s.ticker = c.ticker and s.date + {SAFE_RELEASE_DAYS} <= c.since
+        group by c.ticker
+    )
+    select s.*
+    from fundamentals.statements as s
+    join _ws_changed as c
+        on s.ticker = c.ticker
+    left join released
+        on s.ticker = released.ticker
+    where c.since is null or released.first_date is null or s.date >= released.first_date
+"""
+
+_TEMP_TABLES = ["_ws_current", "_ws_changed", "_ws_daily_adjusted", "_ws_statements", "_ws_new"]
+
+
+def _replace_once(sql: str, old: str, new: str) -> str:
+    if sql.count(old) != 1:
+        raise ValueError(f"Expected '{old}' once in the wide statements SQL, found it {sql.count(old)} times")
+    return sql.replace(old, new)
+
+
+def _exists(conn: duckdb.DuckDBPyConnection, table: str) -> bool:
+    schema, name = table.split(".")
+    return _count(conn, f"""
+        select count(*) from duckdb_tables() where schema_name = '{schema}' and table_name = '{name}'
+    """) > 0
+
+
+def _columns(conn: duckdb.DuckDBPyConnection, table: str) -> set[str]:
+    return {row[0] for row in conn.execute(f"select column_name from (describe {table})").fetchall()}
+
+
+def _count(conn: duckdb.DuckDBPyConnection, sql: str) -> int:
+    return conn.execute(sql).pl().item()
+
+
+def _incremental(conn: duckdb.DuckDBPyConnection, sql: str, cutoff_date: str) -> dict | None:
+    """Merge the recomputed rows of the changed tickers into the table.
+
+    Returns: the update's stats, or None if it needs a full rebuild
+    """
+    stored_cutoff, n_watermarks = conn.execute(
+        f"select max(cutoff_date) > {cutoff_date}, count(*) from {WATERMARKS_TABLE}"
+    ).pl().row(0)
+    if not _exists(conn, TABLE) or not _exists(conn, rolling_stats.TABLE) or n_watermarks == 0 or stored_cutoff:
+        return None
+
+    conn.execute(_CHANGED_TICKERS)
+    if _count(conn, f"select count(*) from _ws_changed where ticker = '{INDEX_TICKER}' and since is null"):
+        return None
+    changed = _count(conn, "select count(*) from _ws_changed")
+    if changed == 0:
+        return {"mode": "incremental", "changed_tickers": 0, "rows_deleted": 0, "rows_inserted": 0}
+
+    update_rolling_stats(conn, cutoff_date, changed="_ws_changed")
+    conn.execute(_PRICE_SLICE)
+    conn.execute(_STATEMENTS_SLICE)
+    sql = _replace_once(sql, f"create or replace table {TABLE}", "create or replace temp table _ws_new")
+    sql = _replace_once(sql, "from main.daily_adjusted", "from _ws_daily_adjusted")
+    sql = _replace_once(sql, "from fundamentals.statements", "from _ws_statements")
+    conn.execute(sql)
+    if not _columns(conn, "_ws_new") <= _columns(conn, TABLE):
+        return None
+
+    deleted = _count(conn, f"""
+        delete from {TABLE} as ws
+        using _ws_changed as c
+        where ws.ticker = c.ticker and (c.since is null or ws.date > c.since)
+    """)
+    inserted = _count(conn, f"""
+        insert into {TABLE} by name
+        select n.*
+        from _ws_new as n
+        join _ws_changed as c
+            on n.ticker = c.ticker
+        where c.since is null or n.date > c.since
+    """)
+    return {"mode": "incremental", "changed_tickers": changed, "rows_deleted": deleted, "rows_inserted": inserted}
+
+
+def update_wide_statements(
+    conn: duckdb.DuckDBPyConnection,
+    sql: str,
+    cutoff_date: str = "current_date",
+    incremental: bool = True,
+) -> dict:
+    """Build fundamentals.wide_statements from `sql` (1_wide_statements.sql) with
+    prices up to `cutoff_date`, a SQL date expression, and update its watermarks.
+
+    With `incremental`, only the rows of the tickers that changed since the last
+    update are recomputed where possible, see the module docstring.
+
+    Returns: mode ("full" or "incremental"), number of changed tickers and of the
+        deleted and inserted rows, and rows in the table
+    """
+    sql = _replace_once(sql, "$cutoff_date", cutoff_date)
+    conn.execute("begin transaction")
+    try:
+        conn.execute(_WATERMARKS_DDL)
+        conn.execute(_CURRENT_WATERMARKS.replace("$cutoff_date", cutoff_date))
+        stats = _incremental(conn, sql, cutoff_date) if incremental else None
+        if stats is None:
+            update_rolling_stats(conn, cutoff_date)
+            conn.execute(sql)
+            stats = {"mode": "full", "changed_tickers": _count(conn, "select count(*) from _ws_current")}
+        conn.execute(f"""
+            create or replace table {WATERMARKS_TABLE} as
+            select * exclude (prior_history_hash), ({cutoff_date})::date as cutoff_date
+            from _ws_current
+        """)
+        for table in _TEMP_TABLES:
+            conn.execute(f"drop table if exists {table}")
+    except Exception:
+        conn.execute("rollback")
+        raise
+    conn.execute("commit")
+    stats["rows"] = _count(conn, f"select count(*) from {TABLE}")
+    return stats
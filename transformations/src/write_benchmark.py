@@ -0,0 +1,141 @@
+"""Benchmark writing a predictions-sized frame to DuckDB, SQLAlchemy vs Arrow.
+
+The frame has the long predictions layout (one row per ticker, date, horizon and
+feature). It's written through `pl.DataFrame.write_database` (duckdb-engine and
+SQLAlchemy, the path `write_table_duckdb` used to take) and with every mode of
+`src.duckdb_writer.write_frame`, each to a fresh database file:
+
+    python -m src.write_benchmark --rows 100000
+"""
+
+import argparse
+import datetime
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import polars as pl
+from sqlalchemy import create_engine
+
+from src.duckdb_writer import DEFAULT_BATCH_ROWS, write_frame
+
+TABLE = "predictions_long"
+# Like main.predictions_long in predictions.sql
+TABLE_DDL = f"""
+    create table {TABLE} (
+        date DATE,
+        ticker VARCHAR,
+        feature VARCHAR,
+        shap_value FLOAT,
+        feature_value VARCHAR,
+        bias FLOAT,
+        predicted_value_log FLOAT,
+        predicted_value FLOAT,
+        pred_col VARCHAR,
+        trained_date DATE,
+        primary key (date, ticker, feature, pred_col, trained_date)
+    )
+"""
+
+
+def predictions_frame(n_rows: int, n_features: int = 60, seed: int = 0) -> pl.DataFrame:
+    """Long layout predictions of `n_rows // n_features` tickers."""
+    rng = np.random.default_rng(seed)
+    n_tickers = max(n_rows // n_features, 1)
+    n_rows = n_tickers * n_features
+    return pl.DataFrame(
+        {
+            "date": [datetime.date(2024, 11, 18)] * n_rows,
+            "ticker": np.repeat([f"T{i:05d}" for i in range(n_tickers)], n_features),
+            "feature": np.tile([f"feature_{j}" for j in range(n_features)], n_tickers),
+            "shap_value": rng.normal(0, 0.05, n_rows).astype(np.float32),
+            "feature_value": rng.normal(0, 1, n_rows).round(4).astype(str),
+            "bias": np.full(n_rows, 0.02, np.float32),
+            "predicted_value_log": rng.normal(0, 0.2, n_rows).astype(np.float32),
+            "predicted_value": rng.normal(1, 0.2, n_rows).astype(np.float32),
+            "pred_col": "excess_return_ln_12m",
+            "trained_date": [datetime.date(2024, 11, 18)] * n_rows,
+        }
+    )
+
+
+def _timed(write, database: Path) -> float:
+    start = time.perf_counter()
+    write(database)
+    return time.perf_counter() - start
+
+
+def compare_writers(df: pl.DataFrame, batch_rows: int = DEFAULT_BATCH_ROWS) -> pl.DataFrame:
+    """Write `df` with every method and mode, each to a fresh database file.
+
+    Returns: one row per method with the write time and throughput
+    """
+
+    def sqlalchemy(database: Path) -> None:
+        engine = create_engine(f"duckdb:///{database}")
+        try:
+            df.write_database(table_name=TABLE, connection=engine, if_table_exists="replace")
+        finally:
+            engine.dispose()
+
+    def arrow(mode: str):
+        def write(database: Path) -> None:
+            with duckdb.connect(str(database)) as conn:
+                write_frame(conn, TABLE, df, mode=mode, batch_rows=batch_rows)
+
+        return write
+
+    def with_table(write, rows: pl.DataFrame | None = None):
+        """Create the table first, with `rows` in it, so only the write is timed."""
+
+        def prepare(database: Path) -> None:
+            with duckdb.connect(str(database)) as conn:
+                conn.execute(TABLE_DDL)
+                if rows is not None:
+                    write_frame(conn, TABLE, rows)
+
+        return prepare, write
+
+    methods = {
+        "sqlalchemy_replace": (None, sqlalchemy),
+        "arrow_replace": (None, arrow("replace")),
+        "arrow_append": with_table(arrow("append")),
+        # Every row replaces an existing one
+        "arrow_upsert": with_table(arrow("upsert"), rows=df),
+    }
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for method, (prepare, write) in methods.items():
+            database = Path(tmp_dir) / f"{method}.db"
+            if prepare is not None:
+                prepare(database)
+            seconds = _timed(write, database)
+            with duckdb.connect(str(database), read_only=True) as conn:
+                written = conn.query(f"select count(*) from {TABLE}").pl().item()
+            rows.append(
+                {
+                    "method": method,
+                    "rows": written,
+                    "seconds": seconds,
+                    "rows_per_second": df.height / seconds if seconds > 0 else None,
+                }
+            )
+
+    result = pl.DataFrame(rows)
+    baseline = result.filter(pl.col("method") == "sqlalchemy_replace")["seconds"][0]
+    return result.with_columns(speedup=baseline / pl.col("seconds"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark writing a predictions-sized frame to DuckDB, SQLAlchemy vs Arrow."
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS)
+    args = parser.parse_args()
+
+    result = compare_writers(predictions_frame(args.rows), args.batch_rows)
+    with pl.Config(tbl_rows=-1, tbl_cols=-1):
+        print(result)